@@ -0,0 +1,93 @@
+"""
+Parity check and latency benchmark for the BGE-M3 encoder backends
+
+Encodes the same texts with the torch backend and with ONNX Runtime
+(fp32, and int8 with --int8), reports cosine similarity against torch and
+per-call latency for single queries and ingest-sized batches.
+Exits with status 1 if any backend falls below --min-cosine.
+
+Usage:
+    python scripts/benchmark_encoder.py --int8 --threads 8
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add agentic/ to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.settings import settings
+from src.utils.encoder_backends import ONNXBGEEncoder, TorchBGEEncoder
+
+
+SAMPLE_TEXTS = [
+    "Comment créer un nouveau projet dans Doxa et inviter mon équipe ?",
+    "How do I reset my password if I no longer have access to my email?",
+    "Quels sont les plans tarifaires et comment changer d'abonnement ?",
+    "Je n'arrive pas à assigner une tâche à un membre de mon équipe.",
+    "Can I integrate Doxa with Slack to receive notifications for new tasks?",
+    "كيف يمكنني حذف حسابي على منصة دوكسا؟",
+    "¿Cómo exporto los datos de mi proyecto a un archivo CSV?",
+    "Les notifications par email ne fonctionnent plus depuis la mise à jour.",
+    "What is the difference between the Team and Business plans?",
+    "Comment configurer un workflow d'approbation pour les documents ?",
+    "The kanban board does not load and shows a blank page in Chrome.",
+    "Est-il possible de facturer plusieurs entités avec un seul compte ?"
+]
+
+
+def time_calls(encoder, texts, batch_size: int, repeats: int) -> dict:
+    """p50/p95 latency in ms of encode() calls"""
+    encoder.encode(texts, batch_size=batch_size, max_length=settings.BGE_MAX_LENGTH)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        encoder.encode(texts, batch_size=batch_size, max_length=settings.BGE_MAX_LENGTH)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"p50": float(np.percentile(timings, 50)), "p95": float(np.percentile(timings, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BGE-M3 encoder backend parity and latency")
+    parser.add_argument("--int8", action="store_true", help="Also benchmark the int8-quantized ONNX model")
+    parser.add_argument("--threads", type=int, default=settings.ONNX_INTRA_OP_THREADS, help="ONNX intra-op threads")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    backends = {"torch": TorchBGEEncoder()}
+    backends["onnx-fp32"] = ONNXBGEEncoder(quantize_int8=False, intra_op_threads=args.threads)
+    if args.int8:
+        backends["onnx-int8"] = ONNXBGEEncoder(quantize_int8=True, intra_op_threads=args.threads)
+
+    reference = backends["torch"].encode(SAMPLE_TEXTS, batch_size=len(SAMPLE_TEXTS))["dense_vecs"]
+    passed = True
+
+    print("\n" + "=" * 78)
+    print(f"{'backend':<10} {'cos mean':>9} {'cos min':>8} {'query p50':>10} {'query p95':>10} "
+          f"{'batch p50':>10} {'batch p95':>10}")
+    print("-" * 78)
+
+    for name, encoder in backends.items():
+        vectors = encoder.encode(SAMPLE_TEXTS, batch_size=len(SAMPLE_TEXTS))["dense_vecs"]
+        cosines = np.sum(vectors * reference, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+        )
+        query = time_calls(encoder, SAMPLE_TEXTS[:1], batch_size=1, repeats=args.repeats)
+        batch = time_calls(encoder, SAMPLE_TEXTS, batch_size=settings.INGEST_EMBED_BATCH_SIZE, repeats=args.repeats)
+
+        if cosines.min() < args.min_cosine:
+            passed = False
+        print(f"{name:<10} {cosines.mean():>9.5f} {cosines.min():>8.5f} {query['p50']:>8.1f}ms "
+              f"{query['p95']:>8.1f}ms {batch['p50']:>8.1f}ms {batch['p95']:>8.1f}ms")
+
+    print("=" * 78)
+    print("✅ Parity check passed" if passed else f"❌ Parity below {args.min_cosine} cosine")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
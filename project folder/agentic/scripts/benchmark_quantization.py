@@ -0,0 +1,146 @@
+"""
+Recall@k vs. memory benchmark for quantized vector storage
+
+Builds int8 and binary indexes from the configured ChromaDB collection and
+compares each against exact brute-force search over the full-precision
+vectors. Queries are either real questions (--queries-file, one per line,
+embedded with the configured encoder) or a sample of stored vectors held
+out of the indexes, so no query ever finds itself.
+
+Usage:
+    python scripts/benchmark_quantization.py --queries 200 --k 1 5 10
+    python scripts/benchmark_quantization.py --queries-file data/eval_queries.txt
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from chromadb import PersistentClient
+
+# Add agentic/ to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.settings import settings
+from src.utils.encoder_backends import get_shared_encoder
+from src.utils.vector_quantization import QUANTIZATION_MODES, QuantizedVectorIndex, build_index_from_collection
+
+
+BASELINE_BATCH_ROWS = 8192
+
+
+def vector_pages(vectors: np.ndarray, rows: np.ndarray, batch_rows: int = BASELINE_BATCH_ROWS):
+    """Yield the given rows of a (memory-mapped) array a batch at a time"""
+    for start in range(0, len(rows), batch_rows):
+        yield np.asarray(vectors[rows[start:start + batch_rows]], dtype=np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, rows: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """
+    Brute-force top-k by inner product, one batch of vectors at a time.
+
+    Returns one set per query of positions into `rows`, so only a batch of
+    full-precision vectors is ever resident.
+    """
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_positions = np.zeros((len(queries), 0), dtype=np.int64)
+    offset = 0
+    for page in vector_pages(vectors, rows):
+        scores = np.concatenate([best_scores, queries @ page.T], axis=1)
+        positions = np.concatenate(
+            [best_positions, np.broadcast_to(np.arange(offset, offset + len(page)), (len(queries), len(page)))], axis=1
+        )
+        keep = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_positions = np.take_along_axis(positions, keep, axis=1)
+        offset += len(page)
+    return [set(row.tolist()) for row in best_positions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized index recall/memory benchmark")
+    parser.add_argument("--collection", default=settings.CHROMA_COLLECTION_NAME)
+    parser.add_argument("--queries", type=int, default=200, help="Number of stored vectors held out as queries")
+    parser.add_argument("--queries-file", help="Text file of real queries, one per line (replaces held-out vectors)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--rescore-multiplier", type=int, default=settings.QUANTIZED_RESCORE_MULTIPLIER)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = PersistentClient(path=settings.CHROMA_PERSIST_PATH)
+    collection = client.get_collection(name=args.collection)
+    print(f"Collection '{args.collection}': {collection.count()} vectors")
+
+    rng = np.random.default_rng(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Full-precision vectors of the whole collection, written to disk once
+        # and only read through the memory map from here on
+        stored = build_index_from_collection(collection, str(Path(tmp_dir) / "stored"), mode="binary")
+        stored_vectors = stored.full_vectors
+        if len(stored_vectors) == 0:
+            print("Collection is empty, nothing to benchmark")
+            return
+
+        if args.queries_file:
+            with open(args.queries_file, 'r', encoding='utf-8') as f:
+                texts = [line.strip() for line in f if line.strip()]
+            queries = np.asarray(get_shared_encoder().encode(
+                texts, batch_size=settings.INGEST_EMBED_BATCH_SIZE, max_length=settings.BGE_MAX_LENGTH
+            )["dense_vecs"], dtype=np.float32)
+            indexed_rows = np.arange(len(stored_vectors))
+            print(f"Queries: {len(queries)} from {args.queries_file}")
+        else:
+            # Hold the query vectors out of the indexes and the ground truth
+            held_out = rng.choice(len(stored_vectors), size=min(args.queries, len(stored_vectors) - 1), replace=False)
+            queries = np.asarray(stored_vectors[np.sort(held_out)], dtype=np.float32)
+            indexed_rows = np.setdiff1d(np.arange(len(stored_vectors)), held_out)
+            print(f"Queries: {len(queries)} stored vectors held out of the indexes")
+
+        dimension = stored_vectors.shape[1]
+        indexed_ids = [stored.ids[row] for row in indexed_rows]
+        indexes = {
+            mode: QuantizedVectorIndex.build(
+                str(Path(tmp_dir) / mode), indexed_ids, vector_pages(stored_vectors, indexed_rows), dimension, mode=mode
+            )
+            for mode in QUANTIZATION_MODES
+        }
+
+        count = len(indexed_rows)
+        sample = range(len(queries))
+        max_k = min(max(args.k), count)
+        truth_by_k = {k: exact_top_k(stored_vectors, indexed_rows, queries, min(k, count)) for k in args.k}
+        full_bytes = count * dimension * np.dtype(np.float32).itemsize
+
+        print("\n" + "=" * 72)
+        print(f"{'mode':<8} {'resident':>12} {'ratio':>7} " +
+              " ".join(f"{'R@' + str(k):>7}" for k in args.k) + f" {'ms/query':>9}")
+        print("-" * 72)
+        print(f"{'float32':<8} {full_bytes:>12} {'1.0x':>7} " +
+              " ".join(f"{1.0:>7.3f}" for _ in args.k) + f" {'-':>9}")
+
+        for mode, index in indexes.items():
+            id_to_row = {doc_id: row for row, doc_id in enumerate(index.ids)}
+            recalls = {k: [] for k in args.k}
+            started = time.perf_counter()
+
+            for row in sample:
+                hits = index.search(queries[row], max_k, args.rescore_multiplier)
+                hit_rows = [id_to_row[doc_id] for doc_id, _ in hits]
+                for k in args.k:
+                    expected = truth_by_k[k][row]
+                    recalls[k].append(len(set(hit_rows[:k]) & expected) / len(expected))
+
+            elapsed_ms = (time.perf_counter() - started) * 1000 / len(sample)
+            resident = index.memory_footprint()["resident_bytes"]
+            ratio = full_bytes / resident if resident else 0.0
+            print(f"{mode:<8} {resident:>12} {ratio:>6.1f}x " +
+                  " ".join(f"{np.mean(recalls[k]):>7.3f}" for k in args.k) + f" {elapsed_ms:>9.2f}")
+
+        print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Ingest raw documents into the ChromaDB knowledge base
+
+Streams files from RAW_DOCS_DIR (or --source), chunks them, embeds in
+bounded batches and writes to ChromaDB in pages. Safe to re-run: unchanged
+files are skipped and interrupted runs resume where they stopped.
+
+With --sync, the collection is brought in line with the source directory:
+only new or changed chunks are embedded and chunks of deleted content are
+removed (use this for nightly documentation refreshes). Chunks are tagged
+with a ticket category; --sync also retags unchanged chunks without
+re-embedding them.
+
+Usage:
+    python scripts/ingest_documents.py --source data/raw_docs --splitter markdown
+    python scripts/ingest_documents.py --sync
+    python scripts/ingest_documents.py --workers 8 --torch-threads 4
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add agentic/ to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.settings import settings
+from src.services.data_manager import chroma_manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest raw documents into ChromaDB")
+    parser.add_argument("--source", default=settings.RAW_DOCS_DIR, help="Directory of raw documents")
+    parser.add_argument("--collection", default=settings.CHROMA_COLLECTION_NAME)
+    parser.add_argument("--splitter", default=settings.INGEST_SPLITTER, choices=["recursive", "character", "markdown"])
+    parser.add_argument("--chunk-size", type=int, default=settings.INGEST_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.INGEST_CHUNK_OVERLAP)
+    parser.add_argument("--sync", action="store_true", help="Incremental re-index: upsert changed, delete removed")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS,
+                        help="Embedding worker processes (>1 enables the multi-process pool)")
+    parser.add_argument("--torch-threads", type=int, default=settings.INGEST_TORCH_THREADS,
+                        help="Torch threads per worker (0 = cores / workers)")
+    args = parser.parse_args()
+    settings.INGEST_TORCH_THREADS = args.torch_threads
+
+    ingest = chroma_manager.sync if args.sync else chroma_manager.ingest_directory
+    ingest(
+        collection_name=args.collection,
+        source_dir=args.source,
+        splitter=args.splitter,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        workers=args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,5 +2,6 @@
 Agents package initialization
 """
 from .classification_agents import agent_factory
+from .registry import agent_registry
 
-__all__ = ["agent_factory"]
+__all__ = ["agent_factory", "agent_registry"]
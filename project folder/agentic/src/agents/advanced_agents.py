@@ -4,21 +4,19 @@ Advanced agents for query processing and response enhancement
 import json
 import re
 from agno.agent import Agent
-from agno.models.mistral import MistralChat
 
-from ..config.settings import settings
+from ..utils.lifecycle import LazyService
+from .registry import agent_registry, registered_agent
 
 
 class AdvancedAgentFactory:
     """Factory for creating advanced processing agents"""
     
     def __init__(self):
-        """Initialize Mistral model"""
-        self.model = MistralChat(
-            id=settings.MISTRAL_MODEL_ID,
-            temperature=settings.MISTRAL_TEMPERATURE
-        )
+        """Use the process-wide Mistral client"""
+        self.model = agent_registry.get_model()
     
+    @registered_agent
     def create_query_analyzer_agent(self) -> Agent:
         """
         Agent Query Analyzer - Creates summary (<100 words) and extracts 5-10 keywords.
@@ -65,6 +63,7 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_query_intent_agent(self) -> Agent:
         """
         Agent that determines the specific intent behind the user's query.
@@ -113,6 +112,59 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
+    def create_fused_front_end_agent(self) -> Agent:
+        """
+        Agent Fused Front-End - classification, query analysis, language detection
+        and context enrichment in a single call (FUSED_FRONTEND_ENABLED).
+        Output is validated against FusedFrontEndResult.
+        """
+        return Agent(
+            name="Fused Front-End Agent",
+            model=self.model,
+            description="Classifies, analyzes, detects the language of and enriches a Doxa support query in one pass.",
+            markdown=False,
+            instructions=[
+                "Process the user's support query for the Doxa project management platform.",
+                "",
+                "1. CATEGORY (check in order, use the first match):",
+                "   - 'spam' - gibberish, random characters, nonsense, repeated words",
+                "   - 'aggressive' - hostile, abusive, threatening language",
+                "   - 'sensitive' - contains personal sensitive data (SSN, credit cards, etc.)",
+                "   - 'out_of_scope' - unrelated topics (geography, weather, cooking, general knowledge, etc.)",
+                "   - 'ambiguous' - too vague, lacks context (e.g. 'help', 'i need help')",
+                "   - 'doxa_related' - valid specific query about Doxa (projects, tasks, pricing, account, integrations...)",
+                "   General knowledge questions MUST be 'out_of_scope'. DO NOT answer the question.",
+                "",
+                "2. SUMMARY of the query (MAXIMUM 100 words, ideally 30-50 words) and its word_count",
+                "",
+                "3. 5-10 KEYWORDS: main topics, actions, entities and domain terms (Doxa, project, task...)",
+                "",
+                "4. INTENT: how_to, information, troubleshooting, comparison, pricing, feature_request, account, complaint",
+                "",
+                "5. LANGUAGE of the query: fr, en, ar or es (dominant language if mixed, 'fr' if uncertain)",
+                "",
+                "6. ENRICHED_QUERY for document retrieval (required when category is doxa_related):",
+                "   - Expand abbreviations ('PM' → 'project management')",
+                "   - Add domain context and synonyms ('pricing' → 'subscription, plans, cost, billing')",
+                "   - Keep it concise, focus on terms that will match documentation",
+                "",
+                "OUTPUT FORMAT (STRICT JSON):",
+                "{",
+                '  "category": "doxa_related",',
+                '  "summary": "Brief summary of user intent in under 100 words",',
+                '  "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"],',
+                '  "word_count": <number of words in summary>,',
+                '  "intent": "how_to",',
+                '  "language": "fr",',
+                '  "enriched_query": "query with additional context terms"',
+                "}",
+                "",
+                "IMPORTANT: Return ONLY valid JSON. No markdown, no explanation, no additional text."
+            ]
+        )
+    
+    @registered_agent
     def create_context_enrichment_agent(self) -> Agent:
         """
         Agent that enriches the query with additional context for better RAG retrieval.
@@ -159,6 +211,7 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_response_validation_agent(self) -> Agent:
         """
         Agent that validates if the RAG response actually answers the user's question.
@@ -214,6 +267,7 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_language_detector_agent(self) -> Agent:
         """
         Agent that detects the language of the user's query.
@@ -249,6 +303,7 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_response_composer_agent(self) -> Agent:
         """
         Agent Response Composer - Formats AI responses with structured template.
@@ -316,6 +371,7 @@ class AdvancedAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_confidence_scoring_agent(self) -> Agent:
         """
         Agent that calculates a confidence score for the response quality.
@@ -372,4 +428,4 @@ class AdvancedAgentFactory:
 
 
 # Global factory instance
-advanced_agent_factory = AdvancedAgentFactory()
+advanced_agent_factory = LazyService("advanced_agent_factory", AdvancedAgentFactory)
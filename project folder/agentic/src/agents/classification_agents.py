@@ -2,21 +2,19 @@
 Classification agents for query categorization
 """
 from agno.agent import Agent
-from agno.models.mistral import MistralChat
 
-from ..config.settings import settings
+from ..utils.lifecycle import LazyService
+from .registry import agent_registry, registered_agent
 
 
 class AgentFactory:
     """Factory for creating classification agents"""
     
     def __init__(self):
-        """Initialize Mistral model"""
-        self.model = MistralChat(
-            id=settings.MISTRAL_MODEL_ID,
-            temperature=settings.MISTRAL_TEMPERATURE
-        )
+        """Use the process-wide Mistral client"""
+        self.model = agent_registry.get_model()
     
+    @registered_agent
     def create_rag_agent(self) -> Agent:
         """Create RAG validation agent"""
         return Agent(
@@ -55,6 +53,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_spam_agent(self) -> Agent:
         """Create spam detection agent"""
         return Agent(
@@ -74,6 +73,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_ambiguous_agent(self) -> Agent:
         """Create ambiguity detection agent"""
         return Agent(
@@ -100,6 +100,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_aggressive_agent(self) -> Agent:
         """Create aggression detection agent"""
         return Agent(
@@ -120,6 +121,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_sensitive_agent(self) -> Agent:
         """Create sensitive data detection agent"""
         return Agent(
@@ -140,6 +142,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_out_of_scope_agent(self) -> Agent:
         """Create out-of-scope detection agent"""
         return Agent(
@@ -176,6 +179,7 @@ class AgentFactory:
             ]
         )
     
+    @registered_agent
     def create_classification_confidence_agent(self) -> Agent:
         """Create classification confidence scoring agent"""
         return Agent(
@@ -210,7 +214,10 @@ class AgentFactory:
 
 
 # Global factory instance
-agent_factory = AgentFactory()
+agent_factory = LazyService("agent_factory", AgentFactory)
 
 # Create confidence agent instance
-classification_confidence_agent = agent_factory.create_classification_confidence_agent()
+classification_confidence_agent = LazyService(
+    "classification_confidence_agent",
+    lambda: agent_factory.create_classification_confidence_agent()
+)
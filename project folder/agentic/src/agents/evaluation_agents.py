@@ -4,21 +4,19 @@ These agents validate retrieved documents before response generation
 """
 from agno.agent import Agent
 from agno.team import Team
-from agno.models.mistral import MistralChat
 
-from ..config.settings import settings
+from ..utils.lifecycle import LazyService
+from .registry import agent_registry, registered_agent
 
 
 class EvaluationAgentFactory:
     """Factory for creating document evaluation agents"""
     
     def __init__(self):
-        """Initialize Mistral model"""
-        self.model = MistralChat(
-            id=settings.MISTRAL_MODEL_ID,
-            temperature=settings.MISTRAL_TEMPERATURE
-        )
+        """Use the process-wide Mistral client"""
+        self.model = agent_registry.get_model()
     
+    @registered_agent
     def create_contradiction_agent(self) -> Agent:
         """
         Agent that detects contradictory information in retrieved documents.
@@ -53,6 +51,7 @@ class EvaluationAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_missing_knowledge_agent(self) -> Agent:
         """
         Agent that detects if retrieved documents lack necessary information.
@@ -88,6 +87,7 @@ class EvaluationAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_multiple_answers_agent(self) -> Agent:
         """
         Agent that detects if documents provide multiple valid answers.
@@ -115,6 +115,7 @@ class EvaluationAgentFactory:
             ]
         )
     
+    @registered_agent
     def create_evaluation_team(self) -> Team:
         """
         Creates a team that evaluates retrieved document quality.
@@ -160,6 +161,43 @@ class EvaluationAgentFactory:
             ]
         )
     
+    @registered_agent
+    def create_single_pass_evaluation_agent(self) -> Agent:
+        """
+        Single-call replacement for the evaluation team (EVALUATION_MODE=single_pass).
+        Scores each document's relevance and returns the verdict as JSON
+        validated against DocumentEvaluation.
+        """
+        return Agent(
+            name="Single-Pass Evaluation Agent",
+            model=self.model,
+            description="Scores retrieved documents and decides whether they are good enough for RAG generation.",
+            markdown=False,
+            instructions=[
+                "Evaluate retrieved documents for quality issues before RAG generation.",
+                "",
+                "1. Score each document's RELEVANCE to the query from 0.0 (unrelated) to 1.0 (answers it).",
+                "",
+                "2. Pick ONE verdict (BE VERY LENIENT, check in order):",
+                "   - 'safe' - DEFAULT CHOICE. Use if ANY document has relevant info.",
+                "   - 'multiple_answers' - documents provide multiple valid options (this is fine!)",
+                "   - 'contradictory' - ONLY for MAJOR direct conflicts (very rare!)",
+                "   - 'missing_knowledge' - ONLY if 100% of docs are completely unrelated (very rare!)",
+                "",
+                "KEY PRINCIPLE: If even ONE document contains something useful, the verdict is 'safe'.",
+                "Off-topic documents mixed with relevant ones = 'safe' (ignore the bad ones).",
+                "",
+                "OUTPUT FORMAT (STRICT JSON):",
+                "{",
+                '  "documents": [{"index": 1, "relevance": 0.9}, {"index": 2, "relevance": 0.1}],',
+                '  "verdict": "safe"',
+                "}",
+                "",
+                "IMPORTANT: Return ONLY valid JSON. No markdown, no explanation, no additional text."
+            ]
+        )
+    
+    @registered_agent
     def create_evaluation_confidence_agent(self) -> Agent:
         """
         Agent that scores confidence in evaluation decision.
@@ -198,7 +236,10 @@ class EvaluationAgentFactory:
 
 
 # Global factory instance
-evaluation_agent_factory = EvaluationAgentFactory()
+evaluation_agent_factory = LazyService("evaluation_agent_factory", EvaluationAgentFactory)
 
 # Create confidence agent instance
-evaluation_confidence_agent = evaluation_agent_factory.create_evaluation_confidence_agent()
\ No newline at end of file
+evaluation_confidence_agent = LazyService(
+    "evaluation_confidence_agent",
+    lambda: evaluation_agent_factory.create_evaluation_confidence_agent()
+)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Process-wide registry of agno agents and model clients
+Each agent is built once per process and all agents share one MistralChat
+client (and its HTTP connection pool). agno assembles each agent's system
+prompt from the agent definition, which carries no per-request context, so the
+prompt is a byte-identical prefix on every call; the registry keeps agno's
+output for callers that send the prompt elsewhere (routing, token estimates)
+"""
+import functools
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agno.agent import Agent
+from agno.models.mistral import MistralChat
+from agno.run.base import RunContext
+from agno.session import AgentSession
+
+from ..config.settings import settings
+from ..utils.llm_cache import CachedAgent, llm_cache
+
+
+def agno_system_prompt(agent: Agent) -> str:
+    """
+    System prompt agno assembles for a run of this agent.
+
+    agno builds it from the agent definition (description, role,
+    instructions, expected_output, markdown, output schema...); nothing in
+    it depends on the request, so it is the same text on every run.
+    """
+    context = RunContext(run_id="system-prompt", session_id="system-prompt", output_schema=agent.output_schema)
+    message = agent.get_system_message(session=AgentSession(session_id="system-prompt"), run_context=context)
+    return str(message.content) if message is not None and message.content else ""
+
+
+class AgentRegistry:
+    """Builds each agent/team once and shares model clients across them"""
+
+    def __init__(self):
+        self._agents: Dict[str, object] = {}
+        self._system_prompts: Dict[str, str] = {}
+        self._models: Dict[Tuple[str, float, Optional[int]], MistralChat] = {}
+        # Re-entrant: building a team builds its member agents through the registry
+        self._lock = threading.RLock()
+
+    def get_model(self, model_id: str = None, temperature: float = None, max_tokens: int = None) -> MistralChat:
+        """
+        Shared MistralChat client for a (model id, temperature, max tokens) combination.
+
+        Args:
+            model_id: Mistral model id (defaults to settings)
+            temperature: Sampling temperature (defaults to settings)
+            max_tokens: Completion token cap (None leaves it to the provider)
+        """
+        key = (
+            model_id or settings.MISTRAL_MODEL_ID,
+            settings.MISTRAL_TEMPERATURE if temperature is None else temperature,
+            max_tokens
+        )
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = MistralChat(id=key[0], temperature=key[1], max_tokens=key[2])
+            return self._models[key]
+
+    def get_or_build(self, name: str, builder: Callable[[], object]):
+        """
+        Return the cached agent called name, building it on first request.
+
+        The system prompt agno builds for each agent is kept (see
+        system_prompt). Agents listed in LLM_CACHE_TTLS are wrapped in the LLM
+        response cache.
+        """
+        with self._lock:
+            if name not in self._agents:
+                agent = builder()
+                if isinstance(agent, Agent):
+                    self._system_prompts[agent.name] = agno_system_prompt(agent)
+                if getattr(agent, "name", None) in settings.LLM_CACHE_TTLS:
+                    agent = CachedAgent(agent, llm_cache)
+                self._agents[name] = agent
+            return self._agents[name]
+
+    def system_prompt(self, agent) -> str:
+        """
+        System prompt of a registered agent as agno sends it; an explicit
+        system_message for agents built elsewhere, '' for teams
+        """
+        with self._lock:
+            prompt = self._system_prompts.get(getattr(agent, "name", None))
+        if prompt is not None:
+            return prompt
+        system_message = getattr(agent, "system_message", None)
+        return system_message if isinstance(system_message, str) else ""
+
+    def get(self, name: str) -> Optional[object]:
+        """Cached agent by name, or None if it was never built"""
+        return self._agents.get(name)
+
+    def names(self) -> List[str]:
+        """Names of the agents built so far"""
+        return list(self._agents)
+
+
+def registered_agent(method: Callable) -> Callable:
+    """
+    Decorator for factory create_*_agent methods: build once, then reuse.
+
+    The agent is registered as '<FactoryClass>.<method name>'.
+    """
+    @functools.wraps(method)
+    def wrapper(self):
+        name = f"{type(self).__name__}.{method.__name__}"
+        return agent_registry.get_or_build(name, lambda: method(self))
+    return wrapper
+
+
+# Global instance
+agent_registry = AgentRegistry()
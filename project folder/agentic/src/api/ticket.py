@@ -1,9 +1,11 @@
 """
 FastAPI endpoints for ticket processing
 """
-from fastapi import APIRouter, HTTPException
-from typing import Dict
+from fastapi import APIRouter, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
 
+from ..config.settings import settings
 from ..schemas.ticket import (
     TicketRequest, TicketResponse, RAGRequest, RAGResponse,
     QueryAnalysis, SensitiveDataInfo, PipelineMetrics
@@ -11,11 +13,18 @@ from ..schemas.ticket import (
 from ..services.ticket_service import ticket_service
 from ..services.enhanced_complaint_service import enhanced_ticket_service
 from ..services.rag_service import rag_service
+from ..utils.llm_cache import llm_cache
+from ..utils.llm_router import llm_router
+from ..utils.llm_usage import usage_ledger
+from ..utils.rate_limiter import rate_limiters
 
 router = APIRouter()
 
 @router.post("/process-enhanced", response_model=TicketResponse)
-async def process_ticket_enhanced(request: TicketRequest) -> Dict:
+async def process_ticket_enhanced(
+    request: TicketRequest,
+    x_request_timeout_ms: Optional[int] = Header(None)
+) -> Dict:
     """
     Process ticket through ENHANCED agentic pipeline with all agents.
     
@@ -30,11 +39,18 @@ async def process_ticket_enhanced(request: TicketRequest) -> Dict:
     
     Full latency instrumentation with trace_id.
     Target: <10s end-to-end (<5s is ideal)
+    
+    The caller's X-Request-Timeout-Ms header sets the request deadline;
+    optional stages degrade to local fallbacks when it gets close.
     """
     try:
-        result = enhanced_ticket_service.process_ticket(
+        # Worker thread: concurrent tickets run (and coalesce) without blocking the event loop
+        result = await run_in_threadpool(
+            enhanced_ticket_service.process_ticket,
             request.description, 
-            ticket_id=request.ticket_id
+            ticket_id=request.ticket_id,
+            timeout_ms=x_request_timeout_ms,
+            category=request.category
         )
         
         # Convert confidence_score to 0-100 scale if it's 0-1
@@ -80,7 +96,22 @@ async def process_ticket_enhanced(request: TicketRequest) -> Dict:
             llm_calls=metrics_data.get("llm_calls", 0),
             rag_attempts=metrics_data.get("rag_attempts", 1),
             had_errors=metrics_data.get("had_errors", False),
-            stages=metrics_data.get("stages", [])
+            stages=metrics_data.get("stages", []),
+            evaluation_decisions=metrics_data.get("evaluation_decisions", {}),
+            context_tokens_raw=metrics_data.get("context_tokens_raw", 0),
+            context_tokens_packed=metrics_data.get("context_tokens_packed", 0),
+            prefetch_outcome=metrics_data.get("prefetch_outcome"),
+            deadline_ms=metrics_data.get("deadline_ms"),
+            leader_trace_id=metrics_data.get("leader_trace_id"),
+            degraded_stages=metrics_data.get("degraded_stages", []),
+            llm_call_events=metrics_data.get("llm_call_events", {}),
+            llm_queue_wait_ms=metrics_data.get("llm_queue_wait_ms", 0),
+            prompt_tokens=metrics_data.get("prompt_tokens", 0),
+            completion_tokens=metrics_data.get("completion_tokens", 0),
+            cost_usd=metrics_data.get("cost_usd", 0.0),
+            llm_usage=metrics_data.get("llm_usage", {}),
+            llm_usage_by_stage=metrics_data.get("llm_usage_by_stage", {}),
+            spans=metrics_data.get("spans", [])
         ) if metrics_data else None
         
         return TicketResponse(
@@ -103,6 +134,30 @@ async def process_ticket_enhanced(request: TicketRequest) -> Dict:
         raise HTTPException(status_code=500, detail=f"Error processing ticket: {str(e)}")
 
 
+@router.get("/llm-cache/stats")
+async def llm_cache_stats():
+    """LLM response cache size and hit rates (overall and per agent)"""
+    return {"enabled": settings.LLM_CACHE_ENABLED, **llm_cache.stats()}
+
+
+@router.get("/llm-usage/stats")
+async def llm_usage_stats():
+    """Tokens, latency and cost per agent since startup"""
+    return usage_ledger.stats()
+
+
+@router.get("/llm-routing/stats")
+async def llm_routing_stats():
+    """Rolling p95 latency and error rate per routed provider:model target"""
+    return {"enabled": settings.LLM_ROUTING_ENABLED, "targets": llm_router.stats()}
+
+
+@router.get("/rate-limits/stats")
+async def rate_limit_stats():
+    """Queue waits, 429s and current adaptive concurrency limit per LLM provider"""
+    return {"enabled": settings.RATE_LIMIT_ENABLED, "providers": rate_limiters.stats()}
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
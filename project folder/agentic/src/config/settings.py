@@ -20,6 +20,9 @@ class Settings(BaseSettings):
     # Project Settings
     PROJECT_NAME: str = "Doxa Agentic AI"
     API_V1_STR: str = "/api/v1"
+    WARM_UP_ON_STARTUP: bool = True  # Load models/agents at startup; /readyz is 503 until done
+    WARM_UP_MAX_RETRIES: int = 5  # Retries of a failed warm-up, resuming at the failed stage
+    WARM_UP_RETRY_DELAY: float = 2.0  # Seconds before the first retry, doubled per retry (capped at 60s)
     
     # AI/RAG Settings (use .env file or environment variables - NEVER hardcode!)
     GEMINI_API_KEY: str = ""  # Set via .env or GEMINI_API_KEY env var
@@ -30,25 +33,127 @@ class Settings(BaseSettings):
     BGE_USE_FP16: bool = True
     BGE_MAX_LENGTH: int = 8192 
     
+    # Embedding Backend Settings
+    EMBEDDING_BACKEND: str = "torch"  # torch or onnx (ONNX Runtime on CPU)
+    ONNX_MODEL_DIR: str = "data/onnx/bge-m3"
+    ONNX_QUANTIZE_INT8: bool = False  # Dynamic int8 quantization of the ONNX model
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = onnxruntime default
+    
     # ChromaDB Settings
     CHROMA_PERSIST_PATH: str = "data/chroma_archive"
     CHROMA_COLLECTION_NAME: str = "test_collection"
     CHROMA_N_RESULTS: int = 2
     
+    # Vector Quantization Settings
+    VECTOR_QUANTIZATION: str = "none"  # none, int8 or binary
+    QUANTIZED_INDEX_DIR: str = "data/quantized_index"
+    QUANTIZED_RESCORE_MULTIPLIER: int = 10  # Shortlist = n_results * multiplier
+    QUANTIZED_INDEX_REBUILD_DELAY: float = 5.0  # Seconds writes are batched before the stale index is rebuilt in the background
+    
     # Data Paths
     DATA_DIR: str = "data"
     EMBEDDINGS_DIR: str = "data/embeddings"
     RAW_DOCS_DIR: str = "data/raw_docs"
     
+    # Ingestion Settings
+    INGEST_SPLITTER: str = "recursive"  # recursive, character or markdown
+    INGEST_CHUNK_SIZE: int = 1000
+    INGEST_CHUNK_OVERLAP: int = 100
+    INGEST_EMBED_BATCH_SIZE: int = 12
+    INGEST_WRITE_PAGE_SIZE: int = 256
+    INGEST_CHECKPOINT_DIR: str = "data/ingest_checkpoints"
+    INGEST_WORKERS: int = 1  # >1 shards embedding across worker processes
+    INGEST_TORCH_THREADS: int = 0  # Torch threads per worker (0 = cores / workers)
+    
     # Gemini Settings
     GEMINI_MODEL_NAME: str = "gemini-2.5-flash"
     GEMINI_MAX_OUTPUT_TOKENS: int = 100000
     GEMINI_TEMPERATURE: float = 0.0
+    GEMINI_THINKING_TOKEN_ALLOWANCE: int = 2048  # Added to answer caps (2.5 models count thinking as output)
+    
+    # RAG Context Settings
+    RAG_CONTEXT_TOKEN_BUDGET: int = 4000  # Input tokens for retrieved chunks in the RAG prompt
+    RAG_DEDUP_THRESHOLD: float = 0.85  # Estimated Jaccard at which chunks count as near-duplicates
+    RAG_OUTPUT_TOKEN_CAP: int = 768  # Answer tokens when the intent has no specific cap
     
     # Mistral Settings
     MISTRAL_MODEL_ID: str = "mistral-small-latest"
     MISTRAL_TEMPERATURE: float = 0.1
     
+    # Pipeline Settings
+    FUSED_FRONTEND_ENABLED: bool = False  # One LLM call for classification + analysis + language + enrichment
+    EVALUATION_MODE: str = "team"  # team (3 agents + leader) or single_pass (one scored call)
+    EVALUATION_GATE_ENABLED: bool = False  # Skip the evaluation LLM when top similarity is clearly high/low
+    EVALUATION_GATE_HIGH: float = 0.75  # Top cosine similarity >= this: safe without LLM
+    EVALUATION_GATE_LOW: float = 0.35  # Top cosine similarity < this: missing_knowledge without LLM
+    CONFIDENCE_AGENT_ENABLED: bool = False  # Extra confidence-agent call instead of Gemini's structured self-assessment
+    CONFIDENCE_SELF_WEIGHT: float = 0.6  # Weight of Gemini's self-assessment vs. retrieval-similarity features
+    RESPONSE_COMPOSITION_MODE: str = "template"  # template (local, no LLM) or polish (Response Composer agent)
+    RAG_RETRIEVAL_MODE: str = "sequential"  # sequential (retry rounds) or speculative (one retrieval, prefixes evaluated together)
+    PIPELINE_DEADLINE_MS: int = 30000  # Per-request deadline; a shorter X-Request-Timeout-Ms from the caller wins
+    PIPELINE_DEADLINE_MARGIN_MS: int = 500  # Kept off the caller's timeout for sending the response back
+    RAG_PREFETCH_ENABLED: bool = False  # Retrieve on the raw ticket text while enrichment runs, then fuse
+    RAG_PREFETCH_KEEP_OVERLAP: float = 0.8  # Keep the raw results when this share of enriched results matches
+    RAG_MULTI_VECTOR_ENABLED: bool = False  # Also search with the original text, summary and keywords (fused with RRF)
+    RAG_CATEGORY_FILTER_ENABLED: bool = False  # Search within the ticket's category first (chunks tagged at ingest)
+    SINGLE_FLIGHT_ENABLED: bool = False  # Identical concurrent tickets share one pipeline run
+    
+    # LLM Cache Settings
+    LLM_CACHE_ENABLED: bool = False  # Serve repeated inputs of deterministic agents from the cache
+    LLM_CACHE_MAX_ENTRIES: int = 2048  # In-memory LRU size
+    LLM_CACHE_PATH: str = ""  # SQLite file persisting cached responses (memory only when empty)
+    LLM_CACHE_TTLS: dict = {  # Seconds per agent name; agents not listed are never cached
+        "Query Classifier": 86400,
+        "Language Detector Agent": 604800,
+        "Query Analyzer Agent": 86400,
+        "Context Enrichment Agent": 86400,
+        "Gemini RAG Generation": 3600
+    }
+    
+    # LLM Call Settings
+    LLM_CALL_TIMEOUT_SECONDS: float = 30.0  # Per-attempt timeout for agents not in LLM_CALL_TIMEOUTS
+    LLM_CALL_TIMEOUTS: dict = {  # Per-attempt timeout in seconds, per agent name
+        "Language Detector Agent": 10.0,
+        "Query Classifier": 20.0,
+        "Chunk Evaluation Team": 45.0,
+        "Gemini RAG Generation": 45.0
+    }
+    LLM_CALL_MAX_RETRIES: int = 2  # Retries of timed-out, rate-limited (429) or 5xx calls
+    LLM_RETRY_BASE_DELAY: float = 0.5  # Backoff base in seconds (full jitter, doubled per retry)
+    LLM_RETRY_MAX_DELAY: float = 8.0  # Backoff cap in seconds
+    LLM_HEDGING_ENABLED: bool = False  # Fire a duplicate call once a call outlives the agent's p95 latency
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latency samples an agent needs before its calls are hedged
+    LLM_CALL_WORKERS: int = 32  # Threads running LLM calls (attempts and hedges)
+    LLM_MAX_ABANDONED_CALLS: int = 8  # Timed-out calls still running before timeouts stop being retried or hedged
+    
+    # LLM Routing Settings
+    LLM_ROUTING_ENABLED: bool = False  # Serve the roles in LLM_ROUTES from their fastest healthy provider
+    LLM_ROUTES: dict = {  # Allowed "provider:model" targets per agent name, preferred first; a bare provider means its configured model (MISTRAL_MODEL_ID / GEMINI_MODEL_NAME); unlisted roles stay on their own model
+        "Query Classifier": ["mistral", "gemini"],
+        "Language Detector Agent": ["mistral", "gemini"],
+        "Query Analyzer Agent": ["mistral", "gemini"],
+        "Context Enrichment Agent": ["mistral", "gemini"],
+        "Gemini RAG Generation": ["gemini", "mistral"]
+    }
+    LLM_ROUTE_MIN_SAMPLES: int = 10  # Calls a target needs before its latency/error stats are used
+    LLM_ROUTE_MAX_ERROR_RATE: float = 0.3  # Error rate at which a target is treated as degraded
+    LLM_ROUTE_EXPLORE_RATE: float = 0.05  # Share of calls sent to another target first, so stats stay fresh and degraded targets recover
+    
+    # LLM Pricing Settings
+    LLM_PRICING: dict = {  # USD per million tokens, per model id (for cost accounting)
+        "mistral-small-latest": {"input": 0.1, "output": 0.3},
+        "mistral-medium-latest": {"input": 0.4, "output": 2.0},
+        "mistral-large-latest": {"input": 2.0, "output": 6.0},
+        "gemini-2.5-flash": {"input": 0.3, "output": 2.5}
+    }
+    
+    # Rate Limit Settings
+    RATE_LIMIT_ENABLED: bool = False  # Throttle outgoing LLM calls per provider
+    RATE_LIMITS: dict = {  # Requests/min, tokens/min (0 = unlimited) and AIMD concurrency bounds per provider
+        "mistral": {"rpm": 300, "tpm": 500000, "initial_concurrency": 4, "max_concurrency": 16},
+        "gemini": {"rpm": 1000, "tpm": 1000000, "initial_concurrency": 4, "max_concurrency": 16}
+    }
+    
     # Backend Integration
     BACKEND_API_URL: str = "http://localhost:8000"
     
@@ -1,15 +1,52 @@
 """
 Main FastAPI application for Agentic AI service
 """
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from .config.settings import settings
 from .api import ticket
+from .utils.lifecycle import service_registry
+
+
+# Components loaded at startup, in order; each stage only starts once the previous one is loaded
+WARM_UP_STAGES = [
+    ["encoder"],
+    ["enhanced_rag_service"],
+    ["agent_factory", "advanced_agent_factory", "evaluation_agent_factory"],
+    ["classification_service", "enhanced_ticket_service"]
+]
+
+
+def _warm_encoder(encoder) -> None:
+    """Dummy encode so weights are paged in and kernels/allocations are done before traffic"""
+    encoder.encode(["Doxa warm-up"], batch_size=1, max_length=settings.BGE_MAX_LENGTH)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warm-up in the background so /livez answers while models load"""
+    if settings.WARM_UP_ON_STARTUP:
+        print("🚀 Warming up agentic services...")
+        threading.Thread(
+            target=service_registry.warm_up,
+            args=(WARM_UP_STAGES, {"encoder": _warm_encoder}, settings.WARM_UP_MAX_RETRIES, settings.WARM_UP_RETRY_DELAY),
+            name="service-warm-up",
+            daemon=True
+        ).start()
+    else:
+        service_registry.mark_ready()
+    yield
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -43,3 +80,25 @@ async def root():
 async def health():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/livez")
+async def livez():
+    """Liveness probe: the process is up and serving"""
+    return {"status": "alive", "components": service_registry.component_status()}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 503 until warm-up has loaded every startup component"""
+    body = {
+        "status": "ready" if service_registry.ready else "warming_up",
+        "warm_up_ms": service_registry.warm_up_ms,
+        "components": service_registry.component_status()
+    }
+    if service_registry.warm_up_error:
+        body["status"] = "failed" if service_registry.warm_up_gave_up else "retrying"
+        body["error"] = service_registry.warm_up_error
+        body["failed_stage"] = service_registry.failed_stage
+        body["attempts"] = service_registry.warm_up_attempts
+    return JSONResponse(content=body, status_code=200 if service_registry.ready else 503)
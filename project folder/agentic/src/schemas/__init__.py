@@ -1,12 +1,15 @@
 """
 Schemas package initialization
 """
-from .ticket import TicketRequest, TicketResponse, RAGRequest, RAGResponse, QueryCategory
+from .ticket import (
+    TicketRequest, TicketResponse, RAGRequest, RAGResponse, QueryCategory, FusedFrontEndResult
+)
 
 __all__ = [
     "TicketRequest",
     "TicketResponse",
     "RAGRequest",
     "RAGResponse",
-    "QueryCategory"
+    "QueryCategory",
+    "FusedFrontEndResult"
 ]
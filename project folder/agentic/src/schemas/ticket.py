@@ -1,8 +1,8 @@
 """
 Pydantic models for request/response schemas
 """
-from pydantic import BaseModel, Field
-from typing import Literal, Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, Literal, Optional, List
 
 
 class QueryCategory(BaseModel):
@@ -28,6 +28,42 @@ class QueryAnalysis(BaseModel):
     intent: Optional[str] = Field(None, description="Detected intent category")
 
 
+class FusedFrontEndResult(QueryCategory, QueryAnalysis):
+    """Fused front-end output - classification, analysis, language and enriched query in one call"""
+    language: Literal["fr", "en", "ar", "es"] = Field(..., description="Detected language code")
+    enriched_query: Optional[str] = Field(None, description="Retrieval query enriched with domain context")
+
+    @model_validator(mode="after")
+    def require_enrichment_for_rag(self) -> "FusedFrontEndResult":
+        """doxa_related queries go to RAG, so they must come with an enriched query"""
+        if self.category == "doxa_related" and not (self.enriched_query or "").strip():
+            raise ValueError("enriched_query is required for doxa_related queries")
+        return self
+
+
+class DocumentRelevance(BaseModel):
+    """Relevance of one retrieved document to the query"""
+    index: int = Field(..., ge=1, description="1-based document position")
+    relevance: float = Field(..., ge=0.0, le=1.0, description="Relevance score 0-1")
+
+
+class DocumentEvaluation(BaseModel):
+    """Single-pass evaluation output - per-document relevance + verdict"""
+    documents: List[DocumentRelevance] = Field(default_factory=list)
+    verdict: Literal[
+        "safe",
+        "multiple_answers",
+        "contradictory",
+        "missing_knowledge"
+    ] = Field(..., description="Document quality verdict")
+
+
+class GeneratedAnswer(BaseModel):
+    """Structured Gemini output - answer + self-assessed confidence"""
+    answer: str = Field(..., description="Answer grounded in the retrieved documents")
+    confidence: int = Field(..., ge=0, le=100, description="Self-assessed confidence 0-100")
+
+
 class SensitiveDataInfo(BaseModel):
     """Sensitive data detection details"""
     detected: bool = Field(False, description="Whether sensitive data was detected")
@@ -46,6 +82,45 @@ class PipelineMetrics(BaseModel):
     rag_attempts: int = Field(1, description="Number of RAG retrieval attempts")
     had_errors: bool = Field(False, description="Whether any errors occurred")
     stages: List[str] = Field(default_factory=list, description="Pipeline stages executed")
+    evaluation_decisions: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Document evaluations by decider (gate_high, gate_low, single_pass, team)"
+    )
+    context_tokens_raw: int = Field(0, description="Estimated tokens of retrieved chunks before packing")
+    context_tokens_packed: int = Field(0, description="Estimated tokens of RAG context after packing")
+    prefetch_outcome: Optional[str] = Field(
+        None,
+        description="Raw-text retrieval run during enrichment: kept_raw, fused or failed"
+    )
+    deadline_ms: Optional[int] = Field(None, description="Request deadline the pipeline ran under")
+    leader_trace_id: Optional[str] = Field(
+        None,
+        description="Trace ID of the identical in-flight run this request was coalesced with"
+    )
+    degraded_stages: List[str] = Field(
+        default_factory=list,
+        description="Optional stages skipped or replaced by local fallbacks to meet the deadline"
+    )
+    llm_call_events: Dict[str, int] = Field(
+        default_factory=dict,
+        description="LLM-call retries, hedges, hedge_wins and timeouts"
+    )
+    llm_queue_wait_ms: int = Field(0, description="Time LLM calls waited for provider rate limits")
+    prompt_tokens: int = Field(0, description="Prompt tokens of all LLM calls, retries and hedges included")
+    completion_tokens: int = Field(0, description="Completion tokens of all LLM calls")
+    cost_usd: float = Field(0.0, description="LLM cost in USD (see LLM_PRICING)")
+    llm_usage: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Model, calls, tokens, latency and cost per agent"
+    )
+    llm_usage_by_stage: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Calls, tokens and cost per pipeline stage"
+    )
+    spans: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Span tree (name, start_ms, latency_ms, attributes, children) with stages at the root"
+    )
 
 
 class TicketRequest(BaseModel):
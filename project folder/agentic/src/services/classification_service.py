@@ -3,11 +3,12 @@ Classification service for query categorization
 Enhanced with regex-based sensitive data detection for 100% escalation
 """
 from agno.agent import Agent
-from agno.models.mistral import MistralChat
 from typing import Dict, Tuple, Optional
 
 from ..agents.classification_agents import agent_factory
-from ..config.settings import settings
+from ..agents.registry import agent_registry
+from ..utils.lifecycle import LazyService
+from ..utils.llm_call import run_agent
 from ..utils.sensitive_data_detector import sensitive_data_detector
 
 
@@ -16,16 +17,20 @@ class ClassificationService:
     
     def __init__(self):
         """Initialize classification team and sensitive data detector"""
-        self.model = MistralChat(
-            id=settings.MISTRAL_MODEL_ID,
-            temperature=settings.MISTRAL_TEMPERATURE
-        )
+        self.model = agent_registry.get_model()
         
         # Sensitive data detector (regex-based) for 100% escalation
         self.sensitive_detector = sensitive_data_detector
         
-        # Create classification agent (using Agent directly as Team does not accept these args)
-        self.classification_team = Agent(
+        # Classification agent, built once per process by the registry
+        self.classification_team = agent_registry.get_or_build(
+            "ClassificationService.classification_team",
+            self._build_classification_agent
+        )
+    
+    def _build_classification_agent(self) -> Agent:
+        """Create classification agent (using Agent directly as Team does not accept these args)"""
+        return Agent(
             model=self.model,
             name="Query Classifier",
             description="Classifies user queries for Doxa platform support.",
@@ -94,7 +99,7 @@ class ClassificationService:
             return "sensitive"
         
         # STEP 2: Run LLM-based classification for other categories
-        response = self.classification_team.run(query)
+        response = run_agent(self.classification_team, query)
         classification = response.content.strip().lower()
         return classification
     
@@ -131,7 +136,7 @@ class ClassificationService:
             }
         else:
             # Run LLM classification
-            response = self.classification_team.run(query)
+            response = run_agent(self.classification_team, query)
             result["classification"] = response.content.strip().lower()
         
         return result
@@ -182,4 +187,4 @@ class ClassificationService:
 
 
 # Global instance
-classification_service = ClassificationService()
+classification_service = LazyService("classification_service", ClassificationService)
@@ -2,13 +2,40 @@
 Data management utilities for ChromaDB operations
 """
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Dict, Optional
 from chromadb import PersistentClient
-from FlagEmbedding import BGEM3FlagModel
 import json
+import numpy as np
 
 from ..config.settings import settings
+from .ingestion_service import (
+    IngestionPipeline,
+    bump_collection_version,
+    create_splitter,
+    embedding_model_version,
+    get_collection_version
+)
+from ..utils.embedding_pool import EmbeddingWorkerPool
+from ..utils.encoder_backends import get_shared_encoder
+from ..utils.lifecycle import LazyService
+from ..utils.vector_quantization import (
+    QuantizedVectorIndex,
+    build_index_from_collection,
+    load_quantized_index,
+    invalidate_quantized_index,
+    is_quantized_index_stale,
+    mark_quantized_index_stale,
+    query_quantized_index
+)
+
+
+# File names of the binary export layout
+BINARY_EXPORT_MANIFEST = "manifest.json"
+BINARY_EXPORT_EMBEDDINGS = "embeddings.npy"
+BINARY_EXPORT_RECORDS = "records.jsonl"
 
 
 class ChromaDBManager:
@@ -23,10 +50,9 @@ class ChromaDBManager:
         """
         self.persist_path = persist_path or settings.CHROMA_PERSIST_PATH
         self.client = PersistentClient(path=self.persist_path)
-        self.bge_model = BGEM3FlagModel(
-            settings.BGE_MODEL_NAME,
-            use_fp16=settings.BGE_USE_FP16
-        )
+        self.bge_model = get_shared_encoder()
+        self._index_rebuilds: Dict[str, threading.Timer] = {}  # collection -> scheduled rebuild
+        self._index_rebuilds_lock = threading.Lock()
     
     def create_collection(self, name: str, metadata: Dict = None) -> None:
         """
@@ -65,7 +91,8 @@ class ChromaDBManager:
         return {
             "name": name,
             "document_count": count,
-            "metadata": metadata
+            "metadata": metadata,
+            "version": get_collection_version(collection)
         }
     
     def add_documents(
@@ -86,29 +113,162 @@ class ChromaDBManager:
         """
         collection = self.client.get_collection(name=collection_name)
         
-        # Generate embeddings
-        print(f"Generating embeddings for {len(documents)} documents...")
-        embeddings_result = self.bge_model.encode(
-            documents,
-            batch_size=12,
-            max_length=settings.BGE_MAX_LENGTH
-        )
-        embeddings = embeddings_result["dense_vecs"]
-        
         # Generate IDs if not provided
         if ids is None:
             start_id = collection.count()
             ids = [f"doc_{start_id + i}" for i in range(len(documents))]
         
-        # Add to collection
-        collection.add(
-            documents=documents,
-            embeddings=embeddings.tolist(),
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Embed and add in bounded pages to keep memory flat
+        page_size = settings.INGEST_WRITE_PAGE_SIZE
+        print(f"Generating embeddings for {len(documents)} documents...")
+        for start in range(0, len(documents), page_size):
+            page_documents = documents[start:start + page_size]
+            embeddings = self.bge_model.encode(
+                page_documents,
+                batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+                max_length=settings.BGE_MAX_LENGTH
+            )["dense_vecs"]
+            
+            collection.add(
+                documents=page_documents,
+                embeddings=embeddings.tolist(),
+                metadatas=metadatas[start:start + page_size] if metadatas else None,
+                ids=ids[start:start + page_size]
+            )
         
         print(f"Added {len(documents)} documents to '{collection_name}'")
+        self.refresh_quantized_index(collection_name)
+    
+    @contextmanager
+    def _ingestion_encoder(self, workers: int = None):
+        """
+        Yield (encoder, pool) for ingestion.
+        
+        With more than one worker, embedding is sharded across an
+        EmbeddingWorkerPool and this process stays the single Chroma writer.
+        """
+        workers = workers or settings.INGEST_WORKERS
+        if workers <= 1:
+            yield self.bge_model, None
+            return
+        
+        with EmbeddingWorkerPool(
+            workers=workers,
+            backend=settings.EMBEDDING_BACKEND,
+            torch_threads=settings.INGEST_TORCH_THREADS or None
+        ) as pool:
+            yield pool, pool
+    
+    def _ingestion_page_size(self, pool: Optional[EmbeddingWorkerPool]) -> int:
+        """Write page size, large enough to keep every worker busy"""
+        if pool is None:
+            return settings.INGEST_WRITE_PAGE_SIZE
+        return max(settings.INGEST_WRITE_PAGE_SIZE, pool.workers * settings.INGEST_EMBED_BATCH_SIZE * 2)
+    
+    def ingest_directory(
+        self,
+        collection_name: str,
+        source_dir: str = None,
+        splitter: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        workers: int = None
+    ) -> Dict[str, int]:
+        """
+        Stream raw documents from a directory into a collection.
+        
+        Files are chunked, embedded in bounded batches and written in pages.
+        Progress is checkpointed, so re-running skips unchanged files and
+        resumes after a failure without re-embedding stored chunks.
+        
+        Args:
+            collection_name: Name of the collection (created if missing)
+            source_dir: Directory of raw documents (defaults to settings.RAW_DOCS_DIR)
+            splitter: 'recursive', 'character' or 'markdown' (defaults to settings)
+            chunk_size: Maximum characters per chunk (defaults to settings)
+            chunk_overlap: Overlap between chunks (defaults to settings)
+            workers: Embedding worker processes (defaults to settings.INGEST_WORKERS)
+            
+        Returns:
+            Ingestion statistics
+        """
+        self.create_collection(collection_name)
+        collection = self.client.get_collection(name=collection_name)
+        
+        with self._ingestion_encoder(workers) as (encoder, pool):
+            pipeline = IngestionPipeline(
+                collection=collection,
+                encoder=encoder,
+                splitter=create_splitter(splitter, chunk_size, chunk_overlap),
+                write_page_size=self._ingestion_page_size(pool)
+            )
+            stats = pipeline.run(source_dir)
+            if pool is not None:
+                stats["throughput"] = pool.throughput_report()
+                print(f"Embedding throughput: {stats['throughput']}")
+        
+        if stats["chunks_written"] or stats["chunks_deleted"]:
+            stats["collection_version"] = bump_collection_version(collection)
+            self.refresh_quantized_index(collection_name)
+        return stats
+    
+    def sync(
+        self,
+        collection_name: str,
+        source_dir: str = None,
+        splitter: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        workers: int = None
+    ) -> Dict[str, int]:
+        """
+        Incrementally re-index a collection from its source directory.
+        
+        Only new or changed chunks are embedded and upserted and removed
+        chunks are deleted, so a refresh costs time in proportion to what
+        changed. When anything changed, the collection version is bumped
+        (see get_collection_version) and the quantized index is marked stale
+        (see refresh_quantized_index).
+        
+        Args:
+            collection_name: Name of the collection (created if missing)
+            source_dir: Root directory used for ingestion (defaults to settings.RAW_DOCS_DIR)
+            splitter: 'recursive', 'character' or 'markdown' (defaults to settings)
+            chunk_size: Maximum characters per chunk (defaults to settings)
+            chunk_overlap: Overlap between chunks (defaults to settings)
+            workers: Embedding worker processes (defaults to settings.INGEST_WORKERS)
+            
+        Returns:
+            Sync statistics including collection_version
+        """
+        self.create_collection(collection_name)
+        collection = self.client.get_collection(name=collection_name)
+        
+        with self._ingestion_encoder(workers) as (encoder, pool):
+            pipeline = IngestionPipeline(
+                collection=collection,
+                encoder=encoder,
+                splitter=create_splitter(splitter, chunk_size, chunk_overlap),
+                write_page_size=self._ingestion_page_size(pool)
+            )
+            stats = pipeline.sync(source_dir)
+            if pool is not None:
+                stats["throughput"] = pool.throughput_report()
+                print(f"Embedding throughput: {stats['throughput']}")
+        
+        if stats["chunks_upserted"] or stats["chunks_deleted"]:
+            stats["collection_version"] = bump_collection_version(collection)
+            self.refresh_quantized_index(collection_name)
+        else:
+            stats["collection_version"] = get_collection_version(collection)
+        
+        print(f"Collection '{collection_name}' is at version {stats['collection_version']}")
+        return stats
+    
+    def get_collection_version(self, collection_name: str) -> int:
+        """Content version of a collection (bumped by ingest_directory, sync and imports)"""
+        collection = self.client.get_collection(name=collection_name)
+        return get_collection_version(collection)
     
     def query_collection(
         self,
@@ -137,6 +297,19 @@ class ChromaDBManager:
             max_length=settings.BGE_MAX_LENGTH
         )["dense_vecs"][0]
         
+        # Use the quantized index when enabled and built
+        if settings.VECTOR_QUANTIZATION != "none":
+            index = load_quantized_index(self._quantized_index_dir(collection_name))
+            if index is not None:
+                return query_quantized_index(
+                    index,
+                    collection,
+                    query_embedding.tolist(),
+                    n_results,
+                    rescore_multiplier=settings.QUANTIZED_RESCORE_MULTIPLIER
+                )
+            print(f"⚠️ No quantized index for '{collection_name}', falling back to ChromaDB query")
+        
         # Query collection
         results = collection.query(
             query_embeddings=[query_embedding.tolist()],
@@ -145,6 +318,87 @@ class ChromaDBManager:
         
         return results
     
+    def _quantized_index_dir(self, collection_name: str) -> str:
+        """Directory of the quantized index for a collection"""
+        return str(Path(settings.QUANTIZED_INDEX_DIR) / collection_name)
+    
+    def build_quantized_index(
+        self,
+        collection_name: str,
+        mode: str = None,
+        page_size: int = 1000
+    ) -> QuantizedVectorIndex:
+        """
+        Build an int8 or binary quantized index from a collection's embeddings.
+        
+        Embeddings are read from ChromaDB page by page and streamed to a
+        memory-mapped file, so building never holds the whole collection in RAM.
+        The write methods of this class mark it stale and rebuild it in the
+        background (see refresh_quantized_index).
+        
+        Args:
+            collection_name: Name of the collection
+            mode: 'int8' or 'binary' (defaults to settings.VECTOR_QUANTIZATION)
+            page_size: Number of embeddings fetched per ChromaDB page
+            
+        Returns:
+            The built QuantizedVectorIndex
+        """
+        collection = self.client.get_collection(name=collection_name)
+        index_dir = self._quantized_index_dir(collection_name)
+        
+        index = build_index_from_collection(
+            collection,
+            index_dir=index_dir,
+            mode=mode or settings.VECTOR_QUANTIZATION,
+            page_size=page_size
+        )
+        invalidate_quantized_index(index_dir)
+        
+        footprint = index.memory_footprint()
+        print(f"Quantized index resident size: {footprint['resident_bytes']} bytes "
+              f"(full precision: {footprint['full_precision_bytes']} bytes)")
+        return index
+    
+    def refresh_quantized_index(self, collection_name: str) -> None:
+        """
+        Mark the quantized index stale after a write and schedule its rebuild.
+        
+        Retrieval searches ChromaDB while the index is stale (see
+        load_quantized_index), so no query misses new chunks. The rebuild runs
+        on a background thread QUANTIZED_INDEX_REBUILD_DELAY seconds after the
+        first write, so a burst of writes costs one O(corpus) rebuild instead
+        of one per write. The thread is not a daemon: a CLI ingest waits for
+        it before exiting.
+        """
+        if settings.VECTOR_QUANTIZATION == "none":
+            return
+        mark_quantized_index_stale(self._quantized_index_dir(collection_name))
+        with self._index_rebuilds_lock:
+            if collection_name in self._index_rebuilds:
+                return
+            timer = threading.Timer(
+                settings.QUANTIZED_INDEX_REBUILD_DELAY, self._rebuild_stale_index, args=(collection_name,)
+            )
+            self._index_rebuilds[collection_name] = timer
+        timer.start()
+    
+    def _rebuild_stale_index(self, collection_name: str) -> None:
+        """Background rebuild scheduled by refresh_quantized_index"""
+        with self._index_rebuilds_lock:
+            self._index_rebuilds.pop(collection_name, None)
+        index_dir = self._quantized_index_dir(collection_name)
+        if not is_quantized_index_stale(index_dir):
+            return
+        try:
+            self.build_quantized_index(collection_name)
+        except Exception as e:
+            print(f"⚠️ Quantized index rebuild for '{collection_name}' failed: {e}")
+            return
+        if is_quantized_index_stale(index_dir):
+            # Writes landed during the rebuild
+            self.refresh_quantized_index(collection_name)
+    
     def update_document(
         self,
         collection_name: str,
@@ -181,12 +435,15 @@ class ChromaDBManager:
         
         collection.update(**update_params)
         print(f"Updated document '{doc_id}' in '{collection_name}'")
+        if document:
+            self.refresh_quantized_index(collection_name)
     
     def delete_documents(self, collection_name: str, ids: List[str]) -> None:
         """Delete documents from collection"""
         collection = self.client.get_collection(name=collection_name)
         collection.delete(ids=ids)
         print(f"Deleted {len(ids)} documents from '{collection_name}'")
+        self.refresh_quantized_index(collection_name)
     
     def export_collection(self, collection_name: str, output_path: str) -> None:
         """
@@ -216,9 +473,17 @@ class ChromaDBManager:
         """
         Import collection from JSON file.
         
+        Re-embeds every document. Directories written by
+        export_collection_binary are delegated to import_collection_binary,
+        which reuses the stored embeddings instead.
+        
         Args:
-            json_path: Path to JSON file
+            json_path: Path to JSON file (or binary export directory)
         """
+        if os.path.isdir(json_path):
+            self.import_collection_binary(json_path)
+            return
+        
         with open(json_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
@@ -237,9 +502,138 @@ class ChromaDBManager:
             metadatas=data.get("metadatas"),
             ids=data["ids"]
         )
+        bump_collection_version(self.client.get_collection(name=collection_name))
         
         print(f"Imported '{collection_name}' from {json_path}")
+    
+    def export_collection_binary(
+        self,
+        collection_name: str,
+        output_dir: str,
+        page_size: int = 1000
+    ) -> None:
+        """
+        Export a collection with its embeddings in a compact binary layout.
+        
+        Writes, row-aligned:
+            manifest.json   - collection name/metadata, count, dimension, model version
+            embeddings.npy  - float32 matrix (count x dimension)
+            records.jsonl   - one {"id", "document", "metadata"} object per row
+        
+        The collection is read page by page, so export memory stays flat.
+        
+        Args:
+            collection_name: Name of collection
+            output_dir: Directory to write the export into
+            page_size: Records fetched per ChromaDB page
+        """
+        collection = self.client.get_collection(name=collection_name)
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        count = collection.count()
+        
+        dimension = 0
+        if count:
+            first = collection.get(limit=1, include=["embeddings"])
+            dimension = len(first["embeddings"][0])
+        
+        embeddings = np.lib.format.open_memmap(
+            output_path / BINARY_EXPORT_EMBEDDINGS, mode="w+", dtype=np.float32, shape=(count, dimension)
+        )
+        
+        row = 0
+        with open(output_path / BINARY_EXPORT_RECORDS, 'w', encoding='utf-8') as f:
+            for offset in range(0, count, page_size):
+                page = collection.get(
+                    limit=page_size,
+                    offset=offset,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                embeddings[row:row + len(page["ids"])] = np.asarray(page["embeddings"], dtype=np.float32)
+                for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    f.write(json.dumps({"id": doc_id, "document": document, "metadata": metadata}, ensure_ascii=False))
+                    f.write("\n")
+                row += len(page["ids"])
+        
+        embeddings.flush()
+        del embeddings
+        
+        with open(output_path / BINARY_EXPORT_MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump({
+                "format": "doxa-chroma-binary",
+                "format_version": 1,
+                "collection_name": collection_name,
+                "metadata": collection.metadata,
+                "count": row,
+                "dimension": dimension,
+                "dtype": "float32",
+                "model_version": embedding_model_version(),
+                "collection_version": get_collection_version(collection)
+            }, f, indent=2, ensure_ascii=False)
+        
+        print(f"Exported '{collection_name}' ({row} records, embeddings included) to {output_dir}")
+    
+    def import_collection_binary(
+        self,
+        input_dir: str,
+        collection_name: str = None,
+        page_size: int = 1000
+    ) -> None:
+        """
+        Import a collection written by export_collection_binary without re-embedding.
+        
+        Embeddings are memory-mapped (no copy into RAM) and added to ChromaDB
+        in pages alongside the matching JSONL records. The collection version
+        is bumped and the quantized index marked stale afterwards, so caches
+        keyed on the version and quantized retrieval see the imported data.
+        
+        Args:
+            input_dir: Export directory
+            collection_name: Target collection (defaults to the exported name)
+            page_size: Records added per ChromaDB call
+        """
+        input_path = Path(input_dir)
+        with open(input_path / BINARY_EXPORT_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        collection_name = collection_name or manifest["collection_name"]
+        if manifest.get("model_version") != embedding_model_version():
+            print(f"⚠️ Export was embedded with '{manifest.get('model_version')}', "
+                  f"current model is '{embedding_model_version()}'. Queries may not match.")
+        
+        self.create_collection(collection_name, manifest.get("metadata"))
+        collection = self.client.get_collection(name=collection_name)
+        
+        embeddings = np.load(input_path / BINARY_EXPORT_EMBEDDINGS, mmap_mode="r")
+        if len(embeddings) != manifest["count"]:
+            raise ValueError(f"Export is inconsistent: {len(embeddings)} embeddings for {manifest['count']} records")
+        
+        def add_page(records: List[Dict], start: int) -> None:
+            collection.add(
+                ids=[r["id"] for r in records],
+                documents=[r["document"] for r in records],
+                metadatas=[r["metadata"] for r in records],
+                embeddings=embeddings[start:start + len(records)]
+            )
+        
+        row = 0
+        page = []
+        with open(input_path / BINARY_EXPORT_RECORDS, 'r', encoding='utf-8') as f:
+            for line in f:
+                page.append(json.loads(line))
+                if len(page) >= page_size:
+                    add_page(page, row)
+                    row += len(page)
+                    page = []
+        if page:
+            add_page(page, row)
+            row += len(page)
+        
+        version = bump_collection_version(collection)
+        print(f"Imported '{collection_name}' ({row} records) from {input_dir} without re-embedding, "
+              f"now at version {version}")
+        self.refresh_quantized_index(collection_name)
 
 
 # Global instance
-chroma_manager = ChromaDBManager()
+chroma_manager = LazyService("chroma_manager", ChromaDBManager)
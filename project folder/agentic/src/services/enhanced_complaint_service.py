@@ -3,15 +3,27 @@ Enhanced ticket processing service with advanced agent pipeline
 Includes Query Analyzer with summary (<100 words) and keywords (5-10)
 Full latency instrumentation with trace_id for debugging
 """
+import copy
 import json
 import re
-from typing import Dict, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List, Optional
 
+from ..config.settings import settings
+from ..schemas.ticket import FusedFrontEndResult
 from ..services.classification_service import classification_service
 from ..services.enhanced_rag_service import enhanced_rag_service
 from ..agents.advanced_agents import advanced_agent_factory
+from ..utils.deadline import Deadline
+from ..utils.llm_call import run_agent
 from ..utils.pipeline_tracer import create_tracer, PipelineTracer
+from ..utils.lifecycle import LazyService
 from ..utils.query_logger import query_logger
+from ..utils.response_templates import compose_response, detect_language_locally
+from ..utils.single_flight import FlightTimeout, request_key, single_flight
+from ..utils.ticket_categories import normalize_category
 
 
 class EnhancedComplaintService:
@@ -25,6 +37,10 @@ class EnhancedComplaintService:
         # Language detection and response composition
         self.language_detector = advanced_agent_factory.create_language_detector_agent()
         self.response_composer = advanced_agent_factory.create_response_composer_agent()
+        # Single-call replacement for classification + analysis + enrichment + language
+        self.fused_front_end = advanced_agent_factory.create_fused_front_end_agent()
+        # Raw-text retrieval runs here while the LLM stages before RAG are in flight
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-prefetch")
     
     def _parse_query_analysis(self, response_text: str) -> Dict:
         """
@@ -50,7 +66,82 @@ class EnhancedComplaintService:
             "intent": "unknown"
         }
     
-    def process_complaint(self, complaint_text: str, ticket_id: Optional[int] = None) -> Dict[str, any]:
+    def _local_query_analysis(self, complaint_text: str) -> Dict:
+        """Query analysis without the LLM (analyzer error or deadline too close)"""
+        return {
+            "summary": complaint_text[:100],
+            "keywords": complaint_text.split()[:5],
+            "word_count": len(complaint_text.split()),
+            "intent": "unknown"
+        }
+    
+    def _collect_prefetch(self, prefetch: Optional[Future], tracer: PipelineTracer) -> Optional[Dict]:
+        """Wait for the raw-text retrieval started after classification (None if it failed)"""
+        if prefetch is None:
+            return None
+        try:
+            return prefetch.result()
+        except Exception as e:
+            print(f"[Pipeline] Raw-text prefetch failed ({e}), retrieving on the enriched query only")
+            tracer.record_prefetch("failed")
+            return None
+    
+    def _query_variants(
+        self,
+        complaint_text: str,
+        enriched_query: str,
+        query_analysis: Dict,
+        raw_text_prefetched: bool
+    ) -> List[str]:
+        """
+        Extra retrieval texts for multi-vector search: original text, summary, keywords.
+        
+        The original text is left out when its results were already prefetched.
+        """
+        candidates = [
+            None if raw_text_prefetched else complaint_text,
+            query_analysis.get("summary"),
+            " ".join(query_analysis.get("keywords") or [])
+        ]
+        variants = []
+        for text in candidates:
+            text = (text or "").strip()
+            if text and text != enriched_query and text not in variants:
+                variants.append(text)
+        return variants
+    
+    def _run_fused_front_end(self, complaint_text: str, tracer: PipelineTracer) -> Optional[FusedFrontEndResult]:
+        """
+        Run the fused front-end agent and validate its JSON output.
+        
+        Regex-based sensitive data detection still runs first: flagged
+        queries skip the LLM and go through the per-agent path, which
+        escalates them without a model call.
+        
+        Returns:
+            Validated FusedFrontEndResult, or None to fall back to the per-agent path
+        """
+        if classification_service.sensitive_detector.detect(complaint_text)["contains_sensitive_data"]:
+            return None
+        
+        try:
+            response = run_agent(self.fused_front_end, complaint_text)
+            tracer.record_llm_call()
+            json_match = re.search(r'\{[\s\S]*\}', response.content or "")
+            if not json_match:
+                raise ValueError("no JSON object in response")
+            return FusedFrontEndResult.model_validate_json(json_match.group())
+        except Exception as e:
+            print(f"[Pipeline] Fused Front-End failed ({e}), falling back to per-agent path")
+            return None
+    
+    def process_complaint(
+        self,
+        complaint_text: str,
+        ticket_id: Optional[int] = None,
+        timeout_ms: Optional[int] = None,
+        category: Optional[str] = None
+    ) -> Dict[str, any]:
         """
         Process a user complaint through the FULL enhanced agentic pipeline.
         
@@ -65,9 +156,16 @@ class EnhancedComplaintService:
         Includes full latency instrumentation with trace_id.
         Target: <10s end-to-end (<5s is ideal)
         
+        Optional stages (query analysis, language detection, confidence agent,
+        response polishing, RAG retries) are skipped or replaced by local
+        fallbacks when the request deadline is too close; they are listed in
+        pipeline_metrics.degraded_stages.
+        
         Args:
             complaint_text: The user's ticket text
             ticket_id: Optional ticket ID for tracing
+            timeout_ms: Caller's timeout (X-Request-Timeout-Ms), capped by PIPELINE_DEADLINE_MS
+            category: Ticket category from the backend, used to scope retrieval
             
         Returns:
             Dict with classification, response, confidence, query_analysis, pipeline_metrics
@@ -75,6 +173,8 @@ class EnhancedComplaintService:
         # Initialize pipeline tracer for latency instrumentation
         tracer = create_tracer(ticket_id=ticket_id)
         tracer.start_pipeline()
+        deadline = Deadline(timeout_ms)
+        tracer.record_deadline(deadline.budget_ms)
         
         result = {
             "original_query": complaint_text,
@@ -95,13 +195,27 @@ class EnhancedComplaintService:
         }
         
         try:
-            # STEP 1: Classification (with regex-based sensitive data detection)
-            with tracer.stage("classification"):
-                print(f"[Pipeline] Step 1: Classification")
-                classification = classification_service.classify_query(complaint_text)
+            # STEPS 1-3 (fused mode): one structured call replaces classification,
+            # query analysis, context enrichment and language detection
+            fused = None
+            if settings.FUSED_FRONTEND_ENABLED:
+                with tracer.stage("fused_front_end"):
+                    print(f"[Pipeline] Step 1-3: Fused Front-End")
+                    fused = self._run_fused_front_end(complaint_text, tracer)
+            
+            if fused is not None:
+                classification = fused.category
                 result["classification"] = classification
-                tracer.record_llm_call()
+                result["front_end_mode"] = "fused"
                 print(f"[Pipeline] Classification: {classification}")
+            else:
+                # STEP 1: Classification (with regex-based sensitive data detection)
+                with tracer.stage("classification"):
+                    print(f"[Pipeline] Step 1: Classification")
+                    classification = classification_service.classify_query(complaint_text)
+                    result["classification"] = classification
+                    tracer.record_llm_call()
+                    print(f"[Pipeline] Classification: {classification}")
             
             # Get classification response
             classification_result = classification_service.get_response_for_classification(classification)
@@ -116,45 +230,115 @@ class EnhancedComplaintService:
                 result["pipeline_metrics"] = tracer.get_summary()
                 return result
             
-            # STEP 2: Query Analyzer - Summary + Keywords
-            with tracer.stage("query_analysis"):
-                print(f"[Pipeline] Step 2: Query Analyzer (Summary + Keywords)")
-                try:
-                    analyzer_response = self.query_analyzer.run(complaint_text)
-                    tracer.record_llm_call()
-                    query_analysis = self._parse_query_analysis(analyzer_response.content)
-                    result["query_analysis"] = query_analysis
-                    result["intent"] = query_analysis.get("intent", "unknown")
-                    
-                    print(f"[Pipeline] Query Analysis:")
-                    print(f"   📝 Summary ({query_analysis.get('word_count', 0)} words): {query_analysis.get('summary', 'N/A')[:100]}...")
-                    print(f"   🔑 Keywords ({len(query_analysis.get('keywords', []))}): {query_analysis.get('keywords', [])}")
-                    print(f"   🎯 Intent: {query_analysis.get('intent', 'unknown')}")
-                except Exception as e:
-                    print(f"[Pipeline] Query Analyzer Error: {e}")
-                    result["query_analysis"] = {
-                        "summary": complaint_text[:100],
-                        "keywords": complaint_text.split()[:5],
-                        "word_count": len(complaint_text.split()),
-                        "intent": "unknown"
-                    }
+            # Ticket category scopes retrieval (the whole collection is searched when it is thin)
+            retrieval_category = normalize_category(category) if settings.RAG_CATEGORY_FILTER_ENABLED else None
+            
+            # Start retrieval on the raw text now; it overlaps the analysis/enrichment LLM calls
+            prefetch = None
+            if settings.RAG_PREFETCH_ENABLED and fused is None:
+                # Carry the context over so the prefetch's spans land in this request's trace
+                prefetch = self.prefetch_executor.submit(
+                    copy_context().run, enhanced_rag_service.prefetch, complaint_text, category=retrieval_category
+                )
             
-            # STEP 3: Context Enrichment
-            with tracer.stage("context_enrichment"):
-                print(f"[Pipeline] Step 3: Context Enrichment")
-                enrichment_response = self.context_agent.run(complaint_text)
-                tracer.record_llm_call()
-                enriched_query = enrichment_response.content.strip()
+            if fused is not None:
+                query_analysis = fused.model_dump(include={"summary", "keywords", "word_count", "intent"})
+                result["query_analysis"] = query_analysis
+                result["intent"] = fused.intent or "unknown"
+                enriched_query = fused.enriched_query.strip()
                 result["enriched_query"] = enriched_query
+                print(f"[Pipeline] Query Analysis (fused): intent={result['intent']}, keywords={fused.keywords}")
                 print(f"[Pipeline] Enriched Query: {enriched_query[:100]}...")
+            elif not deadline.allows("query_analysis", "context_enrichment", "rag_pipeline"):
+                # STEP 2 (deadline close): local analysis, keeping the time for enrichment and RAG
+                result["query_analysis"] = self._local_query_analysis(complaint_text)
+                result["intent"] = "unknown"
+                tracer.record_degraded("query_analysis")
+            else:
+                # STEP 2: Query Analyzer - Summary + Keywords
+                with tracer.stage("query_analysis"):
+                    print(f"[Pipeline] Step 2: Query Analyzer (Summary + Keywords)")
+                    try:
+                        analyzer_response = run_agent(self.query_analyzer, complaint_text)
+                        tracer.record_llm_call()
+                        query_analysis = self._parse_query_analysis(analyzer_response.content)
+                        result["query_analysis"] = query_analysis
+                        result["intent"] = query_analysis.get("intent", "unknown")
+                    
+                        print(f"[Pipeline] Query Analysis:")
+                        print(f"   📝 Summary ({query_analysis.get('word_count', 0)} words): {query_analysis.get('summary', 'N/A')[:100]}...")
+                        print(f"   🔑 Keywords ({len(query_analysis.get('keywords', []))}): {query_analysis.get('keywords', [])}")
+                        print(f"   🎯 Intent: {query_analysis.get('intent', 'unknown')}")
+                    except Exception as e:
+                        print(f"[Pipeline] Query Analyzer Error: {e}")
+                        result["query_analysis"] = self._local_query_analysis(complaint_text)
             
-            # STEP 4: RAG Pipeline with enriched query
+            if fused is None:
+                # STEP 3: Context Enrichment
+                with tracer.stage("context_enrichment"):
+                    print(f"[Pipeline] Step 3: Context Enrichment")
+                    enrichment_response = run_agent(self.context_agent, complaint_text)
+                    tracer.record_llm_call()
+                    enriched_query = enrichment_response.content.strip()
+                    result["enriched_query"] = enriched_query
+                    print(f"[Pipeline] Enriched Query: {enriched_query[:100]}...")
+            
+            if fused is not None:
+                detected_language = fused.language
+                result["detected_language"] = detected_language
+            elif not deadline.allows("language_detection", "rag_pipeline"):
+                # STEP 4 (deadline close): local heuristic instead of the detector agent
+                detected_language = detect_language_locally(complaint_text)
+                result["detected_language"] = detected_language
+                tracer.record_degraded("language_detection")
+                print(f"[Pipeline] Detected Language (local): {detected_language}")
+            else:
+                # STEP 4: Language Detection (before RAG, so the answer is written in it)
+                with tracer.stage("language_detection"):
+                    print(f"[Pipeline] Step 4: Language Detection")
+                    try:
+                        lang_response = run_agent(self.language_detector, complaint_text)
+                        tracer.record_llm_call()
+                        detected_language = lang_response.content.strip().lower()[:2]
+                        if detected_language not in ["fr", "en", "ar", "es"]:
+                            detected_language = "fr"
+                        result["detected_language"] = detected_language
+                        print(f"[Pipeline] Detected Language: {detected_language}")
+                    except Exception as e:
+                        print(f"[Pipeline] Language Detection Error: {e}, defaulting to French")
+                        detected_language = "fr"
+                        result["detected_language"] = detected_language
+            
+            # STEP 5: RAG Pipeline with enriched query
             with tracer.stage("rag_pipeline"):
-                print(f"[Pipeline] Step 4: RAG Pipeline with Feedback Loop")
+                print(f"[Pipeline] Step 5: RAG Pipeline with Feedback Loop")
                 print(f"[Pipeline]   → Sending enriched query to RAG service...")
                 tracer.record_rag_attempt()
-                rag_result = enhanced_rag_service.query_with_feedback_loop(enriched_query, max_retries=3)
+                prefetched = self._collect_prefetch(prefetch, tracer)
+                query_variants = None
+                if settings.RAG_MULTI_VECTOR_ENABLED:
+                    query_variants = self._query_variants(
+                        complaint_text, enriched_query, result["query_analysis"], prefetched is not None
+                    )
+                rag_result = enhanced_rag_service.query_with_feedback_loop(
+                    enriched_query,
+                    max_retries=3,
+                    language=detected_language,
+                    intent=result.get("intent"),
+                    deadline=deadline,
+                    prefetched=prefetched,
+                    query_variants=query_variants,
+                    category=retrieval_category
+                )
+                if rag_result.get("prefetch_outcome"):
+                    tracer.record_prefetch(rag_result["prefetch_outcome"])
                 tracer.record_documents(rag_result.get("relevant_docs_count", 0))
+                for decided_by, count in rag_result.get("evaluation_decisions", {}).items():
+                    tracer.record_evaluation(decided_by, count)
+                context_tokens = rag_result.get("context_tokens", {})
+                tracer.record_context_tokens(context_tokens.get("raw", 0), context_tokens.get("packed", 0))
+                for stage_name in rag_result.get("degraded_stages", []):
+                    tracer.record_degraded(stage_name)
                 
                 # Track retries
                 for _ in range(rag_result.get("attempts", 1) - 1):
@@ -173,40 +357,43 @@ class EnhancedComplaintService:
                 print(f"[RAG RESULT] Response Preview: {raw_ai_response[:200]}...")
                 print(f"[RAG RESULT] ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
             
-            # STEP 5: Language Detection
-            with tracer.stage("language_detection"):
-                print(f"[Pipeline] Step 5: Language Detection")
-                try:
-                    lang_response = self.language_detector.run(complaint_text)
-                    tracer.record_llm_call()
-                    detected_language = lang_response.content.strip().lower()[:2]
-                    if detected_language not in ["fr", "en", "ar", "es"]:
-                        detected_language = "fr"
-                    result["detected_language"] = detected_language
-                    print(f"[Pipeline] Detected Language: {detected_language}")
-                except Exception as e:
-                    print(f"[Pipeline] Language Detection Error: {e}, defaulting to French")
-                    detected_language = "fr"
-                    result["detected_language"] = detected_language
-            
-            # STEP 6: Response Composition
-            with tracer.stage("response_composition"):
-                print(f"[Pipeline] Step 6: Response Composer")
-                try:
-                    compose_input = f"""
+            # STEP 6: Response Composition (polishing falls back to the template when the deadline is close)
+            polish = settings.RESPONSE_COMPOSITION_MODE == "polish"
+            if polish and not deadline.allows("response_composition"):
+                polish = False
+                tracer.record_degraded("response_composition")
+            if polish:
+                with tracer.stage("response_composition"):
+                    print(f"[Pipeline] Step 6: Response Composer")
+                    try:
+                        compose_input = f"""
 language: {detected_language}
 user_query: {complaint_text}
 raw_answer: {raw_ai_response}
 """
-                    composed_response = self.response_composer.run(compose_input)
-                    tracer.record_llm_call()
-                    final_response = composed_response.content.strip()
-                    result["response"] = final_response
+                        composed_response = run_agent(self.response_composer, compose_input)
+                        tracer.record_llm_call()
+                        final_response = composed_response.content.strip()
+                        result["response"] = final_response
+                        result["raw_rag_response"] = raw_ai_response
+                        print(f"[Pipeline] Response composed successfully ({len(final_response)} chars)")
+                    except Exception as e:
+                        print(f"[Pipeline] Response Composer Error: {e}, using raw response")
+                        result["response"] = raw_ai_response
+            else:
+                # Local template: no LLM call, the RAG answer is the solution body
+                with tracer.stage("response_composition"):
+                    print(f"[Pipeline] Step 6: Response Template ({detected_language})")
                     result["raw_rag_response"] = raw_ai_response
-                    print(f"[Pipeline] Response composed successfully ({len(final_response)} chars)")
-                except Exception as e:
-                    print(f"[Pipeline] Response Composer Error: {e}, using raw response")
-                    result["response"] = raw_ai_response
+                    if rag_result.get("should_escalate"):
+                        # Escalation messages carry their own contact instructions
+                        result["response"] = raw_ai_response
+                    else:
+                        result["response"] = compose_response(
+                            detected_language,
+                            result["query_analysis"].get("summary"),
+                            raw_ai_response
+                        )
             
             # Set remaining result fields
             result["relevant_docs_count"] = rag_result.get("relevant_docs_count", 0)
@@ -262,10 +449,93 @@ raw_answer: {raw_ai_response}
         else:
             return "reject_and_escalate"
     
-    def process_ticket(self, ticket_text: str, ticket_id: Optional[int] = None) -> Dict[str, any]:
-        """Alias for process_complaint for API compatibility"""
-        return self.process_complaint(ticket_text, ticket_id)
+    def process_ticket(
+        self,
+        ticket_text: str,
+        ticket_id: Optional[int] = None,
+        timeout_ms: Optional[int] = None,
+        category: Optional[str] = None
+    ) -> Dict[str, any]:
+        """
+        Alias for process_complaint for API compatibility.
+        
+        With SINGLE_FLIGHT_ENABLED, identical tickets (normalized text, category,
+        timeout and pipeline config) arriving while one is being processed
+        attach to that run and get a copy of its result under their own
+        trace_id. A follower waits no longer than its own deadline; past it the
+        ticket is escalated (see _deadline_result) instead of run a second time.
+        """
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return self.process_complaint(ticket_text, ticket_id, timeout_ms, category)
+        
+        arrived = time.perf_counter()
+        
+        def run():
+            remaining_ms = timeout_ms and max(timeout_ms - int((time.perf_counter() - arrived) * 1000), 1)
+            return self.process_complaint(ticket_text, ticket_id, remaining_ms, category)
+        
+        key = request_key(ticket_text, normalize_category(category), timeout_ms)
+        try:
+            result, shared = single_flight.do(key, run, timeout=Deadline(timeout_ms).budget_ms / 1000)
+        except FlightTimeout:
+            return self._deadline_result(ticket_text, ticket_id)
+        if not shared:
+            return result
+        return self._follower_result(result, ticket_text, ticket_id)
+    
+    def _deadline_result(self, ticket_text: str, ticket_id: Optional[int]) -> Dict[str, any]:
+        """
+        Escalation result for a follower whose deadline passed while the
+        identical run it waited for was still going.
+        """
+        tracer = create_tracer(ticket_id=ticket_id)
+        tracer.start_pipeline()
+        tracer.record_degraded("coalesced_run")
+        tracer.end_pipeline()
+        result = {
+            "original_query": ticket_text,
+            "response": "I apologize, but your request is taking longer than expected. Please contact support@doxa.dz",
+            "rag_used": False,
+            "confidence_score": 0.0,
+            "escalated": True,
+            "escalation_reason": "deadline_exceeded",
+            "recommendation": self._get_recommendation(0.0),
+            "trace_id": tracer.trace_id,
+            "pipeline_metrics": tracer.get_summary()
+        }
+        
+        try:
+            query_logger.log_query_result(
+                query=ticket_text,
+                result=result,
+                ticket_id=ticket_id
+            )
+        except Exception as e:
+            print(f"[Pipeline] ⚠️ Failed to log query result: {e}")
+        return result
+    
+    def _follower_result(self, leader_result: Dict, ticket_text: str, ticket_id: Optional[int]) -> Dict[str, any]:
+        """Copy of a coalesced run's result with this request's own trace_id linking to the leader's"""
+        result = copy.deepcopy(leader_result)
+        trace_id = create_tracer(ticket_id=ticket_id).trace_id
+        leader_trace_id = leader_result.get("trace_id")
+        result["trace_id"] = trace_id
+        result["leader_trace_id"] = leader_trace_id
+        if result.get("pipeline_metrics"):
+            result["pipeline_metrics"]["trace_id"] = trace_id
+            result["pipeline_metrics"]["leader_trace_id"] = leader_trace_id
+        print(f"[TRACE:{trace_id}] 🔗 Coalesced with in-flight pipeline {leader_trace_id}")
+        
+        try:
+            query_logger.log_query_result(
+                query=ticket_text,
+                result=result,
+                ticket_id=ticket_id
+            )
+        except Exception as e:
+            print(f"[Pipeline] ⚠️ Failed to log query result: {e}")
+        return result
 
 
 # Global instance
-enhanced_ticket_service = EnhancedComplaintService()
+enhanced_ticket_service = LazyService("enhanced_ticket_service", EnhancedComplaintService)
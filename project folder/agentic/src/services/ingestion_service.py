@@ -0,0 +1,435 @@
+"""
+Streaming, resumable ingestion of raw documents into ChromaDB
+Files are chunked one at a time, embedded in bounded batches and written
+in pages, with a per-file checkpoint so re-runs skip unchanged content
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from langchain_text_splitters import (
+    CharacterTextSplitter,
+    MarkdownTextSplitter,
+    RecursiveCharacterTextSplitter
+)
+
+from ..config.settings import settings
+from ..utils.encoder_backends import encoder_model_version
+from ..utils.ticket_categories import categorize_document
+
+
+SPLITTERS = {
+    "recursive": RecursiveCharacterTextSplitter,
+    "character": CharacterTextSplitter,
+    "markdown": MarkdownTextSplitter
+}
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".markdown")
+
+
+@dataclass
+class DocumentChunk:
+    """A single chunk ready to be embedded and stored"""
+    chunk_id: str
+    text: str
+    content_hash: str
+    metadata: Dict = field(default_factory=dict)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text, used to detect changed content"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embedding_model_version() -> str:
+    """Identifier of the embedding model/backend that produced stored vectors"""
+    return encoder_model_version()
+
+
+def create_splitter(
+    name: str = None,
+    chunk_size: int = None,
+    chunk_overlap: int = None
+):
+    """
+    Create a LangChain text splitter from settings.
+
+    Args:
+        name: 'recursive', 'character' or 'markdown' (defaults to settings)
+        chunk_size: Maximum characters per chunk (defaults to settings)
+        chunk_overlap: Overlapping characters between chunks (defaults to settings)
+
+    Returns:
+        Text splitter instance
+    """
+    name = name or settings.INGEST_SPLITTER
+    if name not in SPLITTERS:
+        raise ValueError(f"Unknown splitter '{name}', expected one of {list(SPLITTERS)}")
+
+    return SPLITTERS[name](
+        chunk_size=chunk_size or settings.INGEST_CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else settings.INGEST_CHUNK_OVERLAP
+    )
+
+
+def iter_source_files(source_dir: str) -> Iterator[Path]:
+    """Yield supported files under a directory in a stable order"""
+    for path in sorted(Path(source_dir).rglob("*")):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            yield path
+
+
+def iter_file_chunks(path: Path, source_dir: str, splitter) -> Iterator[DocumentChunk]:
+    """
+    Split one file into chunks with stable IDs.
+
+    Chunk IDs are '<relative path>#<chunk index>', so the same position in
+    the same file always maps to the same ID and can be upserted in place.
+    Every chunk carries its file's ticket category for filtered retrieval.
+    """
+    relative_path = path.relative_to(source_dir).as_posix()
+    text = path.read_text(encoding="utf-8")
+    model_version = embedding_model_version()
+    category = categorize_document(relative_path, text)
+
+    for index, piece in enumerate(splitter.split_text(text)):
+        piece_hash = content_hash(piece)
+        yield DocumentChunk(
+            chunk_id=f"{relative_path}#{index}",
+            text=piece,
+            content_hash=piece_hash,
+            metadata={
+                "source": relative_path,
+                "chunk_index": index,
+                "content_hash": piece_hash,
+                "model_version": model_version,
+                "category": category
+            }
+        )
+
+
+class IngestionCheckpoint:
+    """Per-file content hashes of fully ingested files, persisted as JSON"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, str] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)
+
+    def is_done(self, relative_path: str, file_hash: str) -> bool:
+        """Whether this exact file content was already ingested"""
+        return self.files.get(relative_path) == file_hash
+
+    def mark_done(self, relative_path: str, file_hash: str) -> None:
+        """Record a completed file and persist atomically"""
+        self.files[relative_path] = file_hash
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionPipeline:
+    """
+    Streams documents from a directory into a ChromaDB collection.
+
+    Chunks from consecutive files fill the same write pages, so each
+    encode() call gets a full page to shard across embedding workers however
+    small the individual files are. Memory is bounded by one write page of
+    chunks and embeddings, independent of corpus size. Resume works at two
+    levels:
+    - files whose content hash is in the checkpoint are skipped entirely
+    - inside a file, chunks already stored with the same content hash and
+      model version are not re-embedded (covers crashes mid-file)
+    """
+
+    def __init__(
+        self,
+        collection,
+        encoder,
+        splitter=None,
+        embed_batch_size: int = None,
+        write_page_size: int = None,
+        checkpoint_path: Optional[str] = None
+    ):
+        """
+        Args:
+            collection: Target ChromaDB collection
+            encoder: Model or EmbeddingWorkerPool exposing BGEM3FlagModel-style encode()
+            splitter: Text splitter (defaults to create_splitter())
+            embed_batch_size: Texts per encode() batch (defaults to settings)
+            write_page_size: Chunks per ChromaDB write (defaults to settings)
+            checkpoint_path: Checkpoint file (defaults to one per collection)
+        """
+        self.collection = collection
+        self.encoder = encoder
+        self.splitter = splitter or create_splitter()
+        self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.write_page_size = write_page_size or settings.INGEST_WRITE_PAGE_SIZE
+        self.checkpoint = IngestionCheckpoint(
+            checkpoint_path or str(Path(settings.INGEST_CHECKPOINT_DIR) / f"{collection.name}.json")
+        )
+        self.stats = {
+            "files_seen": 0,
+            "files_skipped": 0,
+            "files_failed": 0,
+            "chunks_seen": 0,
+            "chunks_skipped": 0,
+            "chunks_written": 0,
+            "chunks_deleted": 0
+        }
+
+    def _unchanged_ids(self, chunks: List[DocumentChunk]) -> set:
+        """IDs of chunks already stored with identical content and model"""
+        existing = self.collection.get(ids=[c.chunk_id for c in chunks], include=["metadatas"])
+        stored = dict(zip(existing["ids"], existing["metadatas"]))
+
+        unchanged = set()
+        retag = []
+        for chunk in chunks:
+            metadata = stored.get(chunk.chunk_id) or {}
+            if (metadata.get("content_hash") == chunk.content_hash and
+                    metadata.get("model_version") == chunk.metadata["model_version"]):
+                unchanged.add(chunk.chunk_id)
+                if metadata.get("category") != chunk.metadata["category"]:
+                    retag.append(chunk)
+        self._retag(retag)
+        return unchanged
+
+    def _retag(self, chunks: List[DocumentChunk]) -> None:
+        """Rewrite the metadata of unchanged chunks (e.g. a new category) without re-embedding"""
+        if not chunks:
+            return
+        self.collection.update(
+            ids=[c.chunk_id for c in chunks],
+            metadatas=[c.metadata for c in chunks]
+        )
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed one page of texts (the encoder batches, and may shard, internally)"""
+        dense = self.encoder.encode(
+            texts,
+            batch_size=self.embed_batch_size,
+            max_length=settings.BGE_MAX_LENGTH
+        )["dense_vecs"]
+        return [vector.tolist() for vector in dense]
+
+    def write_page(self, chunks: List[DocumentChunk]) -> None:
+        """Embed and upsert one page of chunks, skipping unchanged ones"""
+        self.stats["chunks_seen"] += len(chunks)
+        unchanged = self._unchanged_ids(chunks)
+        pending = [c for c in chunks if c.chunk_id not in unchanged]
+        self.stats["chunks_skipped"] += len(unchanged)
+
+        if not pending:
+            return
+
+        self._upsert(pending)
+        self.stats["chunks_written"] += len(pending)
+
+    def _upsert(self, chunks: List[DocumentChunk]) -> None:
+        """Embed chunks and upsert them into the collection"""
+        self.collection.upsert(
+            ids=[c.chunk_id for c in chunks],
+            documents=[c.text for c in chunks],
+            embeddings=self._embed([c.text for c in chunks]),
+            metadatas=[c.metadata for c in chunks]
+        )
+
+    def _delete_stale_chunks(self, relative_path: str, chunk_count: int) -> None:
+        """Delete a file's stored chunks from chunk_count on (left over when the file got shorter)"""
+        stored = self.collection.get(where={"source": relative_path}, include=["metadatas"])
+        stale = [
+            chunk_id for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])
+            if (metadata or {}).get("chunk_index", -1) >= chunk_count
+        ]
+        if stale:
+            self.collection.delete(ids=stale)
+            self.stats["chunks_deleted"] += len(stale)
+
+    def _flush(self, page: List[DocumentChunk], completed: List[tuple]) -> None:
+        """
+        Write a page, then checkpoint the files it completes.
+
+        Args:
+            page: Chunks to embed and write
+            completed: (relative path, file hash) of files whose last chunks are in this page
+        """
+        if page:
+            self.write_page(page)
+        for relative_path, file_hash in completed:
+            self.checkpoint.mark_done(relative_path, file_hash)
+            print(f"   ✅ {relative_path} ({self.stats['chunks_written']} chunks written so far)")
+
+    def run(self, source_dir: str = None) -> Dict[str, int]:
+        """
+        Ingest every supported file under source_dir.
+
+        Args:
+            source_dir: Directory of raw documents (defaults to settings.RAW_DOCS_DIR)
+
+        Returns:
+            Ingestion statistics
+        """
+        source_dir = source_dir or settings.RAW_DOCS_DIR
+        print(f"Ingesting documents from {source_dir} into '{self.collection.name}'...")
+
+        # Pages span file boundaries; a file is checkpointed once the page holding its last chunk is written
+        page: List[DocumentChunk] = []
+        completed = []
+
+        for path in iter_source_files(source_dir):
+            self.stats["files_seen"] += 1
+            relative_path = path.relative_to(source_dir).as_posix()
+            # Re-ingest when either the file or the embedding model changes
+            file_hash = f"{embedding_model_version()}:{hashlib.sha256(path.read_bytes()).hexdigest()}"
+
+            if self.checkpoint.is_done(relative_path, file_hash):
+                self.stats["files_skipped"] += 1
+                continue
+
+            chunk_count = 0
+            try:
+                for chunk in iter_file_chunks(path, source_dir, self.splitter):
+                    page.append(chunk)
+                    chunk_count += 1
+                    if len(page) >= self.write_page_size:
+                        self._flush(page, completed)
+                        page, completed = [], []
+            except UnicodeDecodeError as e:
+                # Raised when the file is read, before any of its chunks is queued
+                print(f"   ⚠️ Skipping {relative_path}: not valid UTF-8 ({e})")
+                self.stats["files_failed"] += 1
+                continue
+            self._delete_stale_chunks(relative_path, chunk_count)
+            completed.append((relative_path, file_hash))
+
+        self._flush(page, completed)
+        print(f"Ingestion complete: {self.stats}")
+        return self.stats
+
+    def stored_manifest(self) -> Dict[str, Dict]:
+        """
+        Manifest of chunks currently in the collection, read from metadata only.
+
+        Returns:
+            Dict of chunk_id -> {doc_path, content_hash, model_version, category}
+        """
+        manifest = {}
+        offset = 0
+        while True:
+            page = self.collection.get(limit=self.write_page_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                break
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                manifest[chunk_id] = {
+                    "doc_path": metadata.get("source"),
+                    "content_hash": metadata.get("content_hash"),
+                    "model_version": metadata.get("model_version"),
+                    "category": metadata.get("category")
+                }
+            offset += len(page["ids"])
+        return manifest
+
+    def sync(self, source_dir: str = None) -> Dict[str, int]:
+        """
+        Bring the collection in line with source_dir, touching only what changed.
+
+        Builds the (doc path, chunk id, content hash, model version) manifest
+        of the source files and compares it with the stored one. New or
+        changed chunks are embedded and upserted; chunks that no longer exist
+        are deleted. Unchanged chunks whose category changed only get their
+        metadata rewritten. Chunks without a content hash (added outside the
+        ingestion pipeline) are left alone.
+
+        Args:
+            source_dir: Root directory used for ingestion (defaults to settings.RAW_DOCS_DIR)
+
+        Returns:
+            Sync statistics
+        """
+        source_dir = source_dir or settings.RAW_DOCS_DIR
+        print(f"Syncing '{self.collection.name}' with {source_dir}...")
+
+        stored = self.stored_manifest()
+        model_version = embedding_model_version()
+        stats = {"files_failed": 0, "chunks_unchanged": 0, "chunks_retagged": 0, "chunks_upserted": 0, "chunks_deleted": 0}
+        seen = set()
+        pending = []
+        retag = []
+
+        for path in iter_source_files(source_dir):
+            try:
+                for chunk in iter_file_chunks(path, source_dir, self.splitter):
+                    seen.add(chunk.chunk_id)
+                    entry = stored.get(chunk.chunk_id)
+                    if (entry and entry["content_hash"] == chunk.content_hash and
+                            entry["model_version"] == model_version):
+                        stats["chunks_unchanged"] += 1
+                        if entry["category"] != chunk.metadata["category"]:
+                            retag.append(chunk)
+                        continue
+
+                    pending.append(chunk)
+                    if len(pending) >= self.write_page_size:
+                        self._upsert(pending)
+                        stats["chunks_upserted"] += len(pending)
+                        pending = []
+            except UnicodeDecodeError as e:
+                # Skip the file but keep whatever was stored for it
+                relative_path = path.relative_to(source_dir).as_posix()
+                print(f"   ⚠️ Skipping {relative_path}: not valid UTF-8 ({e})")
+                stats["files_failed"] += 1
+                seen.update(chunk_id for chunk_id, entry in stored.items() if entry["doc_path"] == relative_path)
+
+        if pending:
+            self._upsert(pending)
+            stats["chunks_upserted"] += len(pending)
+
+        for start in range(0, len(retag), self.write_page_size):
+            self._retag(retag[start:start + self.write_page_size])
+        stats["chunks_retagged"] = len(retag)
+
+        removed = [
+            chunk_id for chunk_id, entry in stored.items()
+            if chunk_id not in seen and entry["content_hash"] is not None
+        ]
+        for start in range(0, len(removed), self.write_page_size):
+            self.collection.delete(ids=removed[start:start + self.write_page_size])
+        stats["chunks_deleted"] = len(removed)
+
+        print(f"Sync complete: {stats}")
+        return stats
+
+
+def get_collection_version(collection) -> int:
+    """Version counter of a collection, bumped on every content change"""
+    return int((collection.metadata or {}).get("version", 0))
+
+
+def bump_collection_version(collection) -> int:
+    """
+    Increment a collection's version so downstream caches can key on it.
+
+    Returns:
+        The new version
+    """
+    version = get_collection_version(collection) + 1
+    # Distance settings cannot be re-sent to modify(), keep only our own keys
+    # (the space stays in the collection configuration, see collection_space)
+    metadata = {
+        key: value for key, value in (collection.metadata or {}).items()
+        if not key.startswith("hnsw:")
+    }
+    metadata["version"] = version
+    metadata["updated_at"] = datetime.now(timezone.utc).isoformat()
+    collection.modify(metadata=metadata)
+    return version
@@ -1,12 +1,19 @@
 """
 RAG service using BGE embeddings and ChromaDB
 """
+import json
 import google.generativeai as genai
 from chromadb import PersistentClient
-from FlagEmbedding import BGEM3FlagModel
+from pathlib import Path
 from typing import List, Dict
 
 from ..config.settings import settings
+from ..utils.context_packer import estimate_tokens, pack_context
+from ..utils.encoder_backends import get_shared_encoder
+from ..utils.lifecycle import LazyService
+from ..utils.llm_cache import GEMINI_CACHE_NAME, llm_cache
+from ..utils.llm_call import call_llm
+from ..utils.vector_quantization import load_quantized_index, query_quantized_index
 
 
 class RAGService:
@@ -18,17 +25,26 @@ class RAGService:
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
         
-        # Initialize BGE model
-        self.bge_model = BGEM3FlagModel(
-            settings.BGE_MODEL_NAME,
-            use_fp16=settings.BGE_USE_FP16
-        )
+        # Shared BGE encoder (torch or ONNX backend, see EMBEDDING_BACKEND)
+        self.bge_model = get_shared_encoder()
         
         # Initialize ChromaDB
         self.chroma_client = PersistentClient(path=settings.CHROMA_PERSIST_PATH)
         self.collection = self.chroma_client.get_collection(
             name=settings.CHROMA_COLLECTION_NAME
         )
+        
+        # Optional quantized index (int8/binary codes + on-disk rescoring)
+        self.quantized_index_dir = str(Path(settings.QUANTIZED_INDEX_DIR) / settings.CHROMA_COLLECTION_NAME)
+        if settings.VECTOR_QUANTIZATION != "none" and self.quantized_index is None:
+            print(f"⚠️ Quantized index not found in {self.quantized_index_dir}, using ChromaDB search")
+    
+    @property
+    def quantized_index(self):
+        """Current quantized index (reloaded after a rebuild), or None to search ChromaDB"""
+        if settings.VECTOR_QUANTIZATION == "none":
+            return None
+        return load_quantized_index(self.quantized_index_dir)
     
     def get_embedding(self, text: str, max_length: int = None) -> List[float]:
         """
@@ -63,6 +79,17 @@ class RAGService:
             ChromaDB query results
         """
         query_embeddings = self.get_embedding(user_query)
+        
+        quantized_index = self.quantized_index
+        if quantized_index is not None:
+            return query_quantized_index(
+                quantized_index,
+                self.collection,
+                query_embeddings,
+                settings.CHROMA_N_RESULTS,
+                rescore_multiplier=settings.QUANTIZED_RESCORE_MULTIPLIER
+            )
+        
         results = self.collection.query(
             query_embeddings=[query_embeddings],
             n_results=settings.CHROMA_N_RESULTS
@@ -112,14 +139,24 @@ VOTRE RÉPONSE :"""
         Returns:
             Generated answer text
         """
-        response = self.gemini_model.generate_content(
+        generation_config = {
+            "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
+            "temperature": settings.GEMINI_TEMPERATURE
+        }
+        text, _ = llm_cache.cached_call(
+            GEMINI_CACHE_NAME,
+            settings.GEMINI_MODEL_NAME,
+            json.dumps(generation_config, sort_keys=True),
             prompt,
-            generation_config={
-                "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
-                "temperature": settings.GEMINI_TEMPERATURE
-            }
+            lambda: call_llm(
+                GEMINI_CACHE_NAME,
+                lambda: self.gemini_model.generate_content(prompt, generation_config=generation_config),
+                provider="gemini",
+                tokens=estimate_tokens(prompt),
+                model=settings.GEMINI_MODEL_NAME
+            ).text
         )
-        return response.text
+        return text
     
     def query_doxa_rag(self, user_query: str) -> Dict[str, any]:
         """
@@ -134,8 +171,9 @@ VOTRE RÉPONSE :"""
         # Get relevant documents
         relevant_docs = self.get_relevant_docs(user_query)
         
-        # Create RAG prompt
-        prompt = self.make_rag_prompt(user_query, relevant_docs['documents'][0])
+        # Create RAG prompt (near-duplicates dropped, trimmed to the context budget)
+        packed = pack_context(relevant_docs['documents'][0])
+        prompt = self.make_rag_prompt(user_query, packed.documents)
         
         # Generate answer
         answer = self.ask_rag(prompt)
@@ -148,4 +186,4 @@ VOTRE RÉPONSE :"""
 
 
 # Global instance
-rag_service = RAGService()
+rag_service = LazyService("rag_service", RAGService)
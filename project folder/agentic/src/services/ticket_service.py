@@ -5,6 +5,7 @@ from typing import Dict
 
 from ..services.classification_service import classification_service
 from ..services.rag_service import rag_service
+from ..utils.lifecycle import LazyService
 
 
 class TicketService:
@@ -43,4 +44,4 @@ class TicketService:
 
 
 # Global instance
-ticket_service = TicketService()
+ticket_service = LazyService("ticket_service", TicketService)
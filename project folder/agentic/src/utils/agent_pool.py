@@ -0,0 +1,35 @@
+"""
+Pools of agno agent/team copies leased to one run at a time
+agno keeps run state on the Agent/Team instance, so runs in flight at the same
+time each need their own copy. Idle copies are kept and handed out again; a
+pool grows to the peak number of concurrent runs of its agent.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+class AgentPool:
+    """Idle deep copies of one agent or team (thread-safe)"""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self._idle: List = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, count: int = 1) -> Iterator[List]:
+        """Lease count copies, built with deep_copy() when none are idle; they return to the pool on exit"""
+        with self._lock:
+            copies = [self._idle.pop() for _ in range(min(count, len(self._idle)))]
+        copies += [self.agent.deep_copy() for _ in range(count - len(copies))]
+        try:
+            yield copies
+        finally:
+            with self._lock:
+                self._idle.extend(copies)
+
+    def idle(self) -> int:
+        """Number of copies not leased right now"""
+        with self._lock:
+            return len(self._idle)
@@ -0,0 +1,137 @@
+"""
+Context budget manager for RAG prompt assembly
+Orders retrieved chunks by score, drops near-duplicates (MinHash over
+character shingles) and trims the context to an input token budget;
+also sizes the Gemini output cap to the expected answer type
+"""
+import math
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from ..config.settings import settings
+
+
+# MinHash parameters: 64 permutations over 5-character shingles
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 5
+_MERSENNE_PRIME = (1 << 31) - 1  # keeps (a * x + b) within uint64 for 32-bit shingle hashes
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+# Expected answer length (tokens) per Query Analyzer intent
+ANSWER_TOKEN_CAPS = {
+    "how_to": 1024,
+    "troubleshooting": 1024,
+    "comparison": 768,
+    "information": 512,
+    "pricing": 512,
+    "account": 512,
+    "complaint": 512,
+    "feature_request": 384
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token for Gemini/SentencePiece)"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash signature of a text's character shingles (whitespace/case normalized)"""
+    normalized = re.sub(r"\s+", " ", text.lower()).strip()
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod p for every permutation, then the minimum per permutation
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def estimated_jaccard(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Jaccard similarity estimated from two MinHash signatures"""
+    return float(np.mean(signature_a == signature_b))
+
+
+@dataclass
+class PackedContext:
+    """Result of packing retrieved chunks into the prompt budget"""
+    documents: List[str] = field(default_factory=list)
+    indices: List[int] = field(default_factory=list)  # retrieval positions of the selected chunks
+    raw_tokens: int = 0
+    packed_tokens: int = 0
+    duplicates_dropped: int = 0
+    budget_dropped: int = 0
+
+
+def pack_context(
+    documents: List[str],
+    scores: Optional[List[float]] = None,
+    token_budget: int = None,
+    dedup_threshold: float = None
+) -> PackedContext:
+    """
+    Select the chunks that go into the RAG prompt.
+
+    Chunks are taken best score first; a chunk whose estimated Jaccard
+    similarity with an already selected one reaches dedup_threshold is
+    dropped, and chunks stop being added once the token budget is used.
+    The best chunk is always kept (truncated if it alone exceeds the budget).
+
+    Args:
+        documents: Retrieved chunks, in retrieval order
+        scores: Relevance scores (higher is better); retrieval order if None
+        token_budget: Input token budget for the context (defaults to settings)
+        dedup_threshold: Near-duplicate threshold (defaults to settings)
+
+    Returns:
+        PackedContext with the selected chunks and token accounting
+    """
+    token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+    dedup_threshold = settings.RAG_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+
+    packed = PackedContext(raw_tokens=sum(estimate_tokens(doc) for doc in documents))
+    if scores is None or len(scores) != len(documents):
+        scores = [-rank for rank in range(len(documents))]
+    order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+
+    signatures = []
+    for i in order:
+        doc = documents[i]
+        signature = minhash_signature(doc)
+        if any(estimated_jaccard(signature, kept) >= dedup_threshold for kept in signatures):
+            packed.duplicates_dropped += 1
+            continue
+
+        tokens = estimate_tokens(doc)
+        if packed.packed_tokens + tokens > token_budget:
+            if packed.documents:
+                packed.budget_dropped += 1
+                continue
+            doc = doc[:token_budget * 4]
+            tokens = estimate_tokens(doc)
+
+        packed.documents.append(doc)
+        packed.indices.append(i)
+        packed.packed_tokens += tokens
+        signatures.append(signature)
+
+    return packed
+
+
+def output_token_cap(intent: str = None) -> int:
+    """
+    max_output_tokens for Gemini, sized to the expected answer.
+
+    Gemini 2.5 models count thinking tokens against max_output_tokens, so
+    GEMINI_THINKING_TOKEN_ALLOWANCE is added on top of the answer cap.
+    """
+    answer_cap = ANSWER_TOKEN_CAPS.get(intent, settings.RAG_OUTPUT_TOKEN_CAP)
+    return min(settings.GEMINI_MAX_OUTPUT_TOKENS, answer_cap + settings.GEMINI_THINKING_TOKEN_ALLOWANCE)
@@ -0,0 +1,58 @@
+"""
+Request deadline and per-stage time budgets
+The pipeline carries one deadline per request (the caller's X-Request-Timeout-Ms,
+capped by PIPELINE_DEADLINE_MS). Before an optional stage runs, the remaining
+time must cover the stage's budget plus the budgets of the required stages
+still ahead; otherwise the stage is replaced by its local fallback.
+"""
+import time
+from typing import Optional
+
+from ..config.settings import settings
+
+
+# Expected worst-case duration (ms) of each stage
+STAGE_BUDGETS_MS = {
+    # Optional: skipped or replaced by a local fallback when time is short
+    "query_analysis": 2500,
+    "language_detection": 1500,
+    "confidence": 3000,
+    "response_composition": 4000,
+    "rag_retry": 8000,
+    # Required: reserved while deciding on optional stages before them
+    "context_enrichment": 2500,
+    "rag_pipeline": 8000
+}
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+
+class Deadline:
+    """Absolute deadline of one pipeline run"""
+
+    def __init__(self, timeout_ms: Optional[int] = None):
+        """
+        Args:
+            timeout_ms: Caller's timeout (e.g. from the X-Request-Timeout-Ms header);
+                        the service's own PIPELINE_DEADLINE_MS applies if it is shorter
+        """
+        budget_ms = settings.PIPELINE_DEADLINE_MS
+        if timeout_ms:
+            budget_ms = min(budget_ms, timeout_ms - settings.PIPELINE_DEADLINE_MARGIN_MS)
+        self.budget_ms = max(budget_ms, 0)
+        self._expires_at = time.perf_counter() + self.budget_ms / 1000
+
+    def remaining_ms(self) -> int:
+        """Milliseconds left before the deadline (0 once it has passed)"""
+        return max(int((self._expires_at - time.perf_counter()) * 1000), 0)
+
+    def allows(self, stage: str, *reserved_stages: str) -> bool:
+        """
+        Whether there is time to run stage and still run the required stages after it.
+
+        Args:
+            stage: Optional stage about to run
+            reserved_stages: Required stages that still have to fit afterwards
+        """
+        needed = STAGE_BUDGETS_MS[stage] + sum(STAGE_BUDGETS_MS[name] for name in reserved_stages)
+        return self.remaining_ms() >= needed
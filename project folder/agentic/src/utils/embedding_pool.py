@@ -0,0 +1,148 @@
+"""
+Multi-process BGE-M3 embedding pool for large ingests
+Each worker process loads the encoder once with a fixed thread count;
+batches are sharded across workers and results stream back in order
+"""
+import os
+import time
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger("agentic.embedding")
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(backend: str, torch_threads: int) -> None:
+    """Worker initializer: pin thread counts, then load the model"""
+    global _worker_model
+
+    # Must be set before torch is imported in this process
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+
+    from .encoder_backends import create_encoder
+
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(torch_threads)
+    _worker_model = create_encoder(backend, threads=torch_threads)
+
+
+def _encode_batch(task: Tuple[int, List[str], int, int]) -> Tuple[int, np.ndarray, float, int]:
+    """Encode one batch in a worker; returns (batch_id, vectors, seconds, pid)"""
+    batch_id, texts, batch_size, max_length = task
+    started = time.perf_counter()
+    dense = _worker_model.encode(texts, batch_size=batch_size, max_length=max_length)["dense_vecs"]
+    return batch_id, np.asarray(dense, dtype=np.float32), time.perf_counter() - started, os.getpid()
+
+
+class EmbeddingWorkerPool:
+    """
+    Pool of embedding worker processes with a BGEM3FlagModel-compatible encode().
+
+    Usage:
+        with EmbeddingWorkerPool(workers=8) as pool:
+            vectors = pool.encode(texts, batch_size=12, max_length=8192)["dense_vecs"]
+        print(pool.throughput_report())
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        backend: str = "torch",
+        torch_threads: Optional[int] = None
+    ):
+        """
+        Start the worker processes.
+
+        Args:
+            workers: Number of worker processes
+            backend: Encoder backend loaded in each worker ('torch' or 'onnx')
+            torch_threads: Torch (or ONNX intra-op) threads per worker (defaults to cores / workers)
+        """
+        self.workers = workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+        # spawn: fresh interpreters, no inherited torch thread pools
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, self.torch_threads)
+        )
+        self.worker_stats: Dict[int, Dict[str, float]] = defaultdict(lambda: {"chunks": 0, "seconds": 0.0})
+        self._started = time.perf_counter()
+        logger.info("Started embedding pool: %d workers x %d threads", workers, self.torch_threads)
+
+    def imap(self, batches: Iterator[List[str]], batch_size: int, max_length: int) -> Iterator[np.ndarray]:
+        """
+        Encode batches across workers, yielding results in input order.
+
+        At most 2 batches per worker are in flight, so memory stays bounded
+        however long the input iterator is.
+        """
+        pending = {}
+        next_id = 0
+        next_to_yield = 0
+        max_in_flight = self.workers * 2
+        batches = iter(batches)
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    texts = next(batches)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[next_id] = self.executor.submit(_encode_batch, (next_id, texts, batch_size, max_length))
+                next_id += 1
+
+            if next_to_yield not in pending:
+                return
+
+            _, vectors, seconds, pid = pending.pop(next_to_yield).result()
+            self.worker_stats[pid]["chunks"] += len(vectors)
+            self.worker_stats[pid]["seconds"] += seconds
+            next_to_yield += 1
+            yield vectors
+
+    def encode(self, texts: List[str], batch_size: int = 12, max_length: int = 8192) -> Dict[str, np.ndarray]:
+        """Encode texts by sharding batches across workers (same shape as BGEM3FlagModel.encode)"""
+        batches = (texts[start:start + batch_size] for start in range(0, len(texts), batch_size))
+        vectors = list(self.imap(batches, batch_size, max_length))
+        return {"dense_vecs": np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)}
+
+    def throughput_report(self) -> Dict[str, object]:
+        """Chunks/sec per worker (busy time) and overall (wall time)"""
+        wall_seconds = time.perf_counter() - self._started
+        total_chunks = sum(stats["chunks"] for stats in self.worker_stats.values())
+        return {
+            "workers": {
+                str(pid): {
+                    "chunks": int(stats["chunks"]),
+                    "chunks_per_sec": round(stats["chunks"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+                }
+                for pid, stats in self.worker_stats.items()
+            },
+            "total_chunks": int(total_chunks),
+            "overall_chunks_per_sec": round(total_chunks / wall_seconds, 2) if wall_seconds else 0.0
+        }
+
+    def close(self) -> None:
+        """Shut the worker processes down"""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> "EmbeddingWorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,208 @@
+"""
+Pluggable dense encoder backends for BGE-M3
+- torch: FlagEmbedding BGEM3FlagModel (default)
+- onnx:  ONNX Runtime session over an exported model, optionally int8-quantized
+Both expose BGEM3FlagModel's encode(texts, batch_size, max_length) -> {"dense_vecs": ...}
+"""
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from ..config.settings import settings
+from .lifecycle import LazyService
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+
+
+def encoder_model_version(backend: str = None) -> str:
+    """
+    Identifier of the vectors a backend produces, stored with every chunk.
+
+    FP32 ONNX output matches torch to within rounding, so both share the
+    model name. Int8 quantization shifts vectors measurably and gets its own
+    version, which makes sync re-embed the corpus when switching to it.
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "onnx" and settings.ONNX_QUANTIZE_INT8:
+        return f"{settings.BGE_MODEL_NAME}@onnx-int8"
+    return settings.BGE_MODEL_NAME
+
+
+class TorchBGEEncoder:
+    """BGE-M3 dense encoder running on PyTorch via FlagEmbedding"""
+
+    def __init__(self, model_name: str = None, use_fp16: bool = None):
+        from FlagEmbedding import BGEM3FlagModel
+
+        self.model_version = encoder_model_version("torch")
+        self.model = BGEM3FlagModel(
+            model_name or settings.BGE_MODEL_NAME,
+            use_fp16=settings.BGE_USE_FP16 if use_fp16 is None else use_fp16
+        )
+
+    def encode(self, texts: List[str], batch_size: int = 12, max_length: int = None) -> Dict[str, np.ndarray]:
+        """Encode texts into normalized dense vectors"""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            max_length=max_length or settings.BGE_MAX_LENGTH
+        )
+
+
+def export_bge_to_onnx(model_name: str, output_dir: str, quantize_int8: bool = False) -> Path:
+    """
+    Export the BGE-M3 transformer to ONNX, optionally with dynamic int8 quantization.
+
+    Args:
+        model_name: Hugging Face model name or local path
+        output_dir: Directory for the ONNX files and tokenizer
+        quantize_int8: Also write a dynamically quantized int8 model
+
+    Returns:
+        Path of the model file to load
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_path / ONNX_MODEL_FILE
+
+    if not fp32_path.exists():
+        print(f"Exporting {model_name} to ONNX in {output_path}...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+
+        dummy = tokenizer(["Doxa export"], return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                str(fp32_path),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state", "pooler_output"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"}
+                },
+                opset_version=17
+            )
+        tokenizer.save_pretrained(str(output_path))
+
+    if not quantize_int8:
+        return fp32_path
+
+    int8_path = output_path / ONNX_INT8_MODEL_FILE
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"Quantizing {fp32_path} to int8...")
+        quantize_dynamic(
+            str(fp32_path),
+            str(int8_path),
+            weight_type=QuantType.QInt8,
+            use_external_data_format=True  # bge-m3 weights exceed the 2GB protobuf limit
+        )
+    return int8_path
+
+
+class ONNXBGEEncoder:
+    """BGE-M3 dense encoder running on ONNX Runtime (CPU)"""
+
+    def __init__(
+        self,
+        model_name: str = None,
+        onnx_dir: str = None,
+        quantize_int8: bool = None,
+        intra_op_threads: int = None
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_name = model_name or settings.BGE_MODEL_NAME
+        onnx_dir = onnx_dir or settings.ONNX_MODEL_DIR
+        quantize_int8 = settings.ONNX_QUANTIZE_INT8 if quantize_int8 is None else quantize_int8
+        intra_op_threads = settings.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+
+        model_path = export_bge_to_onnx(model_name, onnx_dir, quantize_int8)
+        self.model_version = f"{model_name}@onnx-int8" if quantize_int8 else model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            session_options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"]
+        )
+
+    def encode(self, texts: List[str], batch_size: int = 12, max_length: int = None) -> Dict[str, np.ndarray]:
+        """Encode texts into normalized dense vectors (CLS pooling, as BGE-M3)"""
+        max_length = max_length or settings.BGE_MAX_LENGTH
+        if not texts:
+            return {"dense_vecs": np.empty((0, 0), dtype=np.float32)}
+
+        # Length-sorted batches minimize padding; original order is restored below
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = [None] * len(texts)
+
+        for start in range(0, len(texts), batch_size):
+            batch_rows = order[start:start + batch_size]
+            tokens = self.tokenizer(
+                [texts[row] for row in batch_rows],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors="np"
+            )
+            hidden = self.session.run(
+                ["last_hidden_state"],
+                {
+                    "input_ids": tokens["input_ids"].astype(np.int64),
+                    "attention_mask": tokens["attention_mask"].astype(np.int64)
+                }
+            )[0]
+            cls = hidden[:, 0]
+            cls = cls / np.linalg.norm(cls, axis=1, keepdims=True)
+            for row, vector in zip(batch_rows, cls):
+                vectors[row] = vector
+
+        return {"dense_vecs": np.asarray(vectors, dtype=np.float32)}
+
+
+def create_encoder(backend: str = None, threads: int = None):
+    """
+    Create a dense encoder for the configured backend.
+
+    Args:
+        backend: 'torch' or 'onnx' (defaults to settings.EMBEDDING_BACKEND)
+        threads: ONNX Runtime intra-op threads (defaults to settings.ONNX_INTRA_OP_THREADS);
+                 torch threads are set process-wide with torch.set_num_threads
+
+    Returns:
+        Encoder exposing encode(texts, batch_size, max_length)
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "torch":
+        return TorchBGEEncoder()
+    if backend == "onnx":
+        return ONNXBGEEncoder(intra_op_threads=threads)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+
+# Process-wide encoder, loaded on first use or during startup warm-up
+shared_encoder = LazyService("encoder", create_encoder)
+
+
+def get_shared_encoder():
+    """Process-wide encoder, so services share one loaded model"""
+    return shared_encoder
@@ -0,0 +1,173 @@
+"""
+Lazy service construction and staged warm-up
+Module-level singletons are wrapped in LazyService so importing a module no
+longer loads models, opens ChromaDB or builds agents. The FastAPI lifespan
+warms them up in stages, retrying a failed stage with backoff, and readiness
+is reported per component.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+# Longest wait between two warm-up attempts, in seconds
+WARM_UP_MAX_RETRY_DELAY = 60.0
+
+
+class LazyService:
+    """
+    Proxy that builds the wrapped object on first attribute access.
+
+    Usage:
+        rag_service = LazyService("rag_service", RAGService)
+        rag_service.query_doxa_rag(...)   # RAGService() is built here, once
+
+    The proxy forwards every attribute to the real object, so existing
+    `from ..services.rag_service import rag_service` imports keep working.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object]):
+        """
+        Args:
+            name: Component name reported by /readyz
+            factory: Zero-argument callable building the real object
+        """
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_load_ms", None)
+        object.__setattr__(self, "_error", None)
+        service_registry.register(self)
+
+    # Proxy internals are underscored so they never shadow the wrapped object's attributes
+
+    def _load(self):
+        """Return the real object, building it on first call (thread-safe)"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                try:
+                    instance = self._factory()
+                except Exception as e:
+                    object.__setattr__(self, "_error", str(e))
+                    raise
+                object.__setattr__(self, "_load_ms", round((time.perf_counter() - started) * 1000, 2))
+                object.__setattr__(self, "_error", None)
+                object.__setattr__(self, "_instance", instance)
+            return self._instance
+
+    def _status(self) -> Dict:
+        """Load state of this component"""
+        return {"loaded": self._instance is not None, "load_ms": self._load_ms, "error": self._error}
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._instance is not None else "not loaded"
+        return f"<LazyService {self._name} ({state})>"
+
+
+class ServiceRegistry:
+    """Registry of lazy components plus the readiness state of the process"""
+
+    def __init__(self):
+        self.services: Dict[str, LazyService] = {}
+        self.ready = False
+        self.warm_up_error: Optional[str] = None
+        self.warm_up_ms: Optional[float] = None
+        self.failed_stage: Optional[int] = None
+        self.warm_up_attempts = 0
+        self.warm_up_gave_up = False
+        self._warmed: set = set()
+
+    def register(self, service: LazyService) -> None:
+        self.services[service._name] = service
+
+    def component_status(self) -> Dict[str, Dict]:
+        """Load state of every registered component"""
+        return {name: service._status() for name, service in self.services.items()}
+
+    def warm_up(
+        self,
+        stages: List[List[str]],
+        on_loaded: Dict[str, Callable] = None,
+        max_retries: int = 0,
+        retry_delay: float = 2.0
+    ) -> bool:
+        """
+        Build components stage by stage, then mark the process ready.
+
+        A failed attempt is retried after retry_delay seconds, doubled per
+        retry (capped at WARM_UP_MAX_RETRY_DELAY). Components that already
+        loaded are kept, so a retry resumes at the failed one; until then
+        failed_stage and warm_up_error say what went wrong.
+
+        Args:
+            stages: Ordered groups of component names; a stage starts once the previous one is loaded
+            on_loaded: Optional per-component hooks run right after loading (e.g. a dummy encode)
+            max_retries: Retries after a failed attempt
+            retry_delay: Seconds before the first retry
+
+        Returns:
+            True if every component loaded
+        """
+        started = time.perf_counter()
+        self.ready = False
+        self.warm_up_gave_up = False
+
+        for attempt in range(max_retries + 1):
+            self.warm_up_attempts = attempt + 1
+            if self._warm_up_once(stages, on_loaded or {}):
+                self.warm_up_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.ready = True
+                print(f"✅ Service warm-up complete in {self.warm_up_ms:.0f}ms")
+                return True
+
+            if attempt < max_retries:
+                delay = min(retry_delay * 2 ** attempt, WARM_UP_MAX_RETRY_DELAY)
+                print(f"   🔁 Retrying warm-up in {delay:.0f}s (attempt {attempt + 2}/{max_retries + 1})")
+                time.sleep(delay)
+
+        self.warm_up_gave_up = True
+        return False
+
+    def _warm_up_once(self, stages: List[List[str]], on_loaded: Dict[str, Callable]) -> bool:
+        """One pass over the stages, skipping components warmed by an earlier attempt"""
+        for stage_number, names in enumerate(stages, start=1):
+            if all(name in self._warmed for name in names):
+                continue
+            for name in names:
+                if name in self._warmed:
+                    continue
+                try:
+                    instance = self.services[name]._load()
+                    if name in on_loaded:
+                        on_loaded[name](instance)
+                except Exception as e:
+                    self.failed_stage = stage_number
+                    self.warm_up_error = f"{name}: {e}"
+                    print(f"❌ Warm-up failed at stage {stage_number} ({name}): {e}")
+                    return False
+                self._warmed.add(name)
+            print(f"   ✅ Stage {stage_number} ready: {', '.join(names)}")
+
+        self.failed_stage = None
+        self.warm_up_error = None
+        return True
+
+    def mark_ready(self) -> None:
+        """Mark ready without warm-up (components then load on first use)"""
+        self.ready = True
+
+
+# Global instance
+service_registry = ServiceRegistry()
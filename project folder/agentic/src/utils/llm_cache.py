@@ -0,0 +1,237 @@
+"""
+Exact-match cache for deterministic LLM calls
+Responses are keyed by (agent name, model id, instructions hash, input hash)
+and kept in an in-memory LRU, optionally backed by SQLite so they survive
+restarts. Only agents listed in LLM_CACHE_TTLS are cached, each with its TTL.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config.settings import settings
+from .llm_call import run_error
+
+
+# Agent name of Gemini answer generation in the cache (see LLM_CACHE_TTLS)
+GEMINI_CACHE_NAME = "Gemini RAG Generation"
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(agent_name: str, model_id: str, instructions: str, input_text: str) -> str:
+    """Cache key of one call: agent, model, hashed instructions and hashed input"""
+    return text_hash(json.dumps([agent_name, model_id, text_hash(instructions), text_hash(input_text)]))
+
+
+def agent_instructions(agent) -> str:
+    """Everything in an agno agent/team definition that shapes its output, as one string"""
+    parts = [
+        str(getattr(agent, "system_message", None) or ""),
+        str(getattr(agent, "description", None) or ""),
+        json.dumps(getattr(agent, "instructions", None), default=str),
+        str(getattr(getattr(agent, "model", None), "temperature", None))
+    ]
+    for member in getattr(agent, "members", None) or []:
+        parts.append(agent_instructions(member))
+    return "\n".join(parts)
+
+
+class LLMResponseCache:
+    """LRU of LLM responses with per-agent TTLs, hit-rate counters and optional SQLite persistence"""
+
+    def __init__(self, max_entries: int = None, path: str = None, ttls: Dict[str, int] = None):
+        """
+        Args:
+            max_entries: In-memory LRU size (defaults to settings)
+            path: SQLite file for persistence; memory only when empty (defaults to settings)
+            ttls: Seconds to keep responses per agent name; unlisted agents are not cached
+        """
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self._ttls = ttls
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+        path = settings.LLM_CACHE_PATH if path is None else path
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT, expires_at REAL)"
+            )
+            self._db.commit()
+
+    @property
+    def ttls(self) -> Dict[str, int]:
+        return settings.LLM_CACHE_TTLS if self._ttls is None else self._ttls
+
+    def caches(self, agent_name: str) -> bool:
+        """Whether responses of this agent are cached"""
+        return settings.LLM_CACHE_ENABLED and agent_name in self.ttls
+
+    def _count(self, agent_name: str, outcome: str) -> None:
+        stats = self._stats.setdefault(agent_name, {"hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+    def get(self, agent_name: str, key: str) -> Optional[str]:
+        """Cached response, or None on a miss (expired entries are dropped)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._entries[key] = entry
+            if entry is not None and entry[1] <= now:
+                self._delete(key)
+                entry = None
+
+            if entry is None:
+                self._count(agent_name, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(agent_name, "hits")
+            return entry[0]
+
+    def set(self, agent_name: str, key: str, response: str) -> None:
+        """Store a response for the agent's TTL"""
+        expires_at = time.time() + self.ttls.get(agent_name, 0)
+        with self._lock:
+            self._entries[key] = (response, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                self._db.commit()
+
+    def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    def cached_call(
+        self,
+        agent_name: str,
+        model_id: str,
+        instructions: str,
+        input_text: str,
+        call: Callable[[], Optional[str]]
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Return the cached response for this call, or run call() and cache its result.
+
+        Empty responses are not cached.
+
+        Returns:
+            (response, hit)
+        """
+        if not self.caches(agent_name):
+            return call(), False
+
+        key = cache_key(agent_name, model_id, instructions, input_text)
+        cached = self.get(agent_name, key)
+        if cached is not None:
+            return cached, True
+
+        response = call()
+        if isinstance(response, str) and response.strip():
+            self.set(agent_name, key, response)
+        return response, False
+
+    def stats(self) -> Dict:
+        """Hits, misses and hit rate per agent, plus the LRU size"""
+        with self._lock:
+            agents = {
+                name: {**counts, "hit_rate": round(counts["hits"] / max(counts["hits"] + counts["misses"], 1), 3)}
+                for name, counts in self._stats.items()
+            }
+            total_hits = sum(counts["hits"] for counts in self._stats.values())
+            total = total_hits + sum(counts["misses"] for counts in self._stats.values())
+            return {
+                "entries": len(self._entries),
+                "hit_rate": round(total_hits / max(total, 1), 3),
+                "agents": agents
+            }
+
+
+@dataclass
+class CachedRunOutput:
+    """Stand-in for an agno RunOutput served from the cache"""
+    content: str
+    cached: bool = True
+
+
+class CachedAgent:
+    """
+    Agent/team proxy whose run() is served from the LLM cache for repeated plain-text inputs.
+
+    run_agent goes through run_cached, so the cache is checked before the call
+    reaches call_llm and a hit never takes a rate-limiter slot, a timeout or a
+    hedge. Every other attribute is forwarded to the wrapped agent.
+    """
+
+    def __init__(self, agent, cache: "LLMResponseCache"):
+        object.__setattr__(self, "_agent", agent)
+        object.__setattr__(self, "_cache", cache)
+        object.__setattr__(self, "_instructions", agent_instructions(agent))
+
+    def run(self, input, *args, **kwargs):
+        if args or kwargs:
+            return self._agent.run(input, *args, **kwargs)
+        return self.run_cached(input, lambda agent: agent.run(input))
+
+    def run_cached(self, input, run: Callable[[Any], Any]):
+        """
+        Serve input from the cache, or make the real call and cache its result.
+
+        Args:
+            input: Agent input
+            run: Makes the call on the wrapped agent, e.g. through call_llm
+
+        Returns:
+            CachedRunOutput on a hit, otherwise the run's own output
+        """
+        agent = self._agent
+        if not isinstance(input, str) or not self._cache.caches(agent.name):
+            return run(agent)
+
+        responses = []
+
+        def call():
+            responses.append(run(agent))
+            # Failed runs carry the error text as content; never cache it
+            return None if run_error(responses[0]) else responses[0].content
+
+        content, hit = self._cache.cached_call(
+            agent.name, str(getattr(agent.model, "id", "")), self._instructions, input, call
+        )
+        if hit:
+            print(f"   💾 LLM cache hit: {agent.name}")
+            return CachedRunOutput(content=content)
+        return responses[0]
+
+    def __getattr__(self, attr):
+        return getattr(self._agent, attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._agent, attr, value)
+
+
+# Global instance
+llm_cache = LLMResponseCache()
@@ -0,0 +1,447 @@
+"""
+Shared wrapper for LLM calls: per-agent timeouts, jittered retries and hedging
+Every agno Agent/Team run and Gemini generate_content call goes through
+call_llm. A call that exceeds its agent's timeout or fails with a retryable
+error (timeouts, 429, 5xx) is retried with full-jitter exponential backoff;
+with hedging on, a duplicate is fired once the call outlives the agent's
+observed p95 and the first response wins. Calls wait for the provider's
+rate limiter (see rate_limiter). Routed roles go through call_routed, which
+fails over between the role's targets (see llm_router). Retries, hedges,
+timeouts, failovers, queue waits and the tokens/cost of every attempt (see
+llm_usage) are recorded on the active PipelineTracer.
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, Callable, Deque, Dict, Optional
+
+from ..config.settings import settings
+from .agent_pool import AgentPool
+from .context_packer import estimate_tokens
+from .llm_router import complete, llm_router, parse_target
+from .llm_usage import measure_usage, usage_ledger
+from .pipeline_tracer import current_tracer, span
+from .rate_limiter import ProviderLimiter, rate_limiters
+
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Markers of transient failures in error messages (agno reports failed runs as text)
+RETRYABLE_MARKERS = (
+    "timeout", "timed out", "rate limit", "too many requests", "overloaded",
+    "unavailable", "connection", "resourceexhausted"
+)
+RATE_LIMIT_MARKERS = ("rate limit", "too many requests", "resourceexhausted")
+
+# HTTP status quoted in an error message, e.g. "status code 503" or "Error code: 429"
+STATUS_IN_MESSAGE = re.compile(r"\b(?:status(?:_code)?|code|http)\b\D{0,4}\b([1-5]\d{2})\b", re.IGNORECASE)
+
+# Latency samples kept per agent for the hedging p95
+LATENCY_WINDOW = 200
+
+
+class LLMCallError(Exception):
+    """An LLM call that returned an error response instead of raising"""
+
+
+class LLMCallTimeout(TimeoutError):
+    """An LLM call that exceeded its agent's timeout"""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """
+    HTTP status of a provider error: the status_code/code attribute of the
+    exception or its response, else a status quoted in the message (agno
+    reports failed runs as text)
+    """
+    for source in (error, getattr(error, "response", None)):
+        for attribute in ("status_code", "code", "http_status"):
+            value = getattr(source, attribute, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    match = STATUS_IN_MESSAGE.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient (timeout, rate limit, 5xx) and worth retrying"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether an error is a provider rate limit (429)"""
+    status = status_code(error)
+    if status is not None:
+        return status == 429
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def run_error(response) -> Optional[str]:
+    """Error message of an agno run that failed (agno returns failed runs instead of raising)"""
+    status = getattr(response, "status", None)
+    if status is not None and getattr(status, "value", status) == "ERROR":
+        return str(getattr(response, "content", None) or "agent run failed")
+    return None
+
+
+class LatencyStats:
+    """Rolling latency samples per agent (successful calls only)"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Dict[str, Deque[float]] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self._window)).append(seconds)
+
+    def p95(self, name: str) -> Optional[float]:
+        """95th percentile latency in seconds, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+
+class AbandonedCalls:
+    """Count of timed-out calls still running on the LLM pool"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, future) -> None:
+        with self._lock:
+            self.count += 1
+        future.add_done_callback(self._finished)
+
+    def _finished(self, _future) -> None:
+        with self._lock:
+            self.count -= 1
+
+    def saturated(self) -> bool:
+        """Whether timeouts should stop adding calls (retries, hedges) to the pool"""
+        return self.count >= settings.LLM_MAX_ABANDONED_CALLS
+
+
+# Global instances
+latency_stats = LatencyStats()
+abandoned_calls = AbandonedCalls()
+_agent_pools: Dict[str, AgentPool] = {}
+_agent_pools_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=settings.LLM_CALL_WORKERS, thread_name_prefix="llm-call")
+
+
+def _submit(
+    name: str,
+    call: Callable[[], Any],
+    limiter: Optional[ProviderLimiter],
+    check,
+    on_response: Callable[[Any, float], None]
+):
+    """
+    Run call on the LLM pool, carrying the caller's context (active tracer).
+
+    future.running is set once a worker starts the call, and
+    future.started_at holds that time. When the call finishes, even if the
+    caller stopped waiting for it, the limiter slot is returned and
+    on_response(response, latency) accounts for any response it produced.
+    """
+    running = threading.Event()
+    started_at = []
+
+    def run():
+        started_at.append(time.perf_counter())
+        running.set()
+        return call()
+
+    future = _executor.submit(copy_context().run, run)
+    future.running = running
+    future.started_at = started_at
+
+    def finished(done):
+        if done.cancelled():
+            if limiter is not None:
+                limiter.release(None, key=name)
+            return
+        latency = time.perf_counter() - started_at[0]
+        error = done.exception()
+        if error is None:
+            on_response(done.result(), latency)
+            if check:
+                message = check(done.result())
+                error = LLMCallError(message) if message else None
+        if limiter is not None:
+            if error is None:
+                limiter.release(latency, key=name)
+            else:
+                limiter.release(None, rate_limited=is_rate_limited(error), key=name)
+
+    future.add_done_callback(finished)
+    return future
+
+
+def _run_once(
+    name: str,
+    call: Callable[[], Any],
+    timeout: float,
+    check: Optional[Callable[[Any], Optional[str]]],
+    limiter: Optional[ProviderLimiter],
+    tokens: int,
+    model: str
+):
+    """
+    One attempt: the call, plus a hedged duplicate after the agent's p95
+    (only when the provider has a free slot).
+
+    The timeout runs from the moment a worker starts the call, so calls that
+    queue for a worker during a slowdown are not timed out (and retried) before
+    they have been sent; a call that gets no worker within the timeout is
+    cancelled.
+
+    Returns:
+        (response, None) on success, (last response or None, error) otherwise
+    """
+    tracer = current_tracer()
+    stage = tracer.current_stage() if tracer else None
+
+    def account(response, latency):
+        usage = measure_usage(name, model, response, tokens, latency)
+        usage_ledger.record(usage)
+        if tracer:
+            tracer.record_llm_usage(usage, stage)
+
+    hedge_after = latency_stats.p95(name) if settings.LLM_HEDGING_ENABLED else None
+    if limiter is not None:
+        wait_ms = limiter.acquire(tokens)
+        if tracer:
+            tracer.record_llm_queue_wait(wait_ms)
+    primary = _submit(name, call, limiter, check, account)
+    if not primary.running.wait(timeout) and primary.cancel():
+        return None, LLMCallError(f"{name} got no free LLM worker within {timeout:g}s")
+    started = primary.started_at[0]
+    pending = {primary}
+    hedged = False
+    response, error = None, None
+
+    while pending:
+        elapsed = time.perf_counter() - started
+        remaining = timeout - elapsed
+        if remaining <= 0:
+            break
+        wait_for = remaining
+        if hedge_after is not None and not hedged:
+            wait_for = max(min(remaining, hedge_after - elapsed), 0)
+
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            exception = future.exception()
+            if exception is not None:
+                error = exception
+                continue
+            response = future.result()
+            message = check(response) if check else None
+            if message is None:
+                latency_stats.record(name, time.perf_counter() - started)
+                if hedged and tracer:
+                    tracer.record_llm_event("hedge_wins", name)
+                return response, None
+            error = LLMCallError(message)
+
+        if not done and pending and hedge_after is not None and not hedged:
+            # The call outlived the agent's p95: fire a duplicate, take whichever answers first
+            hedged = True
+            if abandoned_calls.saturated():
+                continue
+            if limiter is not None and not limiter.try_acquire(tokens):
+                continue
+            pending.add(_submit(name, call, limiter, check, account))
+            if tracer:
+                tracer.record_llm_event("hedges", name)
+
+    if pending:
+        # Still running past the timeout; the threads finish in the background and are discarded
+        for future in pending:
+            abandoned_calls.add(future)
+        error = LLMCallTimeout(f"{name} did not answer within {timeout:g}s")
+        if tracer:
+            tracer.record_llm_event("timeouts", name)
+    return response, error
+
+
+def call_llm(
+    name: str,
+    call: Callable[[], Any],
+    check: Optional[Callable[[Any], Optional[str]]] = None,
+    timeout: float = None,
+    provider: str = "mistral",
+    tokens: int = 0,
+    model: str = ""
+) -> Any:
+    """
+    Run an LLM call with the agent's timeout, retry policy and hedging.
+
+    Args:
+        name: Agent name (selects the timeout in LLM_CALL_TIMEOUTS and the latency stats)
+        call: Zero-argument callable making the request
+        check: Returns an error message when a response is a failure (e.g. run_error)
+        timeout: Seconds per attempt (defaults to the agent's configured timeout)
+        provider: Rate-limited provider the call goes to (see RATE_LIMITS)
+        tokens: Estimated tokens of the request, for the tokens/minute budget
+        model: Model id, for token and cost accounting
+
+    Returns:
+        The first successful response; after the last attempt, an error response
+        is returned as is and a raised error is re-raised
+    """
+    timeout = timeout or settings.LLM_CALL_TIMEOUTS.get(name, settings.LLM_CALL_TIMEOUT_SECONDS)
+    tracer = current_tracer()
+    limiter = rate_limiters.get(provider)
+
+    with span("llm_call", agent=name, model=model) as call_span:
+        for attempt in range(settings.LLM_CALL_MAX_RETRIES + 1):
+            call_span.attributes["attempts"] = attempt + 1
+            response, error = _run_once(name, call, timeout, check, limiter, tokens, model)
+            if error is None:
+                return response
+
+            # Past the abandoned-call cap a timeout is not retried: the provider is stalled
+            # and every retry would leave one more thread hanging on it
+            retry = is_retryable(error) and not (isinstance(error, LLMCallTimeout) and abandoned_calls.saturated())
+            if attempt < settings.LLM_CALL_MAX_RETRIES and retry:
+                # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+                delay = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                print(f"   🔁 {name} failed ({error}), retrying in {delay:.1f}s")
+                if tracer:
+                    tracer.record_llm_event("retries", name)
+                time.sleep(delay)
+                continue
+
+            if isinstance(error, LLMCallError) and response is not None:
+                return response
+            raise error
+
+
+def call_routed(
+    role: str,
+    default: str,
+    make_call: Callable[[str], Callable[[], Any]],
+    check: Optional[Callable[[Any], Optional[str]]] = None,
+    tokens: int = 0
+) -> Any:
+    """
+    Run a role's call on its best target, failing over to the next ones.
+
+    Args:
+        role: Agent name (selects the LLM_ROUTES allowlist)
+        default: 'provider:model' target used when the role is not routed
+        make_call: Builds the zero-argument call for a target
+        check: Returns an error message when a response is a failure
+        tokens: Estimated tokens of the request
+
+    Returns:
+        The first successful response; the last target's error response is
+        returned as is and its raised error re-raised
+    """
+    tracer = current_tracer()
+    targets = llm_router.ranked(role, default)
+
+    for position, target in enumerate(targets):
+        last = position == len(targets) - 1
+        started = time.perf_counter()
+        try:
+            provider, model = parse_target(target)
+            response = call_llm(role, make_call(target), check=check, provider=provider, tokens=tokens, model=model)
+            error = check(response) if check else None
+        except Exception as e:
+            if last:
+                llm_router.record(target, None)
+                raise
+            response, error = None, str(e)
+
+        if error is None:
+            llm_router.record(target, time.perf_counter() - started)
+            return response
+
+        llm_router.record(target, None)
+        if last:
+            return response
+        print(f"   🔀 {role}: {target} failed ({error}), failing over to {targets[position + 1]}")
+        if tracer:
+            tracer.record_llm_event("failovers", role)
+
+
+def agent_pool(agent) -> AgentPool:
+    """Pool of run copies of an agent, one per agent name"""
+    key = getattr(agent, "name", None) or str(id(agent))
+    with _agent_pools_lock:
+        if key not in _agent_pools:
+            _agent_pools[key] = AgentPool(agent)
+        return _agent_pools[key]
+
+
+def _agent_call(agent, input: str) -> Callable[[], Any]:
+    """
+    agent.run(input) as a call_llm call. agno keeps run state on the
+    instance, so every submission (first attempt, hedges, retries) runs on a
+    copy leased from the agent's pool; a timed-out run keeps its copy until
+    it finishes.
+    """
+    pool = agent_pool(agent)
+
+    def call():
+        with pool.lease() as (runner,):
+            return runner.run(input)
+
+    return call
+
+
+def run_agent(agent, input: str):
+    """
+    agent.run(input) for an agno Agent/Team through call_llm (routed when
+    LLM_ROUTES lists the agent). Agents wrapped in a CachedAgent are looked up
+    in the LLM cache first; only misses reach call_llm.
+    """
+    run_cached = getattr(agent, "run_cached", None)
+    if run_cached is not None:
+        return run_cached(input, lambda uncached: _run_agent(uncached, input))
+    return _run_agent(agent, input)
+
+
+def _run_agent(agent, input: str):
+    """run_agent without the cache lookup"""
+    from ..agents.registry import agent_registry
+
+    model = getattr(agent, "model", None)
+    provider = (getattr(model, "provider", None) or "mistral").lower()
+    system_prompt = agent_registry.system_prompt(agent)
+    tokens = estimate_tokens(input) + estimate_tokens(system_prompt)
+
+    # Teams are not routed: their members run on the team's own model
+    if getattr(agent, "members", None) or not llm_router.routes(agent.name):
+        return call_llm(
+            agent.name, _agent_call(agent, input), check=run_error,
+            provider=provider, tokens=tokens, model=str(getattr(model, "id", ""))
+        )
+
+    default = f"{provider}:{getattr(model, 'id', '')}"
+
+    def make_call(target):
+        if target == default:
+            return _agent_call(agent, input)
+        return lambda: complete(target, input, system_prompt=system_prompt)
+
+    return call_routed(agent.name, default, make_call, check=run_error, tokens=tokens)
@@ -0,0 +1,245 @@
+"""
+Latency-aware routing of LLM roles between Mistral and Gemini
+A role (agent name) may be served by any "provider:model" target in its
+LLM_ROUTES allowlist (the role's own model is always allowed). Targets are
+ranked by recent p95 latency weighted by error rate; a target whose error
+rate crosses LLM_ROUTE_MAX_ERROR_RATE drops to the end of the list, so calls
+fail over to the next provider until it recovers.
+"""
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from ..config.settings import settings
+from .llm_usage import reported_tokens
+
+
+# Recent calls kept per target for latency and error rate
+ROUTE_WINDOW = 50
+
+# How much the error rate inflates a target's latency score
+ERROR_PENALTY = 4.0
+
+
+def provider_model(provider: str) -> str:
+    """Model the agents of a provider are configured with"""
+    return {"mistral": settings.MISTRAL_MODEL_ID, "gemini": settings.GEMINI_MODEL_NAME}.get(provider, "")
+
+
+def parse_target(target: str) -> Tuple[str, str]:
+    """
+    'gemini:gemini-2.5-flash' -> ('gemini', 'gemini-2.5-flash'); a bare
+    provider ('mistral') gets its configured model
+    """
+    provider, _, model_id = target.partition(":")
+    provider = provider.lower()
+    return provider, model_id or provider_model(provider)
+
+
+def resolve_target(target: str) -> str:
+    """Target in its full 'provider:model' form"""
+    return "%s:%s" % parse_target(target)
+
+
+@dataclass
+class RoutedRunOutput:
+    """Stand-in for an agno RunOutput: text result of a call made through the router"""
+    content: Optional[str]
+    model: str
+    status: str = "COMPLETED"
+    usage: Optional[Tuple[int, int]] = None  # (prompt, completion) tokens reported by the provider
+
+
+class TargetStats:
+    """Rolling latency and outcome window of one target"""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=ROUTE_WINDOW)
+        self.outcomes: Deque[bool] = deque(maxlen=ROUTE_WINDOW)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class LLMRouter:
+    """Ranks each role's allowed targets from their rolling stats"""
+
+    def __init__(self):
+        self._stats: Dict[str, TargetStats] = {}
+        self._lock = threading.Lock()
+
+    def routes(self, role: str) -> bool:
+        """Whether calls of this role are routed"""
+        return settings.LLM_ROUTING_ENABLED and bool(settings.LLM_ROUTES.get(role))
+
+    def record(self, target: str, latency: Optional[float]) -> None:
+        """Record a call to a target (latency None for a failed call)"""
+        with self._lock:
+            stats = self._stats.setdefault(target, TargetStats())
+            stats.outcomes.append(latency is not None)
+            if latency is not None:
+                stats.latencies.append(latency)
+
+    def _degraded(self, stats: Optional[TargetStats]) -> bool:
+        return (
+            stats is not None
+            and len(stats.outcomes) >= settings.LLM_ROUTE_MIN_SAMPLES
+            and stats.error_rate() >= settings.LLM_ROUTE_MAX_ERROR_RATE
+        )
+
+    def ranked(self, role: str, default: str) -> List[str]:
+        """
+        Targets to try for a role, best first.
+
+        Healthy targets with enough samples are ordered by p95 latency times
+        (1 + ERROR_PENALTY * error rate); the others keep their allowlist
+        order. Degraded targets go last. Now and then (LLM_ROUTE_EXPLORE_RATE)
+        another target is tried first so its stats stay current and a
+        degraded one can recover.
+        """
+        if not self.routes(role):
+            return [default]
+        targets = list(dict.fromkeys(resolve_target(target) for target in settings.LLM_ROUTES[role]))
+        if default not in targets:
+            targets.insert(0, default)
+
+        with self._lock:
+            stats = {target: self._stats.get(target) for target in targets}
+
+        def score(position_target):
+            position, target = position_target
+            target_stats = stats[target]
+            if target_stats is None or len(target_stats.latencies) < settings.LLM_ROUTE_MIN_SAMPLES:
+                # Not enough data: keep the allowlist order after the measured targets
+                return (self._degraded(target_stats), 1, position)
+            latency = target_stats.p95() * (1 + ERROR_PENALTY * target_stats.error_rate())
+            return (self._degraded(target_stats), 0, latency)
+
+        ordered = [target for _, target in sorted(enumerate(targets), key=score)]
+        if len(ordered) > 1 and random.random() < settings.LLM_ROUTE_EXPLORE_RATE:
+            explored = random.choice(ordered[1:])
+            ordered.remove(explored)
+            ordered.insert(0, explored)
+        return ordered
+
+    def stats(self) -> Dict:
+        """p95 latency, error rate and sample count per target"""
+        with self._lock:
+            return {
+                target: {
+                    "p95_ms": int(stats.p95() * 1000) if stats.p95() is not None else None,
+                    "error_rate": round(stats.error_rate(), 3),
+                    "calls": len(stats.outcomes),
+                    "degraded": self._degraded(stats)
+                }
+                for target, stats in self._stats.items()
+            }
+
+
+# Clients of routed targets: Gemini models are built once per (model, system
+# prompt) and shared; Mistral calls use the registry's shared MistralChat
+# clients, but agno keeps run state on an Agent, so idle Mistral agents are
+# pooled per (model, system prompt, temperature, max tokens) and leased to one
+# call at a time. Provider SDKs are imported on first use.
+_gemini_models: Dict[Tuple[str, str], object] = {}
+_mistral_agents: Dict[Tuple, List[object]] = {}
+_clients_lock = threading.Lock()
+
+
+@contextmanager
+def _mistral_agent(model_id: str, system_prompt: str, temperature: float, max_tokens: Optional[int]) -> Iterator[object]:
+    """Lease an idle Mistral agent for one call, building one when none is free"""
+    from agno.agent import Agent
+
+    from ..agents.registry import agent_registry
+
+    key = (model_id, system_prompt, temperature, max_tokens)
+    with _clients_lock:
+        idle = _mistral_agents.setdefault(key, [])
+        agent = idle.pop() if idle else None
+    if agent is None:
+        agent = Agent(
+            model=agent_registry.get_model(model_id, temperature, max_tokens),
+            system_message=system_prompt or None
+        )
+    try:
+        yield agent
+    finally:
+        with _clients_lock:
+            _mistral_agents[key].append(agent)
+
+
+def _gemini_text(response) -> Optional[str]:
+    """Text of a Gemini response, or None when it was blocked, truncated or empty"""
+    if not response.candidates:
+        return None
+    candidate = response.candidates[0]
+    if candidate.finish_reason not in [0, 1] or not candidate.content.parts:
+        return None
+    return response.text
+
+
+def complete(target: str, prompt: str, system_prompt: str = "", generation_config: Dict = None) -> RoutedRunOutput:
+    """
+    One plain-text completion on a target.
+
+    Args:
+        target: 'provider:model' (mistral or gemini)
+        prompt: User input
+        system_prompt: Role instructions (sent as Gemini system_instruction / Mistral system message)
+        generation_config: Gemini generation config; Mistral honours its
+            temperature and max_output_tokens
+
+    Returns:
+        RoutedRunOutput; status is "ERROR" with the reason as content when the
+        response is unusable
+    """
+    provider, model_id = parse_target(target)
+
+    if provider == "gemini":
+        import google.generativeai as genai
+
+        key = (model_id, system_prompt)
+        with _clients_lock:
+            if key not in _gemini_models:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _gemini_models[key] = genai.GenerativeModel(model_id, system_instruction=system_prompt or None)
+            model = _gemini_models[key]
+        generation_config = generation_config or {"temperature": settings.GEMINI_TEMPERATURE}
+        response = model.generate_content(prompt, generation_config=generation_config)
+        text = _gemini_text(response)
+        if text is None:
+            return RoutedRunOutput(
+                content=f"{target} returned no usable content", model=target, status="ERROR",
+                usage=reported_tokens(response)
+            )
+        return RoutedRunOutput(content=text, model=target, usage=reported_tokens(response))
+
+    if provider == "mistral":
+        generation_config = generation_config or {}
+        with _mistral_agent(
+            model_id,
+            system_prompt,
+            generation_config.get("temperature", settings.MISTRAL_TEMPERATURE),
+            generation_config.get("max_output_tokens")
+        ) as agent:
+            response = agent.run(prompt)
+        status = getattr(response.status, "value", response.status)
+        return RoutedRunOutput(
+            content=response.content, model=target, status=status, usage=reported_tokens(response)
+        )
+
+    raise ValueError(f"Unknown LLM provider in route target: {target}")
+
+
+# Global instance
+llm_router = LLMRouter()
@@ -0,0 +1,123 @@
+"""
+Token and cost accounting of LLM calls
+Each call (retries and hedges included) records its model, prompt and
+completion tokens, latency and cost: tokens come from the provider's usage
+metadata, or from a local estimate when the provider reports none. Calls roll
+up into the request's PipelineTracer and into process-wide per-agent totals.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ..config.settings import settings
+from .context_packer import estimate_tokens
+
+
+@dataclass
+class LLMUsage:
+    """Usage of one LLM call"""
+    agent: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_ms: int
+    estimated: bool = False  # Tokens estimated locally (no provider usage metadata)
+
+    @property
+    def cost_usd(self) -> float:
+        return call_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD from LLM_PRICING (0.0 for models without a price)"""
+    pricing = settings.LLM_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing.get("input", 0.0) + completion_tokens * pricing.get("output", 0.0)) / 1_000_000
+
+
+def reported_tokens(response) -> Optional[Tuple[int, int]]:
+    """
+    (prompt, completion) tokens reported by the provider, or None.
+
+    Reads agno run metrics (Agent and Team runs), Gemini usage_metadata and
+    the usage carried by routed outputs.
+    """
+    metrics = getattr(response, "metrics", None)
+    if metrics is not None and (getattr(metrics, "input_tokens", 0) or getattr(metrics, "output_tokens", 0)):
+        return metrics.input_tokens, metrics.output_tokens
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None):
+        return usage.prompt_token_count, getattr(usage, "candidates_token_count", 0) or 0
+
+    return getattr(response, "usage", None)
+
+
+def response_text(response) -> str:
+    """Generated text of an agno run, routed output or Gemini response"""
+    content = getattr(response, "content", None)
+    if isinstance(content, str):
+        return content
+    try:
+        return response.text or ""
+    except Exception:
+        return ""
+
+
+def measure_usage(agent: str, model: str, response, prompt_tokens_estimate: int, latency: float) -> LLMUsage:
+    """Usage of a finished call, from provider metadata or local estimates"""
+    tokens = reported_tokens(response)
+    if tokens is None:
+        return LLMUsage(
+            agent=agent,
+            model=model,
+            prompt_tokens=prompt_tokens_estimate,
+            completion_tokens=estimate_tokens(response_text(response)),
+            latency_ms=int(latency * 1000),
+            estimated=True
+        )
+    return LLMUsage(
+        agent=agent, model=model, prompt_tokens=tokens[0], completion_tokens=tokens[1], latency_ms=int(latency * 1000)
+    )
+
+
+class UsageLedger:
+    """Process-wide token, cost and latency totals per agent"""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, usage: LLMUsage) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(usage.agent, {
+                "model": usage.model, "calls": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "latency_ms": 0, "cost_usd": 0.0
+            })
+            totals["model"] = usage.model
+            totals["calls"] += 1
+            totals["prompt_tokens"] += usage.prompt_tokens
+            totals["completion_tokens"] += usage.completion_tokens
+            totals["latency_ms"] += usage.latency_ms
+            totals["cost_usd"] += usage.cost_usd
+
+    def stats(self) -> Dict:
+        """Totals per agent, largest prompt-token consumers first, plus the overall cost"""
+        with self._lock:
+            agents = {
+                name: {
+                    **totals,
+                    "cost_usd": round(totals["cost_usd"], 6),
+                    "avg_latency_ms": int(totals["latency_ms"] / max(totals["calls"], 1))
+                }
+                for name, totals in sorted(self._totals.items(), key=lambda item: -item[1]["prompt_tokens"])
+            }
+            return {
+                "cost_usd": round(sum(totals["cost_usd"] for totals in self._totals.values()), 6),
+                "agents": agents
+            }
+
+
+# Global instance
+usage_ledger = UsageLedger()
@@ -2,13 +2,15 @@
 Pipeline Metrics and Latency Instrumentation
 Provides timing, tracing, and structured logging for the agentic pipeline
 """
+import threading
 import time
 import uuid
 import logging
 from datetime import datetime
-from typing import Dict, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, field
 from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 
 # Create a dedicated logger for pipeline tracing (don't modify root logger)
@@ -25,6 +27,15 @@ if not pipeline_logger.handlers:
     pipeline_logger.addHandler(handler)
     pipeline_logger.propagate = False  # Don't bubble up to root logger
 
+# Tracer of the pipeline running in the current context (used by the shared LLM-call wrapper)
+_current_tracer: ContextVar[Optional["PipelineTracer"]] = ContextVar("current_tracer", default=None)
+
+# Stage open in the current context (LLM usage is attributed to it)
+_current_stage: ContextVar[Optional[str]] = ContextVar("current_stage", default=None)
+
+# Innermost span open in the current context (new spans become its children)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
 
 @dataclass
 class StageMetrics:
@@ -38,6 +49,30 @@ class StageMetrics:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class Span:
+    """A timed unit of work inside the pipeline; spans nest into a tree"""
+    name: str
+    start_ms: int = 0  # Offset from pipeline start
+    latency_ms: int = 0
+    success: bool = True
+    error_message: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the span and its subtree to a dictionary"""
+        return {
+            "name": self.name,
+            "start_ms": self.start_ms,
+            "latency_ms": self.latency_ms,
+            "success": self.success,
+            "error": self.error_message,
+            "attributes": dict(self.attributes),
+            "children": [child.to_dict() for child in list(self.children)]
+        }
+
+
 @dataclass
 class PipelineMetrics:
     """Complete metrics for a pipeline run"""
@@ -52,11 +87,41 @@ class PipelineMetrics:
     # Stage metrics
     stages: Dict[str, StageMetrics] = field(default_factory=dict)
     
+    # Span tree: stages at the root, sub-stages (attempts, retrieval, LLM calls) below
+    spans: List[Span] = field(default_factory=list)
+    
     # Processing stats
     total_llm_calls: int = 0
     rag_attempts: int = 0
     documents_retrieved: int = 0
     
+    # RAG prompt context size, before and after packing (estimated tokens)
+    context_tokens_raw: int = 0
+    context_tokens_packed: int = 0
+    
+    # Document evaluation decisions by decider (gate_high, gate_low, single_pass, team)
+    evaluation_decisions: Dict[str, int] = field(default_factory=dict)
+    
+    # Raw-text retrieval started during enrichment: kept_raw, fused or failed
+    prefetch_outcome: Optional[str] = None
+    
+    # Request deadline and the optional stages skipped or degraded to meet it
+    deadline_ms: Optional[int] = None
+    degraded_stages: List[str] = field(default_factory=list)
+    
+    # LLM-call wrapper events: retries, hedges, hedge_wins, timeouts
+    llm_call_events: Dict[str, int] = field(default_factory=dict)
+    
+    # Time LLM calls waited for the provider rate limiter
+    llm_queue_wait_ms: int = 0
+    
+    # Tokens and cost of every LLM call (retries and hedges included), per agent and per stage
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    llm_usage: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    llm_usage_by_stage: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    
     # Error tracking
     had_errors: bool = False
     error_stage: Optional[str] = None
@@ -82,9 +147,23 @@ class PipelineMetrics:
                 }
                 for name, stage in self.stages.items()
             },
+            "spans": [span.to_dict() for span in list(self.spans)],
             "total_llm_calls": self.total_llm_calls,
             "rag_attempts": self.rag_attempts,
             "documents_retrieved": self.documents_retrieved,
+            "context_tokens_raw": self.context_tokens_raw,
+            "context_tokens_packed": self.context_tokens_packed,
+            "evaluation_decisions": self.evaluation_decisions,
+            "prefetch_outcome": self.prefetch_outcome,
+            "deadline_ms": self.deadline_ms,
+            "degraded_stages": self.degraded_stages,
+            "llm_call_events": self.llm_call_events,
+            "llm_queue_wait_ms": self.llm_queue_wait_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "llm_usage": self.llm_usage,
+            "llm_usage_by_stage": self.llm_usage_by_stage,
             "had_errors": self.had_errors,
             "error_stage": self.error_stage,
             "error_message": self.error_message,
@@ -114,6 +193,8 @@ class PipelineTracer:
             ticket_id=ticket_id
         )
         self._stage_start_times: Dict[str, float] = {}
+        self._lock = threading.Lock()  # LLM usage and spans are recorded from call threads
+        self._context_tokens = None  # Restores the caller's tracer/span context at end_pipeline
         self.logger = pipeline_logger  # Use dedicated pipeline logger
     
     def _generate_trace_id(self) -> str:
@@ -132,6 +213,7 @@ class PipelineTracer:
         """Mark pipeline start"""
         self.metrics.started_at = datetime.utcnow()
         self._pipeline_start = time.perf_counter()
+        self._context_tokens = (_current_tracer.set(self), _current_span.set(None))
         print(f"[TRACE:{self.trace_id}] ▶️  Pipeline started")
     
     def end_pipeline(self):
@@ -139,6 +221,12 @@ class PipelineTracer:
         self.metrics.completed_at = datetime.utcnow()
         if hasattr(self, '_pipeline_start'):
             self.metrics.total_latency_ms = int((time.perf_counter() - self._pipeline_start) * 1000)
+        if self._context_tokens is not None:
+            # Detach from the context, so a reused worker thread does not keep this tracer
+            tracer_token, span_token = self._context_tokens
+            self._context_tokens = None
+            _current_span.reset(span_token)
+            _current_tracer.reset(tracer_token)
         
         # Check latency targets
         latency_status = "✅ EXCELLENT" if self.metrics.total_latency_ms < self.IDEAL_TOTAL_LATENCY_MS else \
@@ -160,7 +248,53 @@ class PipelineTracer:
             print(f"[TRACE:{self.trace_id}]   {status} {stage_name}: {stage.latency_ms}ms ({percent:.1f}%)")
         print(f"[TRACE:{self.trace_id}]   ────────────────────────")
         print(f"[TRACE:{self.trace_id}]   📊 TOTAL: {self.metrics.total_latency_ms}ms")
-        print(f"[TRACE:{self.trace_id}] ━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+        print(f"[TRACE:{self.trace_id}] ━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        
+        # Sub-stage spans, indented under their parents
+        for root in list(self.metrics.spans):
+            if root.children:
+                self._print_span(root, 1)
+        print()
+    
+    def _print_span(self, span: Span, depth: int):
+        """Print a span and its children, one indent level per depth"""
+        status = "✅" if span.success else "❌"
+        attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+        print(f"[TRACE:{self.trace_id}] {'  ' * depth}{status} {span.name}: {span.latency_ms}ms {attributes}".rstrip())
+        for child in list(span.children):
+            self._print_span(child, depth + 1)
+    
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Context manager for timing a sub-stage as a child of the current span.
+        
+        The current span travels in a context variable, so work submitted with
+        contextvars.copy_context() attaches its spans to the right parent.
+        
+        Usage:
+            with tracer.span("chroma_query", n_results=6) as span:
+                span.attributes["category"] = category
+        """
+        span = Span(name=name, attributes={key: value for key, value in attributes.items() if value is not None})
+        start = time.perf_counter()
+        if hasattr(self, '_pipeline_start'):
+            span.start_ms = int((start - self._pipeline_start) * 1000)
+        
+        parent = _current_span.get()
+        with self._lock:
+            (parent.children if parent is not None else self.metrics.spans).append(span)
+        span_token = _current_span.set(span)
+        
+        try:
+            yield span
+        except Exception as e:
+            span.success = False
+            span.error_message = str(e)
+            raise
+        finally:
+            _current_span.reset(span_token)
+            span.latency_ms = int((time.perf_counter() - start) * 1000)
     
     @contextmanager
     def stage(self, stage_name: str):
@@ -175,9 +309,11 @@ class PipelineTracer:
         stage_metrics.start_time = time.perf_counter()
         
         print(f"[TRACE:{self.trace_id}] 🔄 Starting stage: {stage_name}")
+        stage_token = _current_stage.set(stage_name)
         
         try:
-            yield stage_metrics
+            with self.span(stage_name):
+                yield stage_metrics
             stage_metrics.success = True
         except Exception as e:
             stage_metrics.success = False
@@ -188,6 +324,7 @@ class PipelineTracer:
             print(f"[TRACE:{self.trace_id}] ❌ Stage failed: {stage_name} - {e}")
             raise
         finally:
+            _current_stage.reset(stage_token)
             stage_metrics.end_time = time.perf_counter()
             stage_metrics.latency_ms = int((stage_metrics.end_time - stage_metrics.start_time) * 1000)
             self.metrics.stages[stage_name] = stage_metrics
@@ -207,6 +344,71 @@ class PipelineTracer:
         """Record number of documents retrieved"""
         self.metrics.documents_retrieved = count
     
+    def record_evaluation(self, decided_by: str, count: int = 1):
+        """Record who decided a document evaluation (similarity gate or LLM)"""
+        decisions = self.metrics.evaluation_decisions
+        decisions[decided_by] = decisions.get(decided_by, 0) + count
+    
+    def record_context_tokens(self, raw_tokens: int, packed_tokens: int):
+        """Record RAG context size before and after packing"""
+        self.metrics.context_tokens_raw += raw_tokens
+        self.metrics.context_tokens_packed += packed_tokens
+    
+    def record_prefetch(self, outcome: str):
+        """Record what happened to the raw-text retrieval run during enrichment"""
+        self.metrics.prefetch_outcome = outcome
+    
+    def record_deadline(self, deadline_ms: int):
+        """Record the request deadline the pipeline runs under"""
+        self.metrics.deadline_ms = deadline_ms
+    
+    def record_degraded(self, stage_name: str):
+        """Record an optional stage skipped or replaced by a local fallback to meet the deadline"""
+        if stage_name not in self.metrics.degraded_stages:
+            self.metrics.degraded_stages.append(stage_name)
+        print(f"[TRACE:{self.trace_id}] ⏳ Degraded stage: {stage_name} (deadline)")
+    
+    def record_llm_event(self, event: str, agent_name: str):
+        """Record a retry, hedge, hedge win or timeout of an LLM call"""
+        events = self.metrics.llm_call_events
+        events[event] = events.get(event, 0) + 1
+        print(f"[TRACE:{self.trace_id}] 🛰️  LLM call {event}: {agent_name}")
+    
+    def current_stage(self) -> Optional[str]:
+        """Stage open in the current context, if any"""
+        return _current_stage.get()
+    
+    def record_llm_usage(self, usage, stage_name: Optional[str] = None):
+        """Record the model, tokens, latency and cost of one LLM call (an llm_usage.LLMUsage)"""
+        cost = usage.cost_usd
+        with self._lock:
+            self.metrics.prompt_tokens += usage.prompt_tokens
+            self.metrics.completion_tokens += usage.completion_tokens
+            self.metrics.cost_usd += cost
+            
+            agent = self.metrics.llm_usage.setdefault(usage.agent, {
+                "model": usage.model, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "latency_ms": 0, "cost_usd": 0.0, "estimated": False
+            })
+            agent["calls"] += 1
+            agent["prompt_tokens"] += usage.prompt_tokens
+            agent["completion_tokens"] += usage.completion_tokens
+            agent["latency_ms"] += usage.latency_ms
+            agent["cost_usd"] = round(agent["cost_usd"] + cost, 6)
+            agent["estimated"] = agent["estimated"] or usage.estimated
+            
+            stage = self.metrics.llm_usage_by_stage.setdefault(stage_name or "unstaged", {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0
+            })
+            stage["calls"] += 1
+            stage["prompt_tokens"] += usage.prompt_tokens
+            stage["completion_tokens"] += usage.completion_tokens
+            stage["cost_usd"] = round(stage["cost_usd"] + cost, 6)
+    
+    def record_llm_queue_wait(self, wait_ms: int):
+        """Record time an LLM call waited for the provider rate limiter"""
+        self.metrics.llm_queue_wait_ms += wait_ms
+    
     def record_retry(self):
         """Record a retry attempt"""
         self.metrics.retry_count += 1
@@ -228,7 +430,21 @@ class PipelineTracer:
             "llm_calls": self.metrics.total_llm_calls,
             "rag_attempts": self.metrics.rag_attempts,
             "had_errors": self.metrics.had_errors,
-            "stages": list(self.metrics.stages.keys())
+            "stages": list(self.metrics.stages.keys()),
+            "evaluation_decisions": dict(self.metrics.evaluation_decisions),
+            "context_tokens_raw": self.metrics.context_tokens_raw,
+            "context_tokens_packed": self.metrics.context_tokens_packed,
+            "prefetch_outcome": self.metrics.prefetch_outcome,
+            "deadline_ms": self.metrics.deadline_ms,
+            "degraded_stages": list(self.metrics.degraded_stages),
+            "llm_call_events": dict(self.metrics.llm_call_events),
+            "llm_queue_wait_ms": self.metrics.llm_queue_wait_ms,
+            "prompt_tokens": self.metrics.prompt_tokens,
+            "completion_tokens": self.metrics.completion_tokens,
+            "cost_usd": round(self.metrics.cost_usd, 6),
+            "llm_usage": {name: dict(usage) for name, usage in self.metrics.llm_usage.items()},
+            "llm_usage_by_stage": {name: dict(usage) for name, usage in self.metrics.llm_usage_by_stage.items()},
+            "spans": [span.to_dict() for span in list(self.metrics.spans)]
         }
 
 
@@ -261,6 +477,36 @@ def timed_stage(stage_name: str):
     return decorator
 
 
+def current_tracer() -> Optional[PipelineTracer]:
+    """Tracer of the pipeline running in the current context, if any"""
+    return _current_tracer.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Open a span under the current context's tracer, without passing the tracer around.
+    
+    Outside a traced pipeline the span is timed but not recorded anywhere.
+    
+    Usage:
+        with span("embedding", texts=1):
+            vectors = encoder.encode(...)
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        detached = Span(name=name, attributes=attributes)
+        start = time.perf_counter()
+        try:
+            yield detached
+        finally:
+            detached.latency_ms = int((time.perf_counter() - start) * 1000)
+        return
+    
+    with tracer.span(name, **attributes) as opened:
+        yield opened
+
+
 # Convenience function
 def create_tracer(ticket_id: Optional[int] = None) -> PipelineTracer:
     """Create a new pipeline tracer"""
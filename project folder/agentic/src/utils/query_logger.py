@@ -139,7 +139,16 @@ class QueryLogger:
             },
             
             # Table 7: Pipeline Metrics (bonus for optimization)
-            "pipeline_metrics": result.get("pipeline_metrics", {})
+            "pipeline_metrics": result.get("pipeline_metrics", {}),
+            
+            # Table 8: LLM Usage (tokens and cost per agent and stage)
+            "llm_usage": {
+                "prompt_tokens": result.get("pipeline_metrics", {}).get("prompt_tokens", 0),
+                "completion_tokens": result.get("pipeline_metrics", {}).get("completion_tokens", 0),
+                "cost_usd": result.get("pipeline_metrics", {}).get("cost_usd", 0.0),
+                "by_agent": result.get("pipeline_metrics", {}).get("llm_usage", {}),
+                "by_stage": result.get("pipeline_metrics", {}).get("llm_usage_by_stage", {})
+            }
         }
         
         # Append to daily log file
@@ -0,0 +1,60 @@
+"""
+Reciprocal Rank Fusion of retrieval results
+Merges several collection.query-shaped result sets (one query each) into one,
+ranked by RRF score; each chunk keeps its best distance so similarity-based
+gating and confidence still work on the fused list
+"""
+from typing import Dict, List
+
+
+RRF_K = 60  # Standard RRF damping constant
+
+
+def result_ids(results: Dict) -> List[str]:
+    """Chunk ids of a single-query result set"""
+    return (results.get("ids") or [[]])[0] or []
+
+
+def id_overlap(results_a: Dict, results_b: Dict) -> float:
+    """Share of results_b's chunks that results_a also retrieved (0.0 - 1.0)"""
+    ids_b = result_ids(results_b)
+    if not ids_b:
+        return 1.0
+    return len(set(result_ids(results_a)) & set(ids_b)) / len(ids_b)
+
+
+def fuse_results(result_sets: List[Dict], n_results: int, k: int = RRF_K) -> Dict:
+    """
+    Fuse single-query result sets with Reciprocal Rank Fusion.
+
+    Args:
+        result_sets: Results shaped like collection.query (ids, documents, metadatas, distances)
+        n_results: Number of chunks to keep
+        k: RRF damping constant
+
+    Returns:
+        One result set of the same shape, best fused score first
+    """
+    scores: Dict[str, float] = {}
+    chunks: Dict[str, Dict] = {}
+
+    for results in result_sets:
+        ids = result_ids(results)
+        documents = (results.get("documents") or [[]])[0] or []
+        metadatas = (results.get("metadatas") or [[]])[0] or [None] * len(ids)
+        distances = (results.get("distances") or [[]])[0] or [None] * len(ids)
+
+        for rank, (chunk_id, doc, meta, distance) in enumerate(zip(ids, documents, metadatas, distances)):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+            kept = chunks.get(chunk_id)
+            if kept is None or (distance is not None and (kept["distance"] is None or distance < kept["distance"])):
+                chunks[chunk_id] = {"document": doc, "metadata": meta, "distance": distance}
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+    distances = [chunks[chunk_id]["distance"] for chunk_id in ranked]
+    return {
+        "ids": [ranked],
+        "documents": [[chunks[chunk_id]["document"] for chunk_id in ranked]],
+        "metadatas": [[chunks[chunk_id]["metadata"] for chunk_id in ranked]],
+        "distances": [distances] if None not in distances else [[]]
+    }
@@ -0,0 +1,226 @@
+"""
+Per-provider rate limiting of outgoing LLM calls
+Each provider (Mistral for every agno agent, Gemini for answer generation) has
+token buckets for requests/minute and tokens/minute plus an AIMD concurrency
+limit: it grows by one slot per window of successful calls and halves on a
+429 or when a call's latency climbs well above its agent's own baseline, so
+throughput settles at the provider ceiling instead of bursting into
+rate-limit errors.
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from ..config.settings import settings
+
+
+# Latency above this multiple of the agent's baseline counts as overload
+LATENCY_TOLERANCE = 2.0
+
+# Multiplicative decrease on overload, and the minimum time between two decreases
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+# Recent latencies kept per agent; the baseline is their minimum
+BASELINE_WINDOW = 100
+
+# Samples an agent needs before its latency can signal overload
+BASELINE_MIN_SAMPLES = 10
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate (unlimited when the rate is 0)"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until amount tokens are available, then take them"""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take amount tokens only if they are available right now"""
+        if self.rate <= 0:
+            return True
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def refund(self, amount: float = 1.0) -> None:
+        """Give back tokens taken for a call that was not made"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by 429s and latency"""
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, block: bool = True) -> bool:
+        """Take a slot, waiting for one when block is True; returns whether a slot was taken"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                if not block:
+                    return False
+                self._condition.wait()
+            self.in_flight += 1
+            return True
+
+    def cancel(self) -> None:
+        """Free a slot taken for a call that was not made, leaving the limit as is"""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def release(self, latency: Optional[float], rate_limited: bool = False, key: str = "") -> None:
+        """
+        Free a slot and adjust the limit from the call's outcome.
+
+        A latency is compared with the baseline of its own key (the agent), so
+        slow agents such as the evaluation team are not measured against the
+        fastest one on the provider.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            overloaded = rate_limited
+            if latency is not None and not rate_limited:
+                latencies = self._latencies.setdefault(key, deque(maxlen=BASELINE_WINDOW))
+                latencies.append(latency)
+                overloaded = len(latencies) >= BASELINE_MIN_SAMPLES and latency > LATENCY_TOLERANCE * min(latencies)
+
+            if overloaded:
+                if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            elif latency is not None:
+                # Additive increase: about one extra slot per `limit` successful calls
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class ProviderLimiter:
+    """Request/token buckets and adaptive concurrency of one provider"""
+
+    def __init__(self, provider: str, limits: Dict):
+        self.provider = provider
+        self.requests = TokenBucket(limits.get("rpm", 0))
+        self.tokens = TokenBucket(limits.get("tpm", 0))
+        self.concurrency = AdaptiveLimiter(
+            initial=limits.get("initial_concurrency", 4),
+            maximum=limits.get("max_concurrency", 16)
+        )
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "rate_limited": 0, "queue_wait_ms": 0}
+
+    def acquire(self, tokens: int = 0) -> int:
+        """
+        Wait for request and token budget, then for a concurrency slot.
+
+        Returns:
+            Time spent waiting, in ms
+        """
+        started = time.perf_counter()
+        self.requests.acquire()
+        if tokens:
+            self.tokens.acquire(tokens)
+        self.concurrency.acquire()
+        wait_ms = int((time.perf_counter() - started) * 1000)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["queue_wait_ms"] += wait_ms
+        return wait_ms
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take a slot and budget only if both are available right now (used for hedged duplicates)"""
+        if not self.concurrency.acquire(block=False):
+            return False
+        if not self.requests.try_acquire():
+            self.concurrency.cancel()
+            return False
+        if tokens and not self.tokens.try_acquire(tokens):
+            self.requests.refund()
+            self.concurrency.cancel()
+            return False
+        with self._lock:
+            self._stats["calls"] += 1
+        return True
+
+    def release(self, latency: Optional[float], rate_limited: bool = False, key: str = "") -> None:
+        """Return the slot; latency is None when the call failed for another reason, key names the agent"""
+        if rate_limited:
+            with self._lock:
+                self._stats["rate_limited"] += 1
+        self.concurrency.release(latency, rate_limited, key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_queue_wait_ms"] = round(stats["queue_wait_ms"] / max(stats["calls"], 1), 1)
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
+
+
+class RateLimiterRegistry:
+    """One ProviderLimiter per provider, built from RATE_LIMITS on first use"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> Optional[ProviderLimiter]:
+        """Limiter of a provider, or None when rate limiting is off or the provider is not configured"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        provider = provider.lower()
+        limits = settings.RATE_LIMITS.get(provider)
+        if limits is None:
+            return None
+        with self._lock:
+            if provider not in self._limiters:
+                self._limiters[provider] = ProviderLimiter(provider, limits)
+            return self._limiters[provider]
+
+    def stats(self) -> Dict:
+        """Queue waits, 429s and current concurrency limit per provider"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {provider: limiter.stats() for provider, limiter in limiters.items()}
+
+
+# Global instance
+rate_limiters = RateLimiterRegistry()
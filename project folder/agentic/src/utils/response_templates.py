@@ -0,0 +1,89 @@
+"""
+Local response templates for customer support answers
+Fills the 4-part template (thanks, recap, solution, next action) per language
+without an LLM call; the solution body comes from the RAG answer.
+Also provides a local language guess used when the deadline is short
+"""
+import re
+from typing import Optional
+
+
+SUPPORTED_LANGUAGES = ("fr", "en", "ar", "es")
+DEFAULT_LANGUAGE = "fr"
+
+RESPONSE_TEMPLATES = {
+    "fr": {
+        "thanks": "Merci de nous avoir contactés concernant Doxa.",
+        "recap": "Votre demande : {summary}",
+        "next_action": "N'hésitez pas à nous recontacter si vous avez d'autres questions.\nContact : support@doxa.dz"
+    },
+    "en": {
+        "thanks": "Thank you for reaching out to us about Doxa.",
+        "recap": "Your request: {summary}",
+        "next_action": "Please don't hesitate to reach out if you have further questions.\nContact: support@doxa.dz"
+    },
+    "ar": {
+        "thanks": "شكرًا لتواصلك معنا بخصوص Doxa.",
+        "recap": "طلبك: {summary}",
+        "next_action": "لا تتردد في التواصل معنا إذا كانت لديك أسئلة أخرى.\nللتواصل: support@doxa.dz"
+    },
+    "es": {
+        "thanks": "Gracias por contactarnos sobre Doxa.",
+        "recap": "Su solicitud: {summary}",
+        "next_action": "No dude en volver a contactarnos si tiene más preguntas.\nContacto: support@doxa.dz"
+    }
+}
+
+# Language names used in the (French) RAG prompt to request the answer language
+LANGUAGE_NAMES = {
+    "fr": "français",
+    "en": "anglais",
+    "ar": "arabe",
+    "es": "espagnol"
+}
+
+# Frequent function words per language, for detect_language_locally
+LANGUAGE_STOPWORDS = {
+    "fr": {"le", "la", "les", "des", "est", "je", "pas", "une", "pour", "mon", "avec", "comment", "dans", "que"},
+    "en": {"the", "is", "i", "not", "a", "for", "my", "with", "how", "in", "to", "can", "and", "it"},
+    "es": {"el", "los", "las", "es", "yo", "no", "una", "para", "mi", "con", "como", "en", "que", "puedo"}
+}
+
+
+def detect_language_locally(text: str) -> str:
+    """
+    Guess the language of a ticket without an LLM call.
+
+    Arabic script wins outright; otherwise the language whose function
+    words occur most often is chosen (French on ties or no match).
+    """
+    if re.search(r"[\u0600-\u06FF]", text or ""):
+        return "ar"
+
+    words = re.findall(r"[a-zà-ÿ]+", (text or "").lower())
+    counts = {language: sum(word in stopwords for word in words) for language, stopwords in LANGUAGE_STOPWORDS.items()}
+    best = max(counts, key=counts.get)
+    return best if counts[best] > counts[DEFAULT_LANGUAGE] else DEFAULT_LANGUAGE
+
+
+def compose_response(language: str, summary: Optional[str], solution: str) -> str:
+    """
+    Compose a support response from the local template.
+
+    Args:
+        language: Language code (fr, en, ar, es); unknown codes use French
+        summary: Query Analyzer summary used as the recap (skipped if empty)
+        solution: Solution body (the RAG answer)
+
+    Returns:
+        Formatted response: thanks, recap, solution, next action
+    """
+    template = RESPONSE_TEMPLATES.get(language, RESPONSE_TEMPLATES[DEFAULT_LANGUAGE])
+
+    parts = [template["thanks"]]
+    if summary and summary.strip():
+        parts.append(template["recap"].format(summary=summary.strip()))
+    parts.append(solution.strip())
+    parts.append(template["next_action"])
+
+    return "\n\n".join(parts)
@@ -0,0 +1,115 @@
+"""
+Single-flight coalescing of identical in-flight requests
+Concurrent calls with the same key share one execution: the first caller
+(leader) runs the work, the others wait for it and receive its result
+"""
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config.settings import settings
+
+
+class FlightTimeout(TimeoutError):
+    """A follower's wait for the leader outlasted the follower's own timeout"""
+
+
+class _Flight:
+    """One in-flight execution and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, work: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run work once per key among concurrent callers.
+
+        Args:
+            key: Coalescing key (see request_key)
+            work: Zero-argument callable producing the result
+            timeout: Longest a follower waits for the leader, in seconds (None
+                     waits indefinitely)
+
+        Returns:
+            (result, shared): shared is True for followers, which get the
+            leader's result object (or re-raise the leader's exception)
+
+        Raises:
+            FlightTimeout: in a follower whose timeout passed first; it does not
+            run work itself, since a second run would add load exactly when
+            the leader is slow
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+            else:
+                flight.followers += 1
+                leader = False
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                with self._lock:
+                    flight.followers -= 1
+                raise FlightTimeout(f"in-flight run did not finish within {timeout:g}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = work()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+            if flight.followers:
+                print(f"🔗 Single-flight: {flight.followers} identical request(s) shared one pipeline run")
+
+    def in_flight(self) -> int:
+        """Number of keys currently executing"""
+        with self._lock:
+            return len(self._flights)
+
+
+def normalize_request_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a ticket text"""
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def config_fingerprint() -> str:
+    """Hash of the current settings (API keys excluded); requests only coalesce under the same config"""
+    config = {key: value for key, value in settings.model_dump().items() if not key.endswith("_API_KEY")}
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def request_key(text: str, *extra: Optional[object]) -> str:
+    """
+    Coalescing key: normalized text, the request fields that change the output
+    (e.g. category and timeout, which selects the degraded stages) and the
+    config fingerprint (global flags)
+    """
+    parts = [normalize_request_text(text), *[str(value) for value in extra], config_fingerprint()]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+# Global instance
+single_flight = SingleFlight()
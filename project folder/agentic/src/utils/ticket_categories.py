@@ -0,0 +1,76 @@
+"""
+Ticket categories shared with the backend (TicketCategory) and their use in retrieval
+Knowledge-base files are tagged with a category at ingest, from a category-named
+subdirectory or from keyword counts, so queries can be pre-filtered by the
+ticket's category
+"""
+import re
+from pathlib import PurePosixPath
+from typing import Optional
+
+
+# Values of the backend's TicketCategory enum
+TICKET_CATEGORIES = (
+    "Account", "Team Management", "Workflow", "Notifications",
+    "Bugs", "Billing", "Privacy", "Guidance", "Other"
+)
+DEFAULT_CATEGORY = "Other"
+
+# Keywords (French and English) counted in a document to pick its category
+CATEGORY_KEYWORDS = {
+    "Account": ["compte", "account", "mot de passe", "password", "connexion", "login", "profil", "profile", "inscription", "sign up"],
+    "Team Management": ["équipe", "team", "membre", "member", "invitation", "invite", "rôle", "role", "permission", "collaborateur"],
+    "Workflow": ["workflow", "projet", "project", "tâche", "task", "étape", "statut", "status", "processus", "kanban"],
+    "Notifications": ["notification", "alerte", "alert", "email", "e-mail", "rappel", "reminder"],
+    "Bugs": ["bug", "erreur", "error", "plantage", "crash", "ne fonctionne pas", "not working", "problème technique"],
+    "Billing": ["facture", "invoice", "facturation", "billing", "paiement", "payment", "abonnement", "subscription", "tarif", "prix", "pricing"],
+    "Privacy": ["confidentialité", "privacy", "données personnelles", "personal data", "rgpd", "gdpr", "sécurité", "security"],
+    "Guidance": ["guide", "tutoriel", "tutorial", "comment faire", "how to", "démarrer", "getting started", "bonnes pratiques"]
+}
+
+# Keyword hits a document needs before it gets a category other than the default
+MIN_KEYWORD_HITS = 2
+
+# Whole-word keyword matchers ('card' must not match 'discard'); a plural 's' is allowed
+_KEYWORD_PATTERNS = {
+    category: re.compile(r"\b(?:%s)s?\b" % "|".join(re.escape(keyword) for keyword in keywords))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+
+def category_slug(category: str) -> str:
+    """Directory-style slug of a category ('Team Management' -> 'team_management')"""
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")
+
+
+def normalize_category(value: Optional[str]) -> Optional[str]:
+    """
+    Map a category from a request ('Billing', 'billing', 'team_management', ...)
+    to a TicketCategory value, or None when it is unknown or empty.
+    """
+    if not value:
+        return None
+    slug = category_slug(value)
+    for category in TICKET_CATEGORIES:
+        if category_slug(category) == slug:
+            return category
+    return None
+
+
+def categorize_document(relative_path: str, text: str) -> str:
+    """
+    Category of a knowledge-base file.
+
+    A path component named after a category wins (e.g. 'billing/invoices.md');
+    otherwise the category with the most keyword hits, if it has at least
+    MIN_KEYWORD_HITS, else 'Other'.
+    """
+    for part in PurePosixPath(relative_path).parts[:-1]:
+        category = normalize_category(part)
+        if category:
+            return category
+
+    lowered = text.lower()
+    hits = {category: len(pattern.findall(lowered)) for category, pattern in _KEYWORD_PATTERNS.items()}
+    best = max(hits, key=hits.get)
+    return best if hits[best] >= MIN_KEYWORD_HITS else DEFAULT_CATEGORY
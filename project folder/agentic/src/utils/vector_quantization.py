@@ -0,0 +1,437 @@
+"""
+Quantized vector index for large ChromaDB collections
+Keeps int8 or binary (sign-bit) codes in RAM and rescores a shortlist
+against full-precision vectors memory-mapped from disk
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+# Marker file of an index that is missing writes made to its collection since it was built
+STALE_MARKER = "stale"
+
+# Number of set bits for every possible byte value (Hamming distance lookup)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Rows processed at once when scanning codes (bounds temporary memory)
+_SCAN_BLOCK_ROWS = 8192
+
+
+class QuantizedVectorIndex:
+    """
+    Two-stage index: cheap search over quantized codes, exact rescoring on disk.
+
+    Files stored in the index directory:
+        meta.json   - mode, dimension, count, source collection and its version,
+                      and the build directory holding the files below
+        build-*/ids.json    - document IDs in row order
+        build-*/full.npy    - float32 vectors (memory-mapped, never fully loaded)
+        build-*/codes.npy   - int8 codes or packed sign bits (resident in RAM)
+        build-*/scale.npy   - per-dimension int8 scale (int8 mode only)
+
+    Every build writes a new build directory and then swaps meta.json in with
+    os.replace, so readers always see one complete build and the files a
+    reader has memory-mapped are never rewritten under it.
+    """
+
+    def __init__(self, index_dir: str):
+        """
+        Load a previously built index.
+
+        Args:
+            index_dir: Directory created by QuantizedVectorIndex.build
+        """
+        self.index_dir = Path(index_dir)
+
+        with open(self.index_dir / "meta.json", 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        files_dir = self.index_dir / self.meta.get("files", ".")
+        with open(files_dir / "ids.json", 'r', encoding='utf-8') as f:
+            self.ids: List[str] = json.load(f)
+
+        self.mode = self.meta["mode"]
+        self.dimension = self.meta["dimension"]
+        self.codes = np.load(files_dir / "codes.npy")
+        self.scale = np.load(files_dir / "scale.npy") if self.mode == "int8" else None
+        self.full_vectors = np.load(files_dir / "full.npy", mmap_mode="r")
+
+    @classmethod
+    def build(
+        cls,
+        index_dir: str,
+        ids: List[str],
+        embedding_pages: Iterable[np.ndarray],
+        dimension: int,
+        mode: str = "binary",
+        collection_name: Optional[str] = None,
+        collection_version: int = 0
+    ) -> "QuantizedVectorIndex":
+        """
+        Build an index from pages of embeddings without holding them all in RAM.
+
+        Args:
+            index_dir: Output directory
+            ids: Document IDs, in the same order as the embedding rows
+            embedding_pages: Iterable of 2-D float arrays (rows in ID order)
+            dimension: Embedding dimension
+            mode: 'int8' or 'binary'
+            collection_name: Source collection (stored in meta.json)
+            collection_version: Version of the source collection the index was built from
+
+        Returns:
+            Loaded QuantizedVectorIndex
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+
+        index_path = Path(index_dir)
+        build_name = f"build-{uuid.uuid4().hex[:12]}"
+        build_path = index_path / build_name
+        build_path.mkdir(parents=True)
+        count = len(ids)
+
+        # Stream full-precision vectors to disk
+        full = np.lib.format.open_memmap(
+            build_path / "full.npy", mode="w+", dtype=np.float32, shape=(count, dimension)
+        )
+        row = 0
+        for page in embedding_pages:
+            page = np.asarray(page, dtype=np.float32)
+            full[row:row + len(page)] = page
+            row += len(page)
+        if row != count:
+            del full
+            shutil.rmtree(build_path, ignore_errors=True)
+            raise ValueError(f"Expected {count} embeddings, received {row}")
+        full.flush()
+
+        # Quantize block by block from the memory-mapped vectors
+        if mode == "int8":
+            max_abs = np.zeros(dimension, dtype=np.float32)
+            for start in range(0, count, _SCAN_BLOCK_ROWS):
+                block = np.abs(full[start:start + _SCAN_BLOCK_ROWS])
+                max_abs = np.maximum(max_abs, block.max(axis=0))
+            scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            codes = np.empty((count, dimension), dtype=np.int8)
+            for start in range(0, count, _SCAN_BLOCK_ROWS):
+                block = full[start:start + _SCAN_BLOCK_ROWS] / scale
+                codes[start:start + len(block)] = np.clip(np.rint(block), -127, 127)
+            np.save(build_path / "scale.npy", scale)
+        else:
+            codes = np.empty((count, (dimension + 7) // 8), dtype=np.uint8)
+            for start in range(0, count, _SCAN_BLOCK_ROWS):
+                block = full[start:start + _SCAN_BLOCK_ROWS] > 0
+                codes[start:start + len(block)] = np.packbits(block, axis=1)
+
+        np.save(build_path / "codes.npy", codes)
+        del full
+
+        with open(build_path / "ids.json", 'w', encoding='utf-8') as f:
+            json.dump(ids, f)
+
+        # Swap the new build in: meta.json is replaced last and atomically
+        meta_tmp = index_path / f".meta-{build_name}.json"
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                "mode": mode,
+                "dimension": dimension,
+                "count": count,
+                "collection_name": collection_name,
+                "collection_version": collection_version,
+                "files": build_name
+            }, f, indent=2)
+        os.replace(meta_tmp, index_path / "meta.json")
+        _remove_old_builds(index_path, keep=build_name)
+
+        print(f"Built {mode} quantized index for {count} vectors in {index_path}")
+        return cls(str(index_path))
+
+    def _coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """Score every row using the resident codes (higher is better)"""
+        scores = np.empty(len(self.ids), dtype=np.float32)
+
+        if self.mode == "int8":
+            scaled_query = (query * self.scale).astype(np.float32)
+            for start in range(0, len(self.ids), _SCAN_BLOCK_ROWS):
+                block = self.codes[start:start + _SCAN_BLOCK_ROWS].astype(np.float32)
+                scores[start:start + len(block)] = block @ scaled_query
+        else:
+            query_bits = np.packbits(query > 0)
+            for start in range(0, len(self.ids), _SCAN_BLOCK_ROWS):
+                block = np.bitwise_xor(self.codes[start:start + _SCAN_BLOCK_ROWS], query_bits)
+                hamming = _POPCOUNT_TABLE[block].sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = -hamming
+
+        return scores
+
+    def search(
+        self,
+        query_embedding: List[float],
+        n_results: int,
+        rescore_multiplier: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        Find nearest neighbours by inner product.
+
+        Args:
+            query_embedding: Query vector (normalized, as produced by BGE-M3)
+            n_results: Number of results to return
+            rescore_multiplier: Shortlist size as a multiple of n_results
+
+        Returns:
+            List of (doc_id, score) sorted by descending exact score
+        """
+        if not self.ids:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        n_results = min(n_results, len(self.ids))
+        shortlist_size = min(len(self.ids), max(n_results, n_results * rescore_multiplier))
+
+        coarse = self._coarse_scores(query)
+        if shortlist_size < len(self.ids):
+            shortlist = np.argpartition(-coarse, shortlist_size - 1)[:shortlist_size]
+        else:
+            shortlist = np.arange(len(self.ids))
+
+        # Exact rescoring: sorted row order keeps mmap reads sequential
+        shortlist = np.sort(shortlist)
+        exact = self.full_vectors[shortlist] @ query
+        order = np.argsort(-exact)[:n_results]
+
+        return [(self.ids[shortlist[i]], float(exact[i])) for i in order]
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """Resident vs on-disk bytes for this index"""
+        resident = self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+        return {
+            "resident_bytes": int(resident),
+            "full_precision_bytes": int(len(self.ids) * self.dimension * 4),
+            "count": len(self.ids)
+        }
+
+
+def _remove_old_builds(index_path: Path, keep: str) -> None:
+    """
+    Delete superseded build directories and pre-build-directory files.
+
+    Readers that still have an old full.npy memory-mapped keep reading it
+    (POSIX unlinks open files lazily); where the OS refuses to delete it, the
+    directory is retried after the next build.
+    """
+    for path in index_path.iterdir():
+        if path.is_dir() and path.name.startswith("build-") and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.name in ("ids.json", "full.npy", "codes.npy", "scale.npy"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def mark_quantized_index_stale(index_dir: str) -> None:
+    """Flag a built index as missing recent collection writes; it is not served until rebuilt"""
+    index_path = Path(index_dir)
+    if (index_path / "meta.json").exists():
+        (index_path / STALE_MARKER).touch()
+
+
+def is_quantized_index_stale(index_dir: str) -> bool:
+    """Whether writes were made to the collection after the index was built"""
+    return (Path(index_dir) / STALE_MARKER).exists()
+
+
+def collection_space(collection) -> str:
+    """
+    Distance space of a Chroma collection ('l2', 'cosine' or 'ip').
+
+    Read from the collection configuration: modify(metadata=...) replaces the
+    whole metadata, hnsw:space included, while the configuration keeps the
+    space the index was created with.
+    """
+    configuration = getattr(collection, "configuration", None) or {}
+    index_configuration = configuration.get("hnsw") or configuration.get("spann") or {}
+    return index_configuration.get("space") or (collection.metadata or {}).get("hnsw:space") or "l2"
+
+
+def score_to_distance(score: float, space: str) -> float:
+    """
+    Chroma distance of an inner-product score on normalized vectors.
+
+    Args:
+        score: Exact inner product (cosine for BGE-M3 vectors)
+        space: Distance space of the collection ('l2', 'cosine' or 'ip', see collection_space)
+
+    Returns:
+        Squared L2 (2 - 2 * cosine) for l2, 1 - score for cosine and ip
+    """
+    if space == "l2":
+        return 2.0 - 2.0 * score
+    return 1.0 - score
+
+
+def query_quantized_index(
+    index: QuantizedVectorIndex,
+    collection,
+    query_embedding: List[float],
+    n_results: int,
+    rescore_multiplier: int = 10
+) -> Dict:
+    """
+    Query a quantized index and return results shaped like collection.query.
+
+    Documents and metadata are fetched from Chroma for the final hits only.
+    Distances follow the collection's space (see collection_space) so
+    callers can treat both paths alike.
+
+    Args:
+        index: Loaded QuantizedVectorIndex
+        collection: ChromaDB collection holding documents and metadata
+        query_embedding: Query vector
+        n_results: Number of results
+        rescore_multiplier: Shortlist size as a multiple of n_results
+
+    Returns:
+        Dict with ids, documents, metadatas, distances (one query)
+    """
+    hits = index.search(query_embedding, n_results, rescore_multiplier)
+    hit_ids = [doc_id for doc_id, _ in hits]
+
+    records = collection.get(ids=hit_ids, include=["documents", "metadatas"]) if hit_ids else {
+        "ids": [], "documents": [], "metadatas": []
+    }
+    by_id = {
+        doc_id: (doc, meta)
+        for doc_id, doc, meta in zip(records["ids"], records["documents"], records["metadatas"])
+    }
+
+    # Drop hits deleted from Chroma since the index was built
+    hits = [(doc_id, score) for doc_id, score in hits if doc_id in by_id]
+    space = collection_space(collection)
+
+    return {
+        "ids": [[doc_id for doc_id, _ in hits]],
+        "documents": [[by_id[doc_id][0] for doc_id, _ in hits]],
+        "metadatas": [[by_id[doc_id][1] for doc_id, _ in hits]],
+        "distances": [[score_to_distance(score, space) for _, score in hits]]
+    }
+
+
+def build_index_from_collection(
+    collection,
+    index_dir: str,
+    mode: str = "binary",
+    page_size: int = 1000
+) -> QuantizedVectorIndex:
+    """
+    Build a quantized index from the embeddings stored in a ChromaDB collection.
+
+    Embeddings are fetched page by page, so the collection is never loaded
+    into RAM at once. The stale marker is cleared unless writes marked the
+    index stale again while it was being built.
+
+    Args:
+        collection: ChromaDB collection
+        index_dir: Output directory
+        mode: 'int8' or 'binary'
+        page_size: Number of embeddings fetched per page
+
+    Returns:
+        The built QuantizedVectorIndex
+    """
+    started = time.time()
+    count = collection.count()
+
+    # Fetch IDs first so rows and IDs stay aligned
+    ids = []
+    for offset in range(0, count, page_size):
+        ids.extend(collection.get(limit=page_size, offset=offset, include=[])["ids"])
+
+    dimension = 0
+    if ids:
+        first = collection.get(ids=ids[:1], include=["embeddings"])
+        dimension = len(first["embeddings"][0])
+
+    def embedding_pages():
+        for start in range(0, len(ids), page_size):
+            page_ids = ids[start:start + page_size]
+            page = collection.get(ids=page_ids, include=["embeddings"])
+            # collection.get does not guarantee the requested order
+            by_id = dict(zip(page["ids"], page["embeddings"]))
+            yield np.asarray([by_id[doc_id] for doc_id in page_ids], dtype=np.float32)
+
+    index = QuantizedVectorIndex.build(
+        index_dir=index_dir,
+        ids=ids,
+        embedding_pages=embedding_pages(),
+        dimension=dimension,
+        mode=mode,
+        collection_name=collection.name,
+        collection_version=int((collection.metadata or {}).get("version", 0))
+    )
+
+    stale = Path(index_dir) / STALE_MARKER
+    try:
+        if stale.stat().st_mtime < started:
+            stale.unlink()
+    except FileNotFoundError:
+        pass
+    return index
+
+
+# index_dir -> (meta.json mtime, loaded index)
+_loaded_indexes: Dict[str, Tuple[float, QuantizedVectorIndex]] = {}
+
+
+def load_quantized_index(index_dir: str) -> Optional[QuantizedVectorIndex]:
+    """
+    Load (and cache) a quantized index, or return None to search ChromaDB.
+
+    None is returned when the index was never built or is stale (writes
+    since the build are not in it yet). meta.json is swapped in last by a
+    build, so a changed mtime means the index was rebuilt (possibly by another
+    process) and is loaded again.
+
+    Args:
+        index_dir: Index directory
+
+    Returns:
+        QuantizedVectorIndex or None
+    """
+    meta_path = Path(index_dir) / "meta.json"
+    for attempt in range(2):
+        try:
+            modified = meta_path.stat().st_mtime
+        except FileNotFoundError:
+            _loaded_indexes.pop(index_dir, None)
+            return None
+        if is_quantized_index_stale(index_dir):
+            return None
+
+        cached = _loaded_indexes.get(index_dir)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        try:
+            index = QuantizedVectorIndex(index_dir)
+        except FileNotFoundError:
+            # A rebuild swapped meta.json and removed the build it pointed to; read the new one
+            if attempt:
+                raise
+            continue
+        _loaded_indexes[index_dir] = (modified, index)
+        return index
+
+
+def invalidate_quantized_index(index_dir: str) -> None:
+    """Forget a cached index so the next load reads it from disk again"""
+    _loaded_indexes.pop(index_dir, None)
@@ -0,0 +1,60 @@
+import threading
+
+from src.utils.agent_pool import AgentPool
+
+
+class Agent:
+    def __init__(self):
+        self.copies = 0
+
+    def deep_copy(self):
+        self.copies += 1
+        return object()
+
+
+def test_copies_are_reused_after_a_lease():
+    agent = Agent()
+    pool = AgentPool(agent)
+
+    with pool.lease(2) as first:
+        assert len(set(map(id, first))) == 2
+        assert pool.idle() == 0
+    with pool.lease(3) as second:
+        assert set(map(id, first)) < set(map(id, second))
+
+    assert agent.copies == 3
+    assert pool.idle() == 3
+
+
+def test_concurrent_leases_never_share_a_copy():
+    pool = AgentPool(Agent())
+    barrier = threading.Barrier(4)
+    leased = []
+    lock = threading.Lock()
+
+    def run():
+        with pool.lease() as (copy,):
+            with lock:
+                leased.append(copy)
+            barrier.wait(5)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(set(map(id, leased))) == 4
+    assert pool.idle() == 4
+
+
+def test_copies_return_to_the_pool_when_the_run_fails():
+    pool = AgentPool(Agent())
+
+    try:
+        with pool.lease():
+            raise RuntimeError("agent run failed")
+    except RuntimeError:
+        pass
+
+    assert pool.idle() == 1
@@ -0,0 +1,77 @@
+
+from src.config.settings import settings
+from src.utils.context_packer import (
+    estimate_tokens,
+    estimated_jaccard,
+    minhash_signature,
+    output_token_cap,
+    pack_context
+)
+
+
+def test_estimate_tokens_is_about_four_characters_per_token():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+def test_minhash_ignores_case_and_whitespace():
+    signature = minhash_signature("Reset your password from the account page")
+
+    assert estimated_jaccard(signature, minhash_signature("reset  your password\nfrom the ACCOUNT page")) == 1.0
+    assert estimated_jaccard(signature, minhash_signature("Invoices are sent on the first of each month")) < 0.3
+
+
+def test_chunks_are_packed_best_score_first():
+    packed = pack_context(["low", "high", "middle"], scores=[0.1, 0.9, 0.5], token_budget=100)
+
+    assert packed.documents == ["high", "middle", "low"]
+    assert packed.indices == [1, 2, 0]
+
+
+def test_retrieval_order_is_kept_without_matching_scores():
+    packed = pack_context(["first", "second"], scores=[0.5], token_budget=100)
+
+    assert packed.documents == ["first", "second"]
+
+
+def test_near_duplicates_are_dropped():
+    chunk = "To reset your password, open Settings, choose Security and click Reset password. "
+    packed = pack_context([chunk * 3, chunk * 3 + " Thanks!", "Refunds take five business days."], token_budget=1000)
+
+    assert packed.indices == [0, 2]
+    assert packed.duplicates_dropped == 1
+
+
+def test_chunks_over_the_budget_are_dropped():
+    documents = ["a" * 400, "b" * 400, "c" * 40]
+    packed = pack_context(documents, token_budget=120, dedup_threshold=1.1)
+
+    assert packed.indices == [0, 2]
+    assert packed.budget_dropped == 1
+    assert packed.raw_tokens == 210
+    assert packed.packed_tokens == 110
+
+
+def test_best_chunk_is_truncated_to_the_budget():
+    packed = pack_context(["x" * 1000, "y" * 10], token_budget=50)
+
+    assert packed.documents[0] == "x" * 200
+    assert packed.packed_tokens == 50
+    assert packed.budget_dropped == 1
+
+
+def test_output_cap_adds_the_thinking_allowance(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_THINKING_TOKEN_ALLOWANCE", 1000)
+    monkeypatch.setattr(settings, "RAG_OUTPUT_TOKEN_CAP", 600)
+    monkeypatch.setattr(settings, "GEMINI_MAX_OUTPUT_TOKENS", 100000)
+
+    assert output_token_cap("how_to") == 2024
+    assert output_token_cap("unknown") == 1600
+    assert output_token_cap() == 1600
+
+
+def test_output_cap_never_exceeds_the_model_maximum(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_MAX_OUTPUT_TOKENS", 1500)
+
+    assert output_token_cap("how_to") == 1500
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_text_splitters")
+
+from src.config.settings import settings
+from src.services.data_manager import ChromaDBManager
+from src.services.ingestion_service import get_collection_version
+from src.utils.vector_quantization import collection_space, is_quantized_index_stale, load_quantized_index
+
+
+def normalized_vectors(count, dimension=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ChromaDBManager(str(tmp_path / "chroma"))
+    collection = manager.client.create_collection(name="docs", metadata={"hnsw:space": "cosine"})
+    collection.add(
+        ids=[f"doc_{i}" for i in range(20)],
+        documents=[f"text {i}" for i in range(20)],
+        metadatas=[{"category": "Billing", "chunk_index": i} for i in range(20)],
+        embeddings=normalized_vectors(20).tolist()
+    )
+    return manager
+
+
+def test_writes_mark_the_index_stale_and_batch_into_one_rebuild(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setattr(settings, "QUANTIZED_INDEX_DIR", str(tmp_path / "quantized"))
+    monkeypatch.setattr(settings, "QUANTIZED_INDEX_REBUILD_DELAY", 0.2)
+    manager.build_quantized_index("docs")
+    index_dir = str(tmp_path / "quantized" / "docs")
+
+    builds = []
+    build = manager.build_quantized_index
+    monkeypatch.setattr(manager, "build_quantized_index", lambda name: builds.append(name) or build(name))
+
+    manager.delete_documents("docs", ["doc_0"])
+    manager.delete_documents("docs", ["doc_1"])
+
+    # Retrieval falls back to ChromaDB until the background rebuild lands
+    assert load_quantized_index(index_dir) is None
+
+    give_up = time.monotonic() + 10
+    while is_quantized_index_stale(index_dir) and time.monotonic() < give_up:
+        time.sleep(0.05)
+
+    assert builds == ["docs"]
+    assert sorted(load_quantized_index(index_dir).ids) == sorted(f"doc_{i}" for i in range(2, 20))
+
+
+def test_binary_export_round_trips_without_re_embedding(manager, tmp_path):
+    manager.export_collection_binary("docs", str(tmp_path / "export"), page_size=7)
+    manager.import_collection_binary(str(tmp_path / "export"), collection_name="copy", page_size=7)
+
+    source = manager.client.get_collection(name="docs").get(include=["documents", "metadatas", "embeddings"])
+    copy = manager.client.get_collection(name="copy")
+    imported = copy.get(ids=source["ids"], include=["documents", "metadatas", "embeddings"])
+
+    assert imported["ids"] == source["ids"]
+    assert imported["documents"] == source["documents"]
+    assert imported["metadatas"] == source["metadatas"]
+    assert np.allclose(imported["embeddings"], source["embeddings"])
+    assert get_collection_version(copy) == 1
+    assert collection_space(copy) == "cosine"
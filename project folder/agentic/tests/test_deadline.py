@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from src.config.settings import settings
+from src.utils.deadline import STAGE_BUDGETS_MS, Deadline
+
+
+@pytest.fixture(autouse=True)
+def deadline_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_DEADLINE_MS", 30000)
+    monkeypatch.setattr(settings, "PIPELINE_DEADLINE_MARGIN_MS", 500)
+
+
+def test_service_deadline_applies_without_a_caller_timeout():
+    assert Deadline().budget_ms == 30000
+
+
+def test_shorter_caller_timeout_wins_minus_the_margin():
+    assert Deadline(10000).budget_ms == 9500
+    assert Deadline(60000).budget_ms == 30000
+
+
+def test_budget_never_goes_negative():
+    deadline = Deadline(200)
+
+    assert deadline.budget_ms == 0
+    assert deadline.remaining_ms() == 0
+
+
+def test_remaining_time_counts_down():
+    deadline = Deadline(1500)
+    time.sleep(0.05)
+
+    assert 900 <= deadline.remaining_ms() < 1000
+
+
+def test_optional_stage_must_leave_room_for_required_stages():
+    needed = STAGE_BUDGETS_MS["query_analysis"] + STAGE_BUDGETS_MS["rag_pipeline"]
+    deadline = Deadline(needed + 500 + 200)
+
+    assert deadline.allows("query_analysis")
+    assert deadline.allows("query_analysis", "rag_pipeline")
+    assert not deadline.allows("query_analysis", "context_enrichment", "rag_pipeline")
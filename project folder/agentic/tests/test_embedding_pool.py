@@ -0,0 +1,63 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.utils import embedding_pool as embedding_pool_module
+from src.utils.embedding_pool import EmbeddingWorkerPool
+
+
+class SlowFirstEncoder:
+    """Encodes a text as [its number]; batches starting with a lower number take longer"""
+
+    def encode(self, texts, batch_size, max_length):
+        time.sleep(0.05 if int(texts[0]) < 4 else 0.0)
+        return {"dense_vecs": np.array([[float(text)] for text in texts], dtype=np.float32)}
+
+
+def thread_pool(monkeypatch, workers):
+    """An EmbeddingWorkerPool running _encode_batch on threads instead of worker processes"""
+    monkeypatch.setattr(embedding_pool_module, "_worker_model", SlowFirstEncoder())
+    pool = EmbeddingWorkerPool.__new__(EmbeddingWorkerPool)
+    pool.workers = workers
+    pool.executor = ThreadPoolExecutor(max_workers=workers)
+    pool.worker_stats = defaultdict(lambda: {"chunks": 0, "seconds": 0.0})
+    pool._started = time.perf_counter()
+    return pool
+
+
+def test_imap_yields_batches_in_input_order(monkeypatch):
+    pool = thread_pool(monkeypatch, workers=3)
+    batches = [[str(i), str(i)] for i in range(8)]
+
+    with pool:
+        results = list(pool.imap(iter(batches), batch_size=2, max_length=16))
+
+    assert [result[:, 0].tolist() for result in results] == [[float(i)] * 2 for i in range(8)]
+
+
+def test_imap_keeps_at_most_two_batches_per_worker_in_flight(monkeypatch):
+    pool = thread_pool(monkeypatch, workers=2)
+    pulled = []
+
+    def batches():
+        for i in range(10):
+            pulled.append(i)
+            yield [str(i)]
+
+    with pool:
+        results = pool.imap(batches(), batch_size=1, max_length=16)
+        next(results)
+        assert len(pulled) <= 2 * 2 + 1
+        assert len(list(results)) == 9
+
+
+def test_encode_concatenates_batches_and_reports_throughput(monkeypatch):
+    pool = thread_pool(monkeypatch, workers=2)
+
+    with pool:
+        dense = pool.encode([str(i) for i in range(7)], batch_size=3)["dense_vecs"]
+
+    assert dense[:, 0].tolist() == [float(i) for i in range(7)]
+    assert pool.throughput_report()["total_chunks"] == 7
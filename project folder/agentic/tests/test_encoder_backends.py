@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+from src.utils import encoder_backends
+from src.utils.encoder_backends import ONNXBGEEncoder, create_encoder, encoder_model_version
+
+
+@pytest.fixture(autouse=True)
+def encoder_settings(monkeypatch):
+    monkeypatch.setattr(settings, "BGE_MODEL_NAME", "BAAI/bge-m3")
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "torch")
+    monkeypatch.setattr(settings, "ONNX_QUANTIZE_INT8", False)
+
+
+def test_only_int8_onnx_changes_the_model_version(monkeypatch):
+    assert encoder_model_version("torch") == "BAAI/bge-m3"
+    assert encoder_model_version("onnx") == "BAAI/bge-m3"
+
+    monkeypatch.setattr(settings, "ONNX_QUANTIZE_INT8", True)
+    assert encoder_model_version("onnx") == "BAAI/bge-m3@onnx-int8"
+    assert encoder_model_version("torch") == "BAAI/bge-m3"
+
+
+def test_create_encoder_passes_the_thread_count_to_onnx(monkeypatch):
+    built = []
+    monkeypatch.setattr(encoder_backends, "ONNXBGEEncoder", lambda intra_op_threads: built.append(intra_op_threads) or "onnx")
+    monkeypatch.setattr(encoder_backends, "TorchBGEEncoder", lambda: "torch")
+
+    assert create_encoder("onnx", threads=3) == "onnx"
+    assert create_encoder() == "torch"
+    assert built == [3]
+    with pytest.raises(ValueError):
+        create_encoder("tensorflow")
+
+
+class FakeTokenizer:
+    """Token ids are the text lengths, padded to the longest text of the batch"""
+
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        width = max(len(text) for text in texts)
+        return {
+            "input_ids": np.array([[len(text)] * width for text in texts]),
+            "attention_mask": np.ones((len(texts), width), dtype=np.int64)
+        }
+
+
+class FakeSession:
+    def __init__(self):
+        self.batch_shapes = []
+
+    def run(self, outputs, inputs):
+        input_ids = inputs["input_ids"]
+        self.batch_shapes.append(input_ids.shape)
+        # CLS vector [length, 1], before normalization
+        hidden = np.stack([input_ids[:, 0], np.ones(len(input_ids))], axis=1).astype(np.float32)
+        return [hidden[:, None, :]]
+
+
+def test_onnx_encode_restores_input_order_and_normalizes():
+    encoder = ONNXBGEEncoder.__new__(ONNXBGEEncoder)
+    encoder.tokenizer = FakeTokenizer()
+    encoder.session = FakeSession()
+    texts = ["a", "abcd", "ab", "abcdefgh"]
+
+    dense = encoder.encode(texts, batch_size=2, max_length=16)["dense_vecs"]
+
+    expected = np.array([[len(text), 1.0] for text in texts])
+    assert np.allclose(dense, expected / np.linalg.norm(expected, axis=1, keepdims=True))
+    # Length-sorted batches: the two longest texts are padded together
+    assert encoder.session.batch_shapes == [(2, 8), (2, 2)]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("chromadb")
+pytest.importorskip("agno")
+
+from src.config.settings import settings
+from src.services.enhanced_rag_service import EnhancedRAGService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "EVALUATION_GATE_ENABLED", True)
+    monkeypatch.setattr(settings, "EVALUATION_GATE_HIGH", 0.75)
+    monkeypatch.setattr(settings, "EVALUATION_GATE_LOW", 0.35)
+    # No models, clients or agents: only the methods under test are used
+    return EnhancedRAGService.__new__(EnhancedRAGService)
+
+
+@pytest.mark.parametrize("similarities, decision", [
+    ([0.2, 0.9, 0.5], "gate_high"),
+    ([0.75], "gate_high"),
+    ([0.3, 0.1], "gate_low"),
+    ([0.35, 0.6], None),
+    ([], None)
+])
+def test_gate_decides_only_clear_cases(service, similarities, decision):
+    assert service.gate_evaluation(similarities) == decision
+
+
+def test_gate_is_off_unless_enabled(service, monkeypatch):
+    monkeypatch.setattr(settings, "EVALUATION_GATE_ENABLED", False)
+
+    assert service.gate_evaluation([0.99]) is None
+
+
+def test_gated_evaluation_makes_no_llm_call(service, monkeypatch):
+    monkeypatch.setattr(service, "evaluate_documents", lambda *args: pytest.fail("evaluation team called"))
+    monkeypatch.setattr(service, "evaluate_documents_single_pass", lambda *args: pytest.fail("single pass called"))
+
+    assert service.evaluate("query", ["doc"], [0.9]) == ("safe", "gate_high", [])
+    assert service.evaluate("query", ["doc"], [0.1]) == ("missing_knowledge", "gate_low", [])
+
+
+def test_confidence_blends_self_assessment_with_retrieval(service, monkeypatch):
+    monkeypatch.setattr(settings, "CONFIDENCE_SELF_WEIGHT", 0.6)
+    similarities = [0.75, 0.6, 0.5]
+
+    retrieval = service.retrieval_confidence(similarities, 3)
+
+    # Top similarity at the high gate, margin above 0.1, three documents
+    assert retrieval == pytest.approx(1.0)
+    assert service.blend_confidence(0.5, similarities, 3) == pytest.approx(0.6 * 0.5 + 0.4 * 1.0)
+    assert service.blend_confidence(None, similarities, 3) == pytest.approx(1.0)
+
+
+def test_weak_retrieval_pulls_confidence_down(service, monkeypatch):
+    monkeypatch.setattr(settings, "CONFIDENCE_SELF_WEIGHT", 0.6)
+
+    weak = service.blend_confidence(0.9, [0.36, 0.355], 1)
+    strong = service.blend_confidence(0.9, [0.8, 0.5], 3)
+
+    assert 0.0 <= weak < strong <= 1.0
+
+
+class RankingEncoder:
+    """Encodes each query as a one-hot vector, recording the calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, max_length):
+        self.calls.append(list(texts))
+        return {"dense_vecs": np.eye(len(texts), dtype=np.float32)}
+
+
+class RankingCollection:
+    """collection.query returning a fixed ranking per query vector, recording the calls"""
+
+    def __init__(self, rankings):
+        self.rankings = rankings
+        self.metadata = {"hnsw:space": "cosine"}
+        self.calls = []
+
+    def query(self, query_embeddings, n_results, where=None):
+        self.calls.append(len(query_embeddings))
+        rankings = [self.rankings[int(np.argmax(vector))][:n_results] for vector in query_embeddings]
+        return {
+            "ids": rankings,
+            "documents": [[f"text of {chunk_id}" for chunk_id in ranking] for ranking in rankings],
+            "metadatas": [[{} for _ in ranking] for ranking in rankings],
+            "distances": [[0.1 * (rank + 1) for rank in range(len(ranking))] for ranking in rankings]
+        }
+
+
+def test_query_variants_are_embedded_and_searched_in_one_round(service, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "none")
+    service.bge_model = RankingEncoder()
+    service.collection = RankingCollection([
+        ["a", "b", "c"],  # enriched query
+        ["b", "d", "a"],  # original text
+        ["b", "a", "e"]   # summary
+    ])
+
+    results = service.get_relevant_docs_multi(["enriched", "original", "summary"], n_results=3)
+
+    assert service.bge_model.calls == [["enriched", "original", "summary"]]
+    assert service.collection.calls == [3]
+    # b ranks high in every list, so fusion puts it first
+    assert results["ids"][0] == ["b", "a", "d"]
+    assert results["distances"][0][0] == pytest.approx(0.1)
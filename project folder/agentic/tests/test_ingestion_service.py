@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from src.config.settings import settings
+from src.services.ingestion_service import (
+    IngestionCheckpoint,
+    IngestionPipeline,
+    bump_collection_version,
+    create_splitter,
+    get_collection_version
+)
+from src.utils.vector_quantization import collection_space
+
+
+class FakeCollection:
+    """The ChromaDB collection calls used by the pipeline, over a dict"""
+
+    def __init__(self):
+        self.name = "docs"
+        self.records = {}
+
+    def get(self, ids=None, where=None, include=(), limit=None, offset=0):
+        if ids is None:
+            ids = [
+                chunk_id for chunk_id, (_, metadata) in self.records.items()
+                if where is None or all(metadata.get(key) == value for key, value in where.items())
+            ]
+            ids = ids[offset:offset + limit] if limit else ids
+        found = [chunk_id for chunk_id in ids if chunk_id in self.records]
+        return {"ids": found, "metadatas": [self.records[chunk_id][1] for chunk_id in found]}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.records.update({chunk_id: (text, dict(metadata)) for chunk_id, text, metadata in zip(ids, documents, metadatas)})
+
+    def update(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.records[chunk_id] = (self.records[chunk_id][0], dict(metadata))
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.texts = 0
+
+    def encode(self, texts, batch_size, max_length):
+        self.texts += len(texts)
+        return {"dense_vecs": np.ones((len(texts), 4), dtype=np.float32)}
+
+
+def pipeline(tmp_path, collection, encoder):
+    return IngestionPipeline(
+        collection,
+        encoder,
+        splitter=create_splitter("character", chunk_size=20, chunk_overlap=0),
+        write_page_size=3,
+        checkpoint_path=str(tmp_path / "checkpoint.json")
+    )
+
+
+def paragraphs(count):
+    return "\n\n".join(f"paragraph number {i}" for i in range(count))
+
+
+@pytest.fixture(autouse=True)
+def ingest_settings(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "torch")
+    monkeypatch.setattr(settings, "BGE_MODEL_NAME", "BAAI/bge-m3")
+
+
+def test_checkpoint_persists_completed_files(tmp_path):
+    checkpoint = IngestionCheckpoint(str(tmp_path / "state" / "checkpoint.json"))
+    checkpoint.mark_done("faq.md", "hash-1")
+
+    reloaded = IngestionCheckpoint(str(tmp_path / "state" / "checkpoint.json"))
+
+    assert reloaded.is_done("faq.md", "hash-1")
+    assert not reloaded.is_done("faq.md", "hash-2")
+    assert not reloaded.is_done("other.md", "hash-1")
+
+
+def test_rerun_skips_checkpointed_files(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    (source / "a.md").write_text(paragraphs(4), encoding="utf-8")
+    (source / "b.md").write_text(paragraphs(2), encoding="utf-8")
+    collection, encoder = FakeCollection(), FakeEncoder()
+
+    first = pipeline(tmp_path, collection, encoder).run(str(source))
+    second = pipeline(tmp_path, collection, encoder).run(str(source))
+
+    assert first["chunks_written"] == 6
+    assert second["files_skipped"] == 2
+    assert encoder.texts == 6
+
+
+def test_shortened_file_loses_its_tail_chunks(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    (source / "a.md").write_text(paragraphs(5), encoding="utf-8")
+    collection, encoder = FakeCollection(), FakeEncoder()
+    pipeline(tmp_path, collection, encoder).run(str(source))
+
+    (source / "a.md").write_text(paragraphs(2), encoding="utf-8")
+    stats = pipeline(tmp_path, collection, encoder).run(str(source))
+
+    assert sorted(collection.records) == ["a.md#0", "a.md#1"]
+    assert stats["chunks_deleted"] == 3
+    assert stats["chunks_skipped"] == 2  # unchanged chunks are not re-embedded
+
+
+def test_undecodable_file_is_skipped_and_not_checkpointed(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    (source / "a.md").write_text(paragraphs(1), encoding="utf-8")
+    (source / "broken.txt").write_bytes(b"\xff\xfe\x00bad")
+    collection = FakeCollection()
+
+    stats = pipeline(tmp_path, collection, FakeEncoder()).run(str(source))
+
+    assert stats["files_failed"] == 1
+    assert list(collection.records) == ["a.md#0"]
+    assert not IngestionCheckpoint(str(tmp_path / "checkpoint.json")).files.get("broken.txt")
+
+
+def test_version_bump_keeps_the_distance_space(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    collection = client.create_collection(name="docs", metadata={"hnsw:space": "cosine", "owner": "support"})
+
+    assert bump_collection_version(collection) == 1
+    assert bump_collection_version(client.get_collection(name="docs")) == 2
+
+    reloaded = client.get_collection(name="docs")
+    assert get_collection_version(reloaded) == 2
+    assert reloaded.metadata["owner"] == "support"
+    assert collection_space(reloaded) == "cosine"
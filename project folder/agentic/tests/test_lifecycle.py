@@ -0,0 +1,93 @@
+import pytest
+
+from src.utils import lifecycle
+from src.utils.lifecycle import LazyService, ServiceRegistry
+
+
+class Model:
+    def __init__(self):
+        self.size = 3
+
+    def encode(self, text):
+        return text.upper()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = ServiceRegistry()
+    monkeypatch.setattr(lifecycle, "service_registry", registry)
+    monkeypatch.setattr(lifecycle.time, "sleep", lambda seconds: None)
+    return registry
+
+
+def test_lazy_service_builds_once_on_first_use(registry):
+    built = []
+    service = LazyService("model", lambda: built.append(1) or Model())
+
+    assert built == []
+    assert registry.component_status()["model"]["loaded"] is False
+
+    assert service.encode("ok") == "OK"
+    service.size = 5
+    assert service.size == 5
+    assert built == [1]
+    assert registry.component_status()["model"]["loaded"] is True
+
+
+def test_failed_build_is_reported_and_retried_on_next_use(registry):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model download failed")
+        return Model()
+
+    service = LazyService("model", flaky)
+
+    with pytest.raises(RuntimeError):
+        service.encode("x")
+    assert registry.component_status()["model"]["error"] == "model download failed"
+
+    assert service.encode("x") == "X"
+    assert registry.component_status()["model"]["error"] is None
+
+
+def test_warm_up_retries_from_the_failed_stage(registry):
+    builds = {"encoder": 0, "store": 0, "agents": 0}
+    failures = {"store": 1}
+
+    def factory(name):
+        def build():
+            builds[name] += 1
+            if failures.get(name):
+                failures[name] -= 1
+                raise RuntimeError(f"{name} not ready")
+            return Model()
+        return build
+
+    for name in builds:
+        LazyService(name, factory(name))
+
+    assert registry.warm_up([["encoder"], ["store", "agents"]], max_retries=2)
+
+    # The encoder loaded in the first attempt is not rebuilt
+    assert builds == {"encoder": 1, "store": 2, "agents": 1}
+    assert registry.warm_up_attempts == 2
+    assert registry.ready
+    assert registry.failed_stage is None
+
+
+def test_warm_up_gives_up_and_reports_the_failed_stage(registry):
+    LazyService("encoder", Model)
+    LazyService("store", lambda: (_ for _ in ()).throw(RuntimeError("disk full")))
+    hooks = []
+
+    ready = registry.warm_up([["encoder"], ["store"]], on_loaded={"encoder": hooks.append}, max_retries=1)
+
+    assert not ready
+    assert registry.warm_up_gave_up
+    assert registry.warm_up_attempts == 2
+    assert registry.failed_stage == 2
+    assert registry.warm_up_error == "store: disk full"
+    assert len(hooks) == 1
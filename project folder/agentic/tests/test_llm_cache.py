@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import llm_cache as llm_cache_module
+from src.utils.llm_cache import CachedAgent, CachedRunOutput, LLMResponseCache, agent_instructions, cache_key
+
+
+class FakeAgent:
+    """agno Agent stand-in returning a run output per input"""
+
+    def __init__(self, name="Query Analyzer", status="COMPLETED"):
+        self.name = name
+        self.model = SimpleNamespace(id="mistral-small-latest", temperature=0.0)
+        self.system_message = "Classify the ticket"
+        self.status = status
+        self.inputs = []
+
+    def run(self, input):
+        self.inputs.append(input)
+        return SimpleNamespace(content=f"answer to {input}", status=self.status)
+
+
+@pytest.fixture(autouse=True)
+def cache_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: now.value)
+    return now
+
+
+def memory_cache(max_entries=100, ttl=60):
+    return LLMResponseCache(max_entries=max_entries, path="", ttls={"Query Analyzer": ttl})
+
+
+def test_cache_key_changes_with_every_part():
+    key = cache_key("agent", "model", "instructions", "input")
+
+    assert cache_key("agent", "model", "instructions", "input") == key
+    assert len({
+        key,
+        cache_key("other", "model", "instructions", "input"),
+        cache_key("agent", "other", "instructions", "input"),
+        cache_key("agent", "model", "other", "input"),
+        cache_key("agent", "model", "instructions", "other")
+    }) == 5
+
+
+def test_instructions_include_temperature_and_team_members():
+    agent = FakeAgent()
+    team = SimpleNamespace(members=[agent], model=None)
+
+    assert "Classify the ticket" in agent_instructions(agent)
+    assert "0.0" in agent_instructions(agent)
+    assert "Classify the ticket" in agent_instructions(team)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = memory_cache(max_entries=2)
+    cache.set("Query Analyzer", "a", "A")
+    cache.set("Query Analyzer", "b", "B")
+    assert cache.get("Query Analyzer", "a") == "A"
+
+    cache.set("Query Analyzer", "c", "C")
+
+    assert cache.get("Query Analyzer", "b") is None
+    assert cache.get("Query Analyzer", "a") == "A"
+    assert cache.get("Query Analyzer", "c") == "C"
+
+
+def test_entries_expire_after_their_agent_ttl(clock):
+    cache = memory_cache(ttl=60)
+    cache.set("Query Analyzer", "key", "response")
+
+    clock.value += 59
+    assert cache.get("Query Analyzer", "key") == "response"
+    clock.value += 1
+    assert cache.get("Query Analyzer", "key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_call_counts_hits_and_misses():
+    cache = memory_cache()
+    calls = []
+
+    def call():
+        calls.append(1)
+        return "response"
+
+    assert cache.cached_call("Query Analyzer", "model", "instructions", "input", call) == ("response", False)
+    assert cache.cached_call("Query Analyzer", "model", "instructions", "input", call) == ("response", True)
+    assert calls == [1]
+
+    stats = cache.stats()
+    assert stats["hit_rate"] == 0.5
+    assert stats["agents"]["Query Analyzer"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_empty_responses_and_unlisted_agents_are_not_cached():
+    cache = memory_cache()
+
+    assert cache.cached_call("Query Analyzer", "model", "", "input", lambda: "  ") == ("  ", False)
+    assert cache.cached_call("Query Analyzer", "model", "", "input", lambda: "later") == ("later", False)
+    assert cache.cached_call("Response Composer", "model", "", "input", lambda: "x") == ("x", False)
+    assert cache.cached_call("Response Composer", "model", "", "input", lambda: "y") == ("y", False)
+
+
+def test_nothing_is_cached_when_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+
+    assert not memory_cache().caches("Query Analyzer")
+
+
+def test_sqlite_persists_responses_across_instances(tmp_path, clock):
+    path = str(tmp_path / "cache" / "llm_cache.db")
+    LLMResponseCache(path=path, ttls={"Query Analyzer": 60}).set("Query Analyzer", "key", "response")
+
+    restarted = LLMResponseCache(path=path, ttls={"Query Analyzer": 60})
+    assert restarted.get("Query Analyzer", "key") == "response"
+
+    clock.value += 60
+    assert LLMResponseCache(path=path, ttls={"Query Analyzer": 60}).get("Query Analyzer", "key") is None
+
+
+def test_cached_agent_serves_repeated_inputs_from_the_cache():
+    agent = FakeAgent()
+    cached_agent = CachedAgent(agent, memory_cache())
+
+    first = cached_agent.run("ticket")
+    second = cached_agent.run("ticket")
+
+    assert first.content == "answer to ticket"
+    assert second == CachedRunOutput(content="answer to ticket")
+    assert agent.inputs == ["ticket"]
+
+
+def test_run_cached_skips_the_call_on_a_hit():
+    agent = FakeAgent()
+    cached_agent = CachedAgent(agent, memory_cache())
+    runs = []
+
+    def run(wrapped):
+        runs.append(wrapped)
+        return wrapped.run("ticket")
+
+    cached_agent.run_cached("ticket", run)
+    assert isinstance(cached_agent.run_cached("ticket", run), CachedRunOutput)
+    assert runs == [agent]
+
+
+def test_failed_runs_are_not_cached():
+    agent = FakeAgent(status="ERROR")
+    cached_agent = CachedAgent(agent, memory_cache())
+
+    cached_agent.run("ticket")
+    cached_agent.run("ticket")
+
+    assert agent.inputs == ["ticket", "ticket"]
+
+
+def test_cached_agent_forwards_other_attributes():
+    agent = FakeAgent()
+    cached_agent = CachedAgent(agent, memory_cache())
+
+    cached_agent.system_message = "Summarize the ticket"
+
+    assert cached_agent.name == "Query Analyzer"
+    assert agent.system_message == "Summarize the ticket"
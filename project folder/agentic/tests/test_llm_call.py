@@ -0,0 +1,162 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import llm_call as llm_call_module
+from src.utils.llm_call import (
+    LLMCallTimeout,
+    _agent_call,
+    agent_pool,
+    call_llm,
+    is_retryable,
+    latency_stats,
+    run_error,
+    status_code
+)
+
+
+@pytest.fixture(autouse=True)
+def call_settings(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_CALL_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_DELAY", 0.0)
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 5)
+
+
+class ProviderError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def failing(*errors, result="ok"):
+    """A call raising the given errors in turn, then returning result"""
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return call, calls
+
+
+def test_status_code_from_attributes_or_message():
+    assert status_code(ProviderError("boom", status_code=503)) == 503
+    assert status_code(SimpleNamespace(response=SimpleNamespace(status_code=429))) == 429
+    assert status_code(Exception("Error code: 429 - rate limited")) == 429
+    assert status_code(Exception("status code 502 from upstream")) == 502
+    assert status_code(Exception("answered in 1500 tokens")) is None
+
+
+def test_only_transient_errors_are_retryable():
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ProviderError("busy", status_code=503))
+    assert is_retryable(Exception("Rate limit exceeded"))
+    assert not is_retryable(ProviderError("bad request", status_code=400))
+    assert not is_retryable(ValueError("invalid schema"))
+
+
+def test_transient_errors_are_retried_until_success():
+    call, calls = failing(ProviderError("busy", status_code=503), ProviderError("slow down", status_code=429))
+
+    assert call_llm("Retry Agent", call, timeout=5) == "ok"
+    assert len(calls) == 3
+
+
+def test_permanent_errors_are_raised_at_once():
+    call, calls = failing(ProviderError("bad request", status_code=400))
+
+    with pytest.raises(ProviderError):
+        call_llm("Permanent Agent", call, timeout=5)
+    assert len(calls) == 1
+
+
+def test_last_error_response_is_returned_as_is():
+    failed = SimpleNamespace(status="ERROR", content="503 Service Unavailable")
+    calls = []
+
+    response = call_llm("Error Response Agent", lambda: calls.append(1) or failed, check=run_error, timeout=5)
+
+    assert response is failed
+    assert len(calls) == 3
+
+
+def test_call_past_its_timeout_raises(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CALL_MAX_RETRIES", 0)
+    release = threading.Event()
+
+    with pytest.raises(LLMCallTimeout):
+        call_llm("Slow Agent", lambda: release.wait(5), timeout=0.05)
+    release.set()
+
+
+def test_hedge_fires_after_the_p95_and_first_answer_wins(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    for _ in range(5):
+        latency_stats.record("Hedged Agent", 0.02)
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.0)
+        return "slow" if first else "hedge"
+
+    started = time.perf_counter()
+    assert call_llm("Hedged Agent", call, timeout=5) == "hedge"
+    assert time.perf_counter() - started < 1.0
+    assert len(calls) == 2
+
+
+class RecordingAgent:
+    """An agent whose copies record which runs they served"""
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = []
+
+    def deep_copy(self):
+        return RecordingAgent(self.name)
+
+    def run(self, input):
+        self.runs.append(input)
+        return SimpleNamespace(content=input)
+
+
+def test_agent_runs_on_leased_copies_never_the_shared_agent(monkeypatch):
+    monkeypatch.setattr(llm_call_module, "_agent_pools", {})
+    agent = RecordingAgent("Pooled Agent")
+    release = threading.Event()
+    overlapping = []
+
+    first = _agent_call(agent, "first")
+    second = _agent_call(agent, "second")
+
+    def run_while_first_is_in_flight(input):
+        overlapping.append(input)
+        release.wait(5)
+        return SimpleNamespace(content=input)
+
+    # Seed the pool with a copy that blocks, so the first call is in flight during the second
+    with agent_pool(agent).lease() as (copy,):
+        copy.run = run_while_first_is_in_flight
+    thread = threading.Thread(target=first)
+    thread.start()
+    while not overlapping:
+        time.sleep(0.01)
+    assert second().content == "second"
+    release.set()
+    thread.join(5)
+
+    assert agent.runs == []
+    assert agent_pool(agent) is agent_pool(RecordingAgent("Pooled Agent"))
+    assert agent_pool(agent).idle() == 2
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import llm_router as llm_router_module
+from src.utils.llm_router import LLMRouter, TargetStats, complete, parse_target, resolve_target
+
+MISTRAL = "mistral:mistral-small-latest"
+GEMINI = "gemini:gemini-2.5-flash"
+
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(settings, "MISTRAL_MODEL_ID", "mistral-small-latest")
+    monkeypatch.setattr(settings, "GEMINI_MODEL_NAME", "gemini-2.5-flash")
+    monkeypatch.setattr(settings, "LLM_ROUTING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_ROUTES", {"Query Classifier": ["mistral", "gemini"]})
+    monkeypatch.setattr(settings, "LLM_ROUTE_MIN_SAMPLES", 3)
+    monkeypatch.setattr(settings, "LLM_ROUTE_MAX_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "LLM_ROUTE_EXPLORE_RATE", 0.0)
+
+
+def record(router, target, latency, count=3, failures=0):
+    for _ in range(count):
+        router.record(target, latency)
+    for _ in range(failures):
+        router.record(target, None)
+
+
+def test_bare_provider_resolves_to_its_configured_model():
+    assert parse_target("mistral") == ("mistral", "mistral-small-latest")
+    assert parse_target("Gemini") == ("gemini", "gemini-2.5-flash")
+    assert parse_target("gemini:gemini-2.5-pro") == ("gemini", "gemini-2.5-pro")
+    assert resolve_target("gemini") == GEMINI
+
+
+def test_unrouted_roles_keep_their_own_model(monkeypatch):
+    router = LLMRouter()
+
+    assert router.ranked("Response Composer", MISTRAL) == [MISTRAL]
+
+    monkeypatch.setattr(settings, "LLM_ROUTING_ENABLED", False)
+    assert router.ranked("Query Classifier", MISTRAL) == [MISTRAL]
+
+
+def test_allowlist_order_is_kept_without_enough_samples():
+    router = LLMRouter()
+    record(router, GEMINI, 0.1, count=2)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [MISTRAL, GEMINI]
+
+
+def test_faster_target_ranks_first():
+    router = LLMRouter()
+    record(router, MISTRAL, 2.0)
+    record(router, GEMINI, 0.5)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [GEMINI, MISTRAL]
+
+
+def test_measured_targets_rank_ahead_of_unmeasured_ones():
+    router = LLMRouter()
+    record(router, GEMINI, 5.0)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [GEMINI, MISTRAL]
+
+
+def test_errors_inflate_a_targets_latency():
+    router = LLMRouter()
+    record(router, MISTRAL, 1.0, count=6, failures=2)
+    record(router, GEMINI, 1.5, count=6)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [GEMINI, MISTRAL]
+
+
+def test_degraded_target_goes_last():
+    router = LLMRouter()
+    record(router, MISTRAL, 0.1, failures=3)
+    record(router, GEMINI, 5.0)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [GEMINI, MISTRAL]
+    assert router.stats()[MISTRAL]["degraded"]
+
+
+def test_roles_own_model_is_always_allowed():
+    router = LLMRouter()
+
+    assert router.ranked("Query Classifier", "mistral:mistral-large-latest") == [
+        "mistral:mistral-large-latest", MISTRAL, GEMINI
+    ]
+
+
+def test_duplicate_route_entries_are_tried_once(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTES", {"Query Classifier": ["mistral", MISTRAL, "gemini"]})
+
+    assert LLMRouter().ranked("Query Classifier", MISTRAL) == [MISTRAL, GEMINI]
+
+
+def test_exploration_moves_another_target_first(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTE_EXPLORE_RATE", 1.0)
+    router = LLMRouter()
+    record(router, MISTRAL, 0.1)
+    record(router, GEMINI, 5.0)
+
+    assert router.ranked("Query Classifier", MISTRAL) == [GEMINI, MISTRAL]
+
+
+def test_target_stats_report_p95_and_error_rate():
+    stats = TargetStats()
+    for latency in range(1, 21):
+        stats.latencies.append(latency / 10)
+        stats.outcomes.append(latency % 4 != 0)
+
+    assert stats.p95() == 2.0
+    assert stats.error_rate() == 0.25
+    assert TargetStats().p95() is None
+
+
+def test_mistral_agents_are_leased_one_call_at_a_time(monkeypatch):
+    pytest.importorskip("agno")
+    from src.agents import registry as registry_module
+
+    built = []
+
+    class FakeAgent:
+        def __init__(self, model, system_message):
+            self.model = model
+            built.append(self)
+
+        def run(self, prompt):
+            with llm_router_module._mistral_agent(*key) as other:
+                assert other is not self
+            return SimpleNamespace(content=f"echo {prompt}", status="COMPLETED", metrics=None)
+
+    monkeypatch.setattr("agno.agent.Agent", FakeAgent)
+    monkeypatch.setattr(registry_module, "MistralChat", lambda **kwargs: SimpleNamespace(**kwargs))
+    monkeypatch.setattr(registry_module.agent_registry, "_models", {})
+    monkeypatch.setattr(llm_router_module, "_mistral_agents", {})
+    key = ("mistral-small-latest", "Classify", 0.2, 64)
+
+    output = complete("mistral", "ticket", "Classify", {"temperature": 0.2, "max_output_tokens": 64})
+    complete("mistral", "ticket", "Classify", {"temperature": 0.2, "max_output_tokens": 64})
+
+    assert output.content == "echo ticket"
+    assert output.model == "mistral"
+    assert len(built) == 2
+    # Both agents share the registry's client
+    assert built[0].model is built[1].model
+    assert built[0].model.temperature == 0.2
+    assert built[0].model.max_tokens == 64
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError):
+        complete("openai:gpt-4o", "ticket")
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.config.settings import settings
+from src.utils.llm_router import RoutedRunOutput
+from src.utils.llm_usage import LLMUsage, UsageLedger, call_cost, measure_usage, reported_tokens, response_text
+
+
+@pytest.fixture(autouse=True)
+def pricing(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PRICING", {"mistral-small-latest": {"input": 0.1, "output": 0.3}})
+
+
+def test_cost_is_priced_per_million_tokens():
+    assert call_cost("mistral-small-latest", 1_000_000, 1_000_000) == pytest.approx(0.4)
+    assert call_cost("mistral-small-latest", 2000, 500) == pytest.approx(0.00035)
+    assert call_cost("unpriced-model", 1_000_000, 1_000_000) == 0.0
+
+
+def test_tokens_come_from_agno_run_metrics():
+    response = SimpleNamespace(metrics=SimpleNamespace(input_tokens=120, output_tokens=30))
+
+    assert reported_tokens(response) == (120, 30)
+
+
+def test_tokens_come_from_gemini_usage_metadata():
+    response = SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=200, candidates_token_count=None))
+
+    assert reported_tokens(response) == (200, 0)
+
+
+def test_tokens_come_from_routed_outputs():
+    assert reported_tokens(RoutedRunOutput(content="ok", model="gemini", usage=(50, 5))) == (50, 5)
+
+
+def test_empty_metrics_mean_no_reported_tokens():
+    response = SimpleNamespace(metrics=SimpleNamespace(input_tokens=0, output_tokens=0))
+
+    assert reported_tokens(response) is None
+
+
+def test_response_text_of_runs_and_gemini_responses():
+    class BlockedGeminiResponse:
+        @property
+        def text(self):
+            raise ValueError("response was blocked")
+
+    assert response_text(SimpleNamespace(content="run output")) == "run output"
+    assert response_text(SimpleNamespace(content=None, text="gemini output")) == "gemini output"
+    assert response_text(BlockedGeminiResponse()) == ""
+
+
+def test_measured_usage_prefers_provider_tokens():
+    response = SimpleNamespace(metrics=SimpleNamespace(input_tokens=120, output_tokens=30), content="answer")
+
+    usage = measure_usage("Query Analyzer", "mistral-small-latest", response, 999, latency=0.25)
+
+    assert usage == LLMUsage("Query Analyzer", "mistral-small-latest", 120, 30, 250)
+
+
+def test_measured_usage_falls_back_to_estimates():
+    usage = measure_usage("Query Analyzer", "mistral-small-latest", SimpleNamespace(content="a" * 40), 100, 1.0)
+
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.estimated) == (100, 10, True)
+
+
+def test_ledger_totals_per_agent_largest_prompt_consumer_first():
+    ledger = UsageLedger()
+    ledger.record(LLMUsage("Query Analyzer", "mistral-small-latest", 1000, 100, 200))
+    ledger.record(LLMUsage("Query Analyzer", "mistral-small-latest", 1000, 100, 400))
+    ledger.record(LLMUsage("Evaluation Team", "mistral-small-latest", 5000, 500, 3000))
+
+    stats = ledger.stats()
+
+    assert list(stats["agents"]) == ["Evaluation Team", "Query Analyzer"]
+    assert stats["agents"]["Query Analyzer"] == {
+        "model": "mistral-small-latest", "calls": 2, "prompt_tokens": 2000, "completion_tokens": 200,
+        "latency_ms": 600, "cost_usd": 0.00026, "avg_latency_ms": 300
+    }
+    assert stats["cost_usd"] == pytest.approx(0.00091)
+
+
+def test_empty_ledger_has_no_cost():
+    assert UsageLedger().stats() == {"cost_usd": 0.0, "agents": {}}
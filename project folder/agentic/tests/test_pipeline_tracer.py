@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from src.utils.pipeline_tracer import PipelineTracer, current_tracer, span
+
+
+def tree(spans):
+    """(name, children) tuples of a span list"""
+    return [(item.name, tree(item.children)) for item in spans]
+
+
+def test_spans_nest_under_the_stage_they_run_in():
+    tracer = PipelineTracer()
+    tracer.start_pipeline()
+
+    with tracer.stage("rag"):
+        with span("retrieval", n_results=5, category=None):
+            with span("embedding"):
+                pass
+            with span("vector_search"):
+                pass
+        with span("generation"):
+            pass
+    with tracer.stage("response"):
+        pass
+    tracer.end_pipeline()
+
+    assert tree(tracer.metrics.spans) == [
+        ("rag", [("retrieval", [("embedding", []), ("vector_search", [])]), ("generation", [])]),
+        ("response", [])
+    ]
+    retrieval = tracer.metrics.spans[0].children[0]
+    assert retrieval.attributes == {"n_results": 5}  # None attributes are dropped
+    assert tracer.get_summary()["spans"][0]["children"][0]["name"] == "retrieval"
+
+
+def test_spans_from_worker_threads_attach_to_the_submitting_span():
+    tracer = PipelineTracer()
+    tracer.start_pipeline()
+
+    def evaluate(prefix):
+        with span("evaluate_prefix", documents=prefix):
+            pass
+
+    with tracer.stage("rag"), ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(copy_context().run, evaluate, prefix) for prefix in (2, 4, 6)]
+        for future in futures:
+            future.result()
+    tracer.end_pipeline()
+
+    children = tracer.metrics.spans[0].children
+    assert sorted(child.attributes["documents"] for child in children) == [2, 4, 6]
+
+
+def test_failed_span_records_the_error():
+    tracer = PipelineTracer()
+    tracer.start_pipeline()
+
+    with pytest.raises(RuntimeError):
+        with tracer.stage("rag"):
+            with span("generation"):
+                raise RuntimeError("gemini blocked")
+    tracer.end_pipeline()
+
+    generation = tracer.metrics.spans[0].children[0]
+    assert not generation.success
+    assert generation.error_message == "gemini blocked"
+    assert tracer.metrics.error_stage == "rag"
+
+
+def test_end_pipeline_restores_the_previous_context():
+    outer = PipelineTracer()
+    outer.start_pipeline()
+    with outer.stage("complaint"):
+        inner = PipelineTracer()
+        inner.start_pipeline()
+        assert current_tracer() is inner
+        inner.end_pipeline()
+
+        assert current_tracer() is outer
+        with span("after_inner"):
+            pass
+    outer.end_pipeline()
+    outer.end_pipeline()  # a second call is harmless
+
+    assert current_tracer() is None
+    assert tree(outer.metrics.spans) == [("complaint", [("after_inner", [])])]
+
+
+def test_spans_outside_a_pipeline_are_timed_but_not_recorded():
+    with span("embedding", texts=1) as detached:
+        pass
+
+    assert current_tracer() is None
+    assert detached.latency_ms >= 0
@@ -0,0 +1,65 @@
+from src.utils.rank_fusion import fuse_results, id_overlap
+
+
+def result_set(ids, distances=None):
+    return {
+        "ids": [ids],
+        "documents": [[f"text of {chunk_id}" for chunk_id in ids]],
+        "metadatas": [[{"id": chunk_id} for chunk_id in ids]],
+        "distances": [distances if distances is not None else [0.1 * (rank + 1) for rank in range(len(ids))]]
+    }
+
+
+def test_chunks_found_by_several_queries_rank_first():
+    fused = fuse_results([result_set(["a", "b", "c"]), result_set(["c", "d", "a"])], n_results=4)
+
+    # a: 1/61 + 1/63, c: 1/63 + 1/61, then b (1/62) ahead of d (1/62, seen later)
+    assert set(fused["ids"][0][:2]) == {"a", "c"}
+    assert fused["ids"][0][2:] == ["b", "d"]
+    assert fused["documents"][0] == [f"text of {chunk_id}" for chunk_id in fused["ids"][0]]
+    assert fused["metadatas"][0] == [{"id": chunk_id} for chunk_id in fused["ids"][0]]
+
+
+def test_second_rank_in_two_queries_beats_first_rank_in_one():
+    # b: 1/(k+2) + 1/(k+1) > a: 1/(k+1)
+    fused = fuse_results([result_set(["a", "b"]), result_set(["b"])], n_results=2)
+    assert fused["ids"][0] == ["b", "a"]
+
+    # A smaller k does not change the order of chunks found by more queries
+    fused = fuse_results([result_set(["a", "b"]), result_set(["b"])], n_results=2, k=1)
+    assert fused["ids"][0] == ["b", "a"]
+
+
+def test_fused_list_is_cut_to_n_results():
+    fused = fuse_results([result_set(["a", "b", "c", "d"])], n_results=2)
+
+    assert fused["ids"][0] == ["a", "b"]
+    assert len(fused["distances"][0]) == 2
+
+
+def test_each_chunk_keeps_its_best_distance():
+    fused = fuse_results([result_set(["a", "b"], [0.4, 0.5]), result_set(["b", "a"], [0.2, 0.9])], n_results=2)
+
+    distances = dict(zip(fused["ids"][0], fused["distances"][0]))
+    assert distances == {"a": 0.4, "b": 0.2}
+
+
+def test_distances_are_dropped_when_a_result_set_has_none():
+    without_distances = {"ids": [["c"]], "documents": [["text of c"]], "metadatas": [[None]]}
+    fused = fuse_results([result_set(["a"]), without_distances], n_results=2)
+
+    assert fused["ids"][0] == ["a", "c"]
+    assert fused["distances"] == [[]]
+
+
+def test_empty_result_sets_fuse_to_nothing():
+    fused = fuse_results([{"ids": [[]]}, {}], n_results=5)
+
+    assert fused["ids"] == [[]]
+    assert fused["documents"] == [[]]
+
+
+def test_id_overlap_is_the_share_of_the_second_set_already_retrieved():
+    assert id_overlap(result_set(["a", "b", "c"]), result_set(["a", "d"])) == 0.5
+    assert id_overlap(result_set(["a"]), result_set(["a"])) == 1.0
+    assert id_overlap(result_set(["a"]), {"ids": [[]]}) == 1.0
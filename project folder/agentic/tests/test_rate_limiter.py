@@ -0,0 +1,209 @@
+import threading
+import time
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import rate_limiter as rate_limiter_module
+from src.utils.rate_limiter import (
+    BASELINE_MIN_SAMPLES,
+    AdaptiveLimiter,
+    ProviderLimiter,
+    RateLimiterRegistry,
+    TokenBucket
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the rate limiter"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def warm_baseline(limiter, key, latency=1.0):
+    for _ in range(BASELINE_MIN_SAMPLES):
+        limiter.acquire()
+        limiter.release(latency, key=key)
+
+
+def test_limit_grows_by_about_one_slot_per_window_of_successes():
+    limiter = AdaptiveLimiter(initial=4, maximum=16)
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(0.5)
+
+    assert 4.9 < limiter.limit < 5.0
+    assert limiter.in_flight == 0
+
+
+def test_limit_never_exceeds_the_maximum():
+    limiter = AdaptiveLimiter(initial=4, maximum=5)
+
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(0.5)
+
+    assert limiter.limit == 5
+
+
+def test_rate_limit_halves_the_limit_once_per_cooldown(clock):
+    limiter = AdaptiveLimiter(initial=8, maximum=16)
+
+    limiter.acquire()
+    limiter.release(None, rate_limited=True)
+    assert limiter.limit == 4
+
+    limiter.acquire()
+    limiter.release(None, rate_limited=True)
+    assert limiter.limit == 4
+
+    clock[0] += 1.0
+    limiter.acquire()
+    limiter.release(None, rate_limited=True)
+    assert limiter.limit == 2
+
+
+def test_limit_never_drops_below_the_minimum(clock):
+    limiter = AdaptiveLimiter(initial=1, maximum=4)
+
+    limiter.acquire()
+    limiter.release(None, rate_limited=True)
+
+    assert limiter.limit == 1
+
+
+def test_failed_calls_leave_the_limit_unchanged():
+    limiter = AdaptiveLimiter(initial=4, maximum=16)
+
+    limiter.acquire()
+    limiter.release(None)
+
+    assert limiter.limit == 4
+
+
+def test_latency_is_overload_only_against_the_agents_own_baseline(clock):
+    limiter = AdaptiveLimiter(initial=8, maximum=16)
+    warm_baseline(limiter, "Query Analyzer", latency=0.5)
+    warm_baseline(limiter, "Evaluation Team", latency=5.0)
+    limit = limiter.limit
+
+    # Slow for the fast agent, but normal for the slow one
+    limiter.acquire()
+    limiter.release(5.0, key="Evaluation Team")
+    assert limiter.limit > limit
+
+    limiter.acquire()
+    limiter.release(1.5, key="Query Analyzer")
+    assert limiter.limit == pytest.approx((limit + 1.0 / limit) * 0.5)
+
+
+def test_latency_needs_enough_samples_to_signal_overload():
+    limiter = AdaptiveLimiter(initial=4, maximum=16)
+
+    limiter.acquire()
+    limiter.release(0.1, key="agent")
+    limiter.acquire()
+    limiter.release(10.0, key="agent")
+
+    assert limiter.limit > 4
+
+
+def test_non_blocking_acquire_fails_when_slots_are_taken():
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+
+    assert limiter.acquire(block=False)
+    assert not limiter.acquire(block=False)
+
+    limiter.cancel()
+    assert limiter.limit == 1
+    assert limiter.acquire(block=False)
+
+
+def test_blocking_acquire_waits_for_a_release():
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.05)
+
+    limiter.release(0.1)
+    assert acquired.wait(5)
+    waiter.join(5)
+
+
+def test_token_bucket_refills_at_its_per_minute_rate(clock):
+    bucket = TokenBucket(60)
+    assert bucket.try_acquire(60)
+    assert not bucket.try_acquire()
+
+    clock[0] += 2.0
+    assert bucket.try_acquire(2)
+    assert not bucket.try_acquire()
+
+    bucket.refund()
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_caps_requests_at_its_capacity(clock):
+    bucket = TokenBucket(10)
+
+    assert bucket.try_acquire(50)
+    assert not bucket.try_acquire()
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+
+    bucket.acquire(10 ** 9)
+    assert bucket.try_acquire(10 ** 9)
+
+
+def test_provider_try_acquire_does_not_block_on_an_empty_bucket(clock):
+    limiter = ProviderLimiter("mistral", {"rpm": 1, "initial_concurrency": 4})
+    assert limiter.try_acquire()
+
+    started = time.perf_counter()
+    assert not limiter.try_acquire()
+    assert time.perf_counter() - started < 0.5
+    # The concurrency slot taken before the bucket check is given back
+    assert limiter.concurrency.in_flight == 1
+
+
+def test_provider_try_acquire_refunds_requests_when_tokens_run_out(clock):
+    limiter = ProviderLimiter("mistral", {"rpm": 2, "tpm": 100})
+
+    assert limiter.try_acquire(tokens=100)
+    assert not limiter.try_acquire(tokens=1)
+    assert limiter.requests.tokens == 1
+    assert limiter.concurrency.in_flight == 1
+
+
+def test_provider_stats_count_calls_and_rate_limits():
+    limiter = ProviderLimiter("gemini", {"initial_concurrency": 2, "max_concurrency": 4})
+
+    limiter.acquire()
+    limiter.release(None, rate_limited=True, key="Gemini RAG Generation")
+    stats = limiter.stats()
+
+    assert stats["calls"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["concurrency_limit"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_registry_builds_limiters_only_when_enabled_and_configured(monkeypatch):
+    registry = RateLimiterRegistry()
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"mistral": {"rpm": 60}})
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    assert registry.get("mistral") is None
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    assert registry.get("Mistral") is registry.get("mistral")
+    assert registry.get("gemini") is None
+    assert list(registry.stats()) == ["mistral"]
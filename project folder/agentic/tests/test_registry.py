@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("agno")
+
+from agno.agent import Agent
+from agno.run.base import RunContext
+from agno.session import AgentSession
+
+from src.agents.registry import AgentRegistry
+
+
+def build_agent(registry):
+    return Agent(
+        name="Query Classifier",
+        model=registry.get_model("mistral-small-latest", 0.1),
+        description="You classify Doxa support tickets.",
+        instructions=["Answer with one category.", "Never explain the answer."],
+        markdown=True
+    )
+
+
+def test_agents_are_built_once_and_share_model_clients():
+    registry = AgentRegistry()
+    builds = []
+
+    first = registry.get_or_build("classifier", lambda: builds.append(1) or build_agent(registry))
+    again = registry.get_or_build("classifier", lambda: builds.append(1) or build_agent(registry))
+
+    assert first is again
+    assert builds == [1]
+    assert registry.get_model("mistral-small-latest", 0.1) is first.model
+    assert registry.names() == ["classifier"]
+
+
+def test_system_prompt_is_the_one_agno_assembles_for_a_run():
+    registry = AgentRegistry()
+    agent = registry.get_or_build("classifier", lambda: build_agent(registry))
+
+    # agno still assembles the prompt itself on every run
+    assert agent.system_message is None
+
+    run_context = RunContext(run_id="run-1", session_id="session-1", output_schema=agent.output_schema)
+    sent = agent.get_system_message(session=AgentSession(session_id="session-1"), run_context=run_context)
+    prompt = registry.system_prompt(agent)
+
+    assert prompt == sent.content
+    assert "Never explain the answer." in prompt
+
+
+def test_system_prompt_of_unregistered_agents():
+    registry = AgentRegistry()
+
+    assert registry.system_prompt(Agent(name="Adhoc", system_message="Be brief.")) == "Be brief."
+    assert registry.system_prompt(Agent(name="Plain")) == ""
@@ -0,0 +1,29 @@
+from src.utils.response_templates import RESPONSE_TEMPLATES, SUPPORTED_LANGUAGES, compose_response
+
+
+def test_response_has_the_four_parts_in_order():
+    response = compose_response("en", " Refund for a double charge ", "  We refunded the second charge.  ")
+
+    assert response.split("\n\n") == [
+        RESPONSE_TEMPLATES["en"]["thanks"],
+        "Your request: Refund for a double charge",
+        "We refunded the second charge.",
+        RESPONSE_TEMPLATES["en"]["next_action"]
+    ]
+
+
+def test_empty_summary_skips_the_recap():
+    response = compose_response("es", "  ", "Solución.")
+
+    assert "Su solicitud" not in response
+    assert response.startswith(RESPONSE_TEMPLATES["es"]["thanks"] + "\n\nSolución.")
+
+
+def test_unknown_language_falls_back_to_french():
+    assert compose_response("de", None, "Réponse.") == compose_response("fr", None, "Réponse.")
+
+
+def test_every_language_has_every_part():
+    for language in SUPPORTED_LANGUAGES:
+        assert set(RESPONSE_TEMPLATES[language]) == {"thanks", "recap", "next_action"}
+        assert "{summary}" in RESPONSE_TEMPLATES[language]["recap"]
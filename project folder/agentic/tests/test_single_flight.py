@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.config.settings import settings
+from src.utils.single_flight import FlightTimeout, SingleFlight, normalize_request_text, request_key
+
+
+def start_leader(flight, key, release, result="leader result"):
+    """Run a leader that blocks until release is set; returns its future"""
+    started = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    future = ThreadPoolExecutor(max_workers=1).submit(flight.do, key, work)
+    assert started.wait(5)
+    return future
+
+
+def wait_for_followers(flight, key, count):
+    deadline = time.monotonic() + 5
+    while flight._flights[key].followers < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    leader = start_leader(flight, "key", release)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        followers = [pool.submit(flight.do, "key", lambda: calls.append(1)) for _ in range(3)]
+        wait_for_followers(flight, "key", 3)
+        assert flight.in_flight() == 1
+        release.set()
+
+        assert leader.result(5) == ("leader result", False)
+        assert [future.result(5) for future in followers] == [("leader result", True)] * 3
+    assert calls == []
+    assert flight.in_flight() == 0
+
+
+def test_followers_reraise_the_leader_error():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = start_leader(flight, "key", release, result=RuntimeError("pipeline failed"))
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        follower = pool.submit(flight.do, "key", lambda: "own result")
+        wait_for_followers(flight, "key", 1)
+        release.set()
+
+        with pytest.raises(RuntimeError, match="pipeline failed"):
+            leader.result(5)
+        with pytest.raises(RuntimeError, match="pipeline failed"):
+            follower.result(5)
+
+
+def test_follower_gives_up_without_running_past_its_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = start_leader(flight, "key", release)
+    ran = []
+
+    with pytest.raises(FlightTimeout):
+        flight.do("key", lambda: ran.append(True), timeout=0.05)
+    assert ran == []
+    assert flight._flights["key"].followers == 0
+
+    release.set()
+    assert leader.result(5) == ("leader result", False)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("a", lambda: 2) == (2, False)
+    assert flight.do("b", lambda: 3) == (3, False)
+
+
+def test_request_text_is_normalized():
+    assert normalize_request_text("  My   Invoice\nis WRONG ") == "my invoice is wrong"
+    assert normalize_request_text(None) == ""
+
+
+def test_request_key_covers_text_fields_and_config(monkeypatch):
+    key = request_key("My invoice is wrong", "billing", 5000)
+
+    assert request_key("my  invoice is WRONG", "billing", 5000) == key
+    assert request_key("My invoice is wrong", "technical", 5000) != key
+    assert request_key("My invoice is wrong", "billing", 8000) != key
+
+    monkeypatch.setattr(settings, "RAG_CONTEXT_TOKEN_BUDGET", settings.RAG_CONTEXT_TOKEN_BUDGET + 1)
+    assert request_key("My invoice is wrong", "billing", 5000) != key
+
+
+def test_api_keys_do_not_change_the_request_key(monkeypatch):
+    key = request_key("My invoice is wrong")
+
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "rotated")
+    assert request_key("My invoice is wrong") == key
@@ -0,0 +1,27 @@
+from src.utils.ticket_categories import categorize_document, category_slug, normalize_category
+
+
+def test_category_directory_wins_over_keywords():
+    assert categorize_document("billing/faq.md", "password login password") == "Billing"
+    assert categorize_document("docs/team_management/roles.md", "") == "Team Management"
+
+
+def test_most_keyword_hits_wins_with_a_minimum():
+    text = "Your invoice and your payment are listed under Billing. Reset your password from the account page."
+
+    assert categorize_document("faq.md", text) == "Billing"
+    assert categorize_document("faq.md", "One invoice question.") == "Other"
+
+
+def test_keywords_match_whole_words_only():
+    # 'teamwork' and 'teammates' contain 'team', 'statusbar' contains 'status'
+    assert categorize_document("faq.md", "Teamwork with your teammates; check the statusbar.") == "Other"
+    assert categorize_document("faq.md", "Your teams and their members.") == "Team Management"
+
+
+def test_categories_normalize_from_any_spelling():
+    assert category_slug("Team Management") == "team_management"
+    assert normalize_category("team-management") == "Team Management"
+    assert normalize_category("BILLING") == "Billing"
+    assert normalize_category("refunds") is None
+    assert normalize_category("") is None
@@ -0,0 +1,33 @@
+import pytest
+from pydantic import ValidationError
+
+from src.schemas.ticket import FusedFrontEndResult
+
+
+def test_fused_result_parses_all_front_end_fields():
+    result = FusedFrontEndResult.model_validate_json(
+        '{"category": "doxa_related", "language": "en", "summary": "Invoice shows the wrong amount",'
+        ' "keywords": ["invoice", "amount"], "word_count": 5, "intent": "billing",'
+        ' "enriched_query": "Doxa invoice amount incorrect billing"}'
+    )
+
+    assert result.category == "doxa_related"
+    assert result.language == "en"
+    assert result.keywords == ["invoice", "amount"]
+    assert result.enriched_query == "Doxa invoice amount incorrect billing"
+
+
+def test_rag_queries_need_an_enriched_query():
+    with pytest.raises(ValidationError):
+        FusedFrontEndResult(category="doxa_related", language="fr", enriched_query="  ")
+
+    # Queries that never reach RAG do not
+    assert FusedFrontEndResult(category="spam", language="fr").enriched_query is None
+
+
+@pytest.mark.parametrize("field, value", [("category", "billing"), ("language", "de")])
+def test_unknown_category_or_language_is_rejected(field, value):
+    fields = {"category": "spam", "language": "fr", field: value}
+
+    with pytest.raises(ValidationError):
+        FusedFrontEndResult(**fields)
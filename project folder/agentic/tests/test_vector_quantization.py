@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.utils.vector_quantization import (
+    QuantizedVectorIndex,
+    build_index_from_collection,
+    collection_space,
+    is_quantized_index_stale,
+    load_quantized_index,
+    mark_quantized_index_stale,
+    query_quantized_index,
+    score_to_distance
+)
+
+
+class FakeCollection:
+    """collection.get over an id -> (document, metadata) dict"""
+
+    def __init__(self, records, space=None, embeddings=None):
+        self.records = records
+        self.metadata = {"hnsw:space": space} if space else {}
+        self.embeddings = embeddings
+        self.name = "docs"
+
+    def count(self):
+        return len(self.records)
+
+    def get(self, ids=None, include=(), limit=None, offset=0):
+        if ids is None:
+            ids = list(self.records)[offset:offset + limit]
+        found = [doc_id for doc_id in ids if doc_id in self.records]
+        return {
+            "ids": found,
+            "documents": [self.records[doc_id][0] for doc_id in found],
+            "metadatas": [self.records[doc_id][1] for doc_id in found],
+            "embeddings": [self.embeddings[int(doc_id.split("_")[1])] for doc_id in found] if self.embeddings is not None else None
+        }
+
+
+def normalized_vectors(count, dimension=32, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(tmp_path, vectors, mode):
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+    return QuantizedVectorIndex.build(str(tmp_path / mode), ids, [vectors], vectors.shape[1], mode=mode)
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_search_finds_the_stored_vector_first(tmp_path, mode):
+    vectors = normalized_vectors(300)
+    index = build(tmp_path, vectors, mode)
+
+    doc_id, score = index.search(vectors[7], n_results=5)[0]
+
+    assert doc_id == "doc_7"
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_full_shortlist_rescores_to_the_exact_ranking(tmp_path, mode):
+    vectors = normalized_vectors(100)
+    index = build(tmp_path, vectors, mode)
+
+    query = normalized_vectors(1, seed=1)[0]
+    hits = index.search(query, n_results=5, rescore_multiplier=20)
+
+    exact = np.argsort(-(vectors @ query))[:5]
+    assert [doc_id for doc_id, _ in hits] == [f"doc_{i}" for i in exact]
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+
+@pytest.mark.parametrize("mode, ratio", [("int8", 4), ("binary", 32)])
+def test_resident_codes_are_smaller_than_full_precision(tmp_path, mode, ratio):
+    footprint = build(tmp_path, normalized_vectors(512, dimension=64), mode).memory_footprint()
+
+    # int8 also keeps one float32 scale per dimension
+    assert footprint["full_precision_bytes"] / footprint["resident_bytes"] == pytest.approx(ratio, rel=0.05)
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        build(tmp_path, normalized_vectors(4), "int4")
+
+
+def test_score_to_distance_follows_the_collection_space():
+    assert score_to_distance(0.75, "l2") == pytest.approx(0.5)
+    assert score_to_distance(0.75, "cosine") == pytest.approx(0.25)
+    assert score_to_distance(0.75, "ip") == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize("space, expected", [(None, 0.0), ("l2", 0.0), ("cosine", 0.0)])
+def test_query_returns_chroma_shaped_results_in_the_collection_space(tmp_path, space, expected):
+    vectors = normalized_vectors(20)
+    index = build(tmp_path, vectors, "int8")
+    records = {f"doc_{i}": (f"text {i}", {"category": "billing"}) for i in range(20)}
+
+    results = query_quantized_index(index, FakeCollection(records, space), vectors[3].tolist(), n_results=3)
+
+    assert results["ids"][0][0] == "doc_3"
+    assert results["documents"][0][0] == "text 3"
+    assert results["metadatas"][0][0] == {"category": "billing"}
+    assert results["distances"][0][0] == pytest.approx(expected, abs=1e-5)
+    assert results["distances"][0] == sorted(results["distances"][0])
+
+
+def test_query_drops_hits_deleted_from_chroma(tmp_path):
+    vectors = normalized_vectors(20)
+    index = build(tmp_path, vectors, "binary")
+    records = {f"doc_{i}": (f"text {i}", {}) for i in range(20) if i != 3}
+
+    results = query_quantized_index(index, FakeCollection(records), vectors[3].tolist(), n_results=3)
+
+    assert "doc_3" not in results["ids"][0]
+    assert len(results["ids"][0]) == len(results["distances"][0])
+
+
+def test_load_reuses_the_cached_index_until_it_is_rebuilt(tmp_path):
+    assert load_quantized_index(str(tmp_path / "missing")) is None
+
+    index_dir = tmp_path / "binary"
+    build(tmp_path, normalized_vectors(10), "binary")
+    first = load_quantized_index(str(index_dir))
+    assert load_quantized_index(str(index_dir)) is first
+
+    build(tmp_path, normalized_vectors(12), "binary")
+    meta = index_dir / "meta.json"
+    os.utime(meta, (meta.stat().st_atime, meta.stat().st_mtime + 1))
+    rebuilt = load_quantized_index(str(index_dir))
+    assert rebuilt is not first
+    assert len(rebuilt.ids) == 12
+
+
+def test_rebuild_swaps_in_new_files_without_touching_open_readers(tmp_path):
+    old_vectors = normalized_vectors(10)
+    first = build(tmp_path, old_vectors, "binary")
+
+    build(tmp_path, normalized_vectors(10, seed=3), "binary")
+
+    # The open index still reads the vectors it was built from
+    assert first.search(old_vectors[4], n_results=1)[0][0] == "doc_4"
+    assert np.allclose(first.full_vectors, old_vectors)
+    assert len(list((tmp_path / "binary").glob("build-*"))) == 1
+
+
+def test_stale_index_is_not_served_until_rebuilt(tmp_path):
+    vectors = normalized_vectors(10)
+    collection = FakeCollection({f"doc_{i}": (f"text {i}", {}) for i in range(10)}, embeddings=vectors)
+    index_dir = str(tmp_path / "index")
+
+    mark_quantized_index_stale(index_dir)
+    assert not is_quantized_index_stale(index_dir)  # nothing built yet, nothing to mark
+
+    build_index_from_collection(collection, index_dir, mode="int8", page_size=4)
+    assert load_quantized_index(index_dir) is not None
+
+    mark_quantized_index_stale(index_dir)
+    assert load_quantized_index(index_dir) is None
+
+    build_index_from_collection(collection, index_dir, mode="int8", page_size=4)
+    assert not is_quantized_index_stale(index_dir)
+    assert load_quantized_index(index_dir).ids == [f"doc_{i}" for i in range(10)]
+
+
+def test_collection_space_prefers_the_index_configuration():
+    collection = FakeCollection({})
+    collection.configuration = {"hnsw": {"space": "cosine"}}
+
+    # modify(metadata=...) dropped hnsw:space from the metadata
+    assert collection_space(collection) == "cosine"
+    assert collection_space(FakeCollection({}, space="ip")) == "ip"
+    assert collection_space(FakeCollection({})) == "l2"
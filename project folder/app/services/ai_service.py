@@ -8,6 +8,8 @@ from app.core.database import SessionLocal
 AGENTIC_SERVICE_URL = "http://localhost:8002/api/v1/tickets/process-enhanced"
 # Increased timeout to handle slow AI responses (2 minutes)
 AI_REQUEST_TIMEOUT = 120.0
+# Our timeout, forwarded so the pipeline can budget its stages against it
+AI_DEADLINE_HEADER = "X-Request-Timeout-Ms"
 
 async def process_ticket_with_ai(ticket_id: int):
     """
@@ -31,7 +33,7 @@ async def process_ticket_with_ai(ticket_id: int):
             payload = {
                 "subject": ticket.subject or "",
                 "description": ticket.description or "",
-                "category": None
+                "category": ticket.category.value if ticket.category else None
             }
             
             print(f"AI Agent: Calling Agentic Service at {AGENTIC_SERVICE_URL} (timeout: {AI_REQUEST_TIMEOUT}s)...", flush=True)
@@ -41,7 +43,11 @@ async def process_ticket_with_ai(ticket_id: int):
             # Call Agentic Service with extended timeout
             async with httpx.AsyncClient(timeout=AI_REQUEST_TIMEOUT) as client:
                 try:
-                    response = await client.post(AGENTIC_SERVICE_URL, json=payload)
+                    response = await client.post(
+                        AGENTIC_SERVICE_URL,
+                        json=payload,
+                        headers={AI_DEADLINE_HEADER: str(int(AI_REQUEST_TIMEOUT * 1000))}
+                    )
                     response.raise_for_status()
                     result = response.json()
                     